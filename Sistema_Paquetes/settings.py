@@ -41,6 +41,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # primero: también mide las consultas de sesión y autenticación
+    'app_paquetes.middleware.InstrumentacionSQLMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -73,10 +75,76 @@ WSGI_APPLICATION = 'Sistema_Paquetes.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Perfil de SQLite para escrituras concurrentes:
+#  - WAL: los lectores no bloquean al escritor ni al revés (queda guardado en el archivo)
+#  - synchronous=NORMAL: en WAL no pierde integridad, solo las últimas transacciones ante un corte de luz
+#  - mmap_size / cache_size: 256MB mapeados y 64MB de cache de páginas por conexión
+#  - transaction_mode IMMEDIATE: cada atomic() toma el lock de escritura al empezar, así una
+#    transacción que lee y después escribe espera su turno (timeout) en lugar de fallar
+#    con "database is locked" al querer pasar de lectura a escritura
+#  - CONN_MAX_AGE: conexiones persistentes por thread (bajo ASGI Django las cierra igual al
+#    terminar cada request)
+SQLITE_PRAGMAS = (
+    'PRAGMA synchronous=NORMAL;'
+    'PRAGMA mmap_size=268435456;'
+    'PRAGMA cache_size=-65536;'
+    'PRAGMA temp_store=MEMORY;'
+)
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': 'PRAGMA journal_mode=WAL;' + SQLITE_PRAGMAS,
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+    },
+    # Conexión de solo lectura sobre el mismo archivo, usada por los listados y detalles
+    # (ver app_paquetes.routers.LecturaRouter). En los tests es la misma base que default
+    'lectura': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': f"file:{BASE_DIR / 'db.sqlite3'}?mode=ro",
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': SQLITE_PRAGMAS + 'PRAGMA query_only=1;',
+            'timeout': 20,
+        },
+        'TEST': {
+            'MIRROR': 'default',
+        },
+    },
+    # Planillas cerradas con sus items y paquetes, movidas por `manage.py archivar_planillas`
+    # (ver app_paquetes.routers.ArchivoRouter). Se crea con `manage.py migrate --database archivo`
+    'archivo': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'archivo.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': 'PRAGMA journal_mode=WAL;' + SQLITE_PRAGMAS,
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+    },
+}
+
+DATABASE_ROUTERS = ['app_paquetes.routers.ArchivoRouter', 'app_paquetes.routers.LecturaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Con varios procesos usar 'django.core.cache.backends.filebased.FileBasedCache'
+# (LOCATION = un directorio) para que compartan las entradas y los contadores.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'sistema-paquetes',
     }
 }
 
@@ -121,3 +189,63 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Django REST Framework
+# https://www.django-rest-framework.org/api-guide/settings/
+
+REST_FRAMEWORK = {
+    # Tamaño de pagina por defecto de los listados paginados por cursor
+    'PAGE_SIZE': 100,
+}
+
+
+# Configuración de app_paquetes
+
+# Filas por lote (validación + bulk_create) en paquetes/bulk-create/, se puede cambiar con ?chunk_size=
+PAQUETES_BULK_CREATE_CHUNK_SIZE = 1000
+
+# Paquetes por transacción al reclasificar tipos (python manage.py reclasificar_paquetes)
+PAQUETES_RECLASIFICAR_CHUNK_SIZE = 5000
+
+# Segundos que se conserva el resumen cacheado de una planilla (la versión en la clave lo invalida antes)
+PAQUETES_RESUMEN_CACHE_TIMEOUT = 300
+
+# Filas leídas por bloque al exportar en paquetes/export/
+PAQUETES_EXPORT_CHUNK_SIZE = 2000
+
+# Consulta por tracking en paquetes/lookup/: trackings por pedido y por consulta IN (SQLite admite 999 parámetros)
+PAQUETES_LOOKUP_MAX_TRACKINGS = 50000
+PAQUETES_LOOKUP_CHUNK_SIZE = 900
+
+# Archivo (python manage.py archivar_planillas): antigüedad mínima en días de las planillas a
+# archivar y planillas por transacción
+PAQUETES_ARCHIVO_DIAS = 90
+PAQUETES_ARCHIVO_CHUNK_SIZE = 100
+
+# Asignaciones (item, motivo) por pedido en items/bulk-assign-motivo/
+PAQUETES_BULK_MOTIVO_MAX = 5000
+
+# Segundos que el listado de motivos usa el catálogo en memoria sin verificar su versión
+# (0: verifica siempre). Las validaciones verifican siempre
+PAQUETES_CATALOGO_MOTIVOS_TTL = 0
+
+# Reportes: eventos del registro por transacción al procesarlo y rango máximo de días por consulta
+PAQUETES_REPORTES_LOTE = 10000
+PAQUETES_REPORTES_MAX_DIAS = 366
+
+# Listado de paquetes armado desde .values() sin ModelSerializer (también con ?fast=1)
+PAQUETES_LISTADOS_RAPIDOS = False
+
+# Group commit: las escrituras chicas de los endpoints (alta de paquete, asignación a planilla,
+# motivo de fallo, distribución) se confirman por lotes en un thread escritor, hasta
+# MAX_OPERACIONES por transacción o ESPERA_MS desde la primera operación del lote (con 0 el lote
+# junta lo que se encoló mientras se confirmaba el anterior). TIMEOUT: segundos que un request
+# espera su lote antes de escribir por su cuenta (ver ColaEscritura)
+PAQUETES_GROUP_COMMIT = False
+PAQUETES_GROUP_COMMIT_MAX_OPERACIONES = 64
+PAQUETES_GROUP_COMMIT_ESPERA_MS = 0
+PAQUETES_GROUP_COMMIT_TIMEOUT = 30
+
+# Instrumentación SQL por request (header Server-Timing y /api/stats/sql/ por nombre de URL)
+PAQUETES_INSTRUMENTACION_SQL = True
@@ -1,3 +1,61 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import Cliente, ContadorPaquetes, Paquete, Planilla, Item, MotivoFalloSimple, MotivoFalloCompuesto
+
+
+@admin.register(Cliente)
+class ClienteAdmin(admin.ModelAdmin):
+    list_display = ('nombre', 'email', 'telefono')
+    search_fields = ('nombre', 'email')
+
+
+@admin.register(Paquete)
+class PaqueteAdmin(admin.ModelAdmin):
+    list_display = ('tracking', 'nombre_destinatario', 'estado', 'tipo', 'peso', 'cliente')
+    list_filter = ('estado', 'tipo')
+    search_fields = ('tracking',)
+    raw_id_fields = ('cliente',)
+    readonly_fields = ('tipo',)
+
+
+@admin.register(Planilla)
+class PlanillaAdmin(admin.ModelAdmin):
+    list_display = ('numero_planilla', 'fecha', 'item_count', 'peso_total')
+    search_fields = ('numero_planilla',)
+    readonly_fields = ('peso_total', 'item_count', 'version')
+
+
+@admin.register(Item)
+class ItemAdmin(admin.ModelAdmin):
+    """La validación de planilla activa corre en Item.clean() y en el índice único parcial"""
+    list_display = ('planilla', 'posicion', 'paquete', 'activo', 'motivo_fallo')
+    list_filter = ('activo',)
+    raw_id_fields = ('planilla', 'paquete')
+
+
+@admin.register(MotivoFalloSimple)
+class MotivoFalloSimpleAdmin(admin.ModelAdmin):
+    list_display = ('codigo', 'nombre', 'active')
+    list_filter = ('active',)
+
+
+@admin.register(MotivoFalloCompuesto)
+class MotivoFalloCompuestoAdmin(admin.ModelAdmin):
+    """codigo, nombre, descripcion y active se calculan a partir de los miembros"""
+    list_display = ('codigo', 'nombre', 'active')
+    list_filter = ('active',)
+    filter_horizontal = ('motivos', 'submotivos')
+    readonly_fields = ('codigo', 'nombre', 'descripcion', 'active')
+
+
+@admin.register(ContadorPaquetes)
+class ContadorPaquetesAdmin(admin.ModelAdmin):
+    """Solo lectura: los contadores se corrigen con reconstruir_contadores"""
+    list_display = ('cliente', 'estado', 'tipo', 'cantidad')
+    list_filter = ('estado', 'tipo')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
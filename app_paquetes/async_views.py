@@ -0,0 +1,106 @@
+"""
+Variantes async de los endpoints de lectura más consultados por los tableros
+(listado de paquetes, detalle de planilla y listado de motivos).
+
+Son vistas de Django (no DRF) con el ORM async: bajo un servidor ASGI una consulta
+en espera no retiene un thread del servidor. Las respuestas tienen el mismo JSON que
+las vistas sync: los paquetes se arman con el mapeo del modo rápido y la planilla y
+los motivos con los mismos serializers, una vez leídos los datos
+"""
+from django.db.models import Prefetch, aprefetch_related_objects
+from django.http import JsonResponse
+from django.views import View
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+
+from .filters import PaqueteFilter
+from .mixins import LecturaMixin, ValuesListMixin
+from .models import Item, Paquete, Planilla
+from .pagination import PaqueteCursorPagination
+from .serializers import MotivoFalloSimpleSerializer, PaqueteSerializer, PlanillaResumenSerializer
+from .utils.cache_utils import CatalogoMotivos, ResumenPlanillaCache
+from .views import PaqueteListView
+
+
+class AsyncJsonView(LecturaMixin, View):
+    """Base de las vistas async: solo GET (sobre la conexión de lectura) y errores con el mismo formato que DRF"""
+    http_method_names = ['get', 'options']
+    json_dumps_params = {'ensure_ascii': False}
+
+    def responder(self, datos, status=200):
+        return JsonResponse(datos, status=status, safe=False, json_dumps_params=self.json_dumps_params)
+
+    def error(self, detalle, status):
+        return self.responder({'detail': detalle}, status=status)
+
+
+class PaqueteAsyncListView(AsyncJsonView):
+    """
+    Listado de paquetes paginado por cursor, con los filtros estado, cliente y tipo y
+    ?ordering= como el listado sync. No incluye ?search= (usar /api/paquetes/)
+    """
+    ordering_fields = PaqueteListView.ordering_fields
+    ordering = PaqueteListView.ordering
+
+    async def get(self, request):
+        request = Request(request)
+        filtro = PaqueteFilter(request.query_params, queryset=Paquete.objects.all())
+        if not filtro.is_valid():
+            return self.responder(filtro.errors, status=400)
+
+        queryset = filtro.qs
+        orden = self.obtener_orden(request)
+        if orden:
+            queryset = queryset.order_by(*orden)
+
+        mapeo = ValuesListMixin.get_mapeo_valores(PaqueteSerializer)
+        queryset = queryset.values(*[columna for _, columna, _ in mapeo])
+        paginador = PaqueteCursorPagination()
+        try:
+            pagina = await paginador.apaginate_queryset(queryset, request, view=self)
+        except NotFound as error:
+            return self.error(str(error.detail), status=404)
+        return self.responder({
+            'next': paginador.get_next_link(),
+            'previous': paginador.get_previous_link(),
+            'results': ValuesListMixin.construir_filas(pagina, mapeo),
+        })
+
+    def obtener_orden(self, request):
+        """Mismos términos que acepta OrderingFilter en el listado sync; los desconocidos se ignoran"""
+        valor = request.query_params.get('ordering')
+        if not valor:
+            return None
+        orden = [
+            termino.strip() for termino in valor.split(',')
+            if termino.strip().lstrip('-') in self.ordering_fields
+        ]
+        return orden or None
+
+
+class PlanillaAsyncDetailView(AsyncJsonView):
+    """Resumen de planilla, cacheado por versión igual que /api/planillas/<pk>/"""
+
+    async def get(self, request, pk):
+        try:
+            version = await Planilla.objects.values_list('version', flat=True).aget(pk=pk)
+        except Planilla.DoesNotExist:
+            return self.error('Planilla no encontrada', status=404)
+
+        async def construir():
+            planilla = await Planilla.objects.aget(pk=pk)
+            await aprefetch_related_objects(
+                [planilla], Prefetch('items', queryset=Item.objects.select_related('paquete'))
+            )
+            return dict(PlanillaResumenSerializer(planilla).data)
+
+        return self.responder(await ResumenPlanillaCache.aobtener(pk, version, construir))
+
+
+class MotivoAsyncListView(AsyncJsonView):
+    """Listado de motivos simples desde el catálogo en memoria, igual que /api/motivos/"""
+
+    async def get(self, request):
+        return self.responder(await CatalogoMotivos.aderivado(
+            'motivos-simples', lambda motivos: MotivoFalloSimpleSerializer(motivos, many=True).data
+        ))
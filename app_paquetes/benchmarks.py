@@ -0,0 +1,1044 @@
+"""
+Escenarios de benchmark sobre datos sinteticos.
+Se ejecutan con `python manage.py benchmark <escenario>`; todos los datos que
+generan se descartan al terminar (rollback).
+"""
+import time
+import uuid
+
+from django.core.exceptions import ValidationError
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext
+
+from .models import Cliente, Paquete, Planilla, Item
+from .utils.paquete_utils import PaqueteUtils
+
+ESCENARIOS = {}
+
+
+def escenario(nombre):
+    """Registra una funcion como escenario de benchmark"""
+    def decorador(funcion):
+        ESCENARIOS[nombre] = funcion
+        return funcion
+    return decorador
+
+
+def medir(funcion, *args, **kwargs):
+    """Ejecuta la funcion y devuelve (segundos, queries, resultado)"""
+    # el log de queries de la conexion tiene un tope; se vacia para poder contar
+    reset_queries()
+    with CaptureQueriesContext(connection) as queries:
+        inicio = time.perf_counter()
+        resultado = funcion(*args, **kwargs)
+        segundos = time.perf_counter() - inicio
+    return segundos, len(queries), resultado
+
+
+def crear_cliente():
+    return Cliente.objects.create(nombre=f'Benchmark {uuid.uuid4().hex[:8]}')
+
+
+def crear_paquetes(cliente, cantidad, peso=500.0, estado=Paquete.EstadoPaquete.EN_DEPOSITO):
+    """Crea paquetes sinteticos en bloque; el peso puede ser fijo o una funcion del indice"""
+    prefijo = uuid.uuid4().hex[:10]
+    paquetes = []
+    for i in range(cantidad):
+        peso_paquete = peso(i) if callable(peso) else peso
+        paquetes.append(Paquete(
+            tracking=f'BM{prefijo}{i:07d}',
+            direccion_destinatario=f'Calle {i}',
+            telefono_destinatario='000000',
+            nombre_destinatario=f'Destinatario {i}',
+            peso=peso_paquete,
+            altura=10.0,
+            estado=estado,
+            cliente=cliente,
+            tipo=PaqueteUtils.determinar_tipo_paquete(peso_paquete),
+        ))
+    return Paquete.objects.bulk_create(paquetes)
+
+
+def crear_planilla(paquetes):
+    """Crea una planilla con los paquetes dados como items"""
+    planilla = Planilla.objects.create(
+        numero_planilla=f'BM-{uuid.uuid4().hex[:12]}',
+        peso_total=sum(paquete.peso for paquete in paquetes),
+        item_count=len(paquetes),
+    )
+    Item.objects.bulk_create([
+        Item(planilla=planilla, paquete=paquete, posicion=i)
+        for i, paquete in enumerate(paquetes, start=1)
+    ])
+    return planilla
+
+
+def _distribuir_por_paquete(planilla):
+    """Implementacion original: recorre los items y guarda cada paquete"""
+    updated_count = 0
+    for item in planilla.items.all():
+        if item.paquete.estado == Paquete.EstadoPaquete.EN_DEPOSITO:
+            item.paquete.estado = Paquete.EstadoPaquete.EN_DISTRIBUCION
+            item.paquete.save()
+            updated_count += 1
+    return updated_count
+
+
+@escenario('distribucion')
+def benchmark_distribucion(tamanos=(100, 500, 2000)):
+    """Distribucion de una planilla: loop con save() por paquete vs UPDATE por conjunto"""
+    cliente = crear_cliente()
+    filas = []
+    for tamano in tamanos:
+        planilla = crear_planilla(crear_paquetes(cliente, tamano))
+        paquetes = Paquete.objects.filter(items__planilla=planilla)
+
+        for nombre, funcion in (
+            ('loop + save()', _distribuir_por_paquete),
+            ('UPDATE por conjunto', Planilla.marcar_paquetes_en_distribucion),
+        ):
+            paquetes.update(estado=Paquete.EstadoPaquete.EN_DEPOSITO)
+            segundos, queries, actualizados = medir(funcion, planilla)
+            filas.append({
+                'items': tamano,
+                'estrategia': nombre,
+                'actualizados': actualizados,
+                'queries': queries,
+                'ms': round(segundos * 1000, 2),
+            })
+    return filas
+
+
+@escenario('asignacion_bulk')
+def benchmark_asignacion_bulk(tamanos=(100, 1000, 5000)):
+    """Asignacion masiva de paquetes a una planilla vacia via PaqueteBulkAssignPlanillaView"""
+    from rest_framework.test import APIRequestFactory
+    from .views import PaqueteBulkAssignPlanillaView
+
+    factory = APIRequestFactory()
+    vista = PaqueteBulkAssignPlanillaView.as_view()
+    cliente = crear_cliente()
+    filas = []
+    for tamano in tamanos:
+        # paquetes livianos para no superar el limite de peso de la planilla
+        paquetes = crear_paquetes(cliente, tamano, peso=25000.0 / tamano)
+        planilla = crear_planilla([])
+        request = factory.post('/api/paquetes/bulk-assign-planilla/', {
+            'planilla_id': planilla.id,
+            'paquete_ids': [paquete.id for paquete in paquetes],
+        }, format='json')
+        segundos, queries, response = medir(vista, request)
+        filas.append({
+            'paquetes': tamano,
+            'status': response.status_code,
+            'items_creados': response.data.get('items_creados'),
+            'queries': queries,
+            'ms': round(segundos * 1000, 2),
+        })
+    return filas
+
+
+@escenario('empaquetado')
+def benchmark_empaquetado(tamanos=(1000, 10000, 50000)):
+    """Armado automático de planillas: estrategias ffd y bfd sobre pesos aleatorios"""
+    import random
+    from .utils.planilla_utils import PlanillaUtils
+
+    capacidad = PaqueteUtils.obtener_limites()['peso_planilla_max']
+    generador = random.Random(42)
+    filas = []
+    for tamano in tamanos:
+        pesos = [generador.uniform(50, 6000) for _ in range(tamano)]
+        for estrategia in PlanillaUtils.ESTRATEGIAS:
+            segundos, _, reparto = medir(PlanillaUtils.empaquetar, pesos, capacidad, estrategia)
+            metricas = PlanillaUtils.metricas(pesos, reparto, capacidad)
+            filas.append({
+                'paquetes': tamano,
+                'estrategia': estrategia,
+                'planillas': metricas['planillas'],
+                'cota_inferior': metricas['cota_inferior'],
+                'fill_ratio': metricas['fill_ratio'],
+                'ms': round(segundos * 1000, 2),
+            })
+
+    # armado completo contra la base, incluyendo la creacion en bloque de planillas e items
+    cliente = crear_cliente()
+    crear_paquetes(cliente, tamanos[-1], peso=lambda i: 50 + (i * 7919) % 5950)
+    segundos, queries, resultado = medir(PlanillaUtils.armar_planillas, cliente=cliente.id)
+    filas.append({
+        'paquetes': resultado['paquetes'],
+        'estrategia': 'armar_planillas (bfd)',
+        'planillas': resultado['planillas'],
+        'cota_inferior': resultado['cota_inferior'],
+        'fill_ratio': resultado['fill_ratio'],
+        'ms': round(segundos * 1000, 2),
+    })
+    return filas
+
+
+@escenario('clasificacion')
+def benchmark_clasificacion(tamanos=(1000, 100000)):
+    """Clasificación de tipo: uno por uno vs por lote, y reclasificación en la base"""
+    import random
+
+    generador = random.Random(7)
+    filas = []
+    for tamano in tamanos:
+        pesos = [generador.uniform(1, 25000) for _ in range(tamano)]
+        for nombre, funcion in (
+            ('determinar_tipo_paquete x n', lambda: [PaqueteUtils.determinar_tipo_paquete(p) for p in pesos]),
+            ('determinar_tipos', lambda: PaqueteUtils.determinar_tipos(pesos)),
+        ):
+            segundos, _, _ = medir(funcion)
+            filas.append({'paquetes': tamano, 'operacion': nombre, 'queries': 0, 'ms': round(segundos * 1000, 2)})
+
+    cliente = crear_cliente()
+    paquetes = crear_paquetes(cliente, tamanos[-1], peso=lambda i: 1 + (i * 37) % 24999)
+    Paquete.objects.filter(cliente=cliente).update(tipo='P')
+    segundos, queries, actualizados = medir(PaqueteUtils.reclasificar_tipos)
+    filas.append({
+        'paquetes': len(paquetes),
+        'operacion': f'reclasificar_tipos ({actualizados} cambios)',
+        'queries': queries,
+        'ms': round(segundos * 1000, 2),
+    })
+    return filas
+
+
+def _validacion_por_join(item):
+    """Validación original: join de items por planilla filtrando por estado"""
+    if item.paquete.estado != Paquete.EstadoPaquete.EN_DEPOSITO:
+        return False
+    return Item.objects.filter(
+        paquete=item.paquete,
+        planilla__items__paquete__estado=Paquete.EstadoPaquete.EN_DEPOSITO
+    ).exclude(id=item.id).exists()
+
+
+@escenario('unicidad')
+def benchmark_unicidad(tamanos=(10, 100, 1000, 5000), repeticiones=200):
+    """Chequeo de 'paquete en otra planilla activa' a medida que crece la planilla"""
+    cliente = crear_cliente()
+    filas = []
+    for tamano in tamanos:
+        paquetes = crear_paquetes(cliente, tamano, peso=1.0)
+        crear_planilla(paquetes)
+        # el resto de la planilla ya salio a distribucion: el join tiene que recorrerla
+        Paquete.objects.filter(id__in=[paquete.id for paquete in paquetes[1:]]).update(
+            estado=Paquete.EstadoPaquete.EN_DISTRIBUCION
+        )
+        # item nuevo (sin guardar) para un paquete que ya esta en la planilla
+        item = Item(planilla=Planilla(), paquete=paquetes[0], posicion=1)
+        for nombre, funcion in (
+            ('join por planilla', lambda: _validacion_por_join(item)),
+            ('indice parcial activo', lambda: item.validar_paquete_unico_en_planilla()),
+        ):
+            def repetir():
+                for _ in range(repeticiones):
+                    try:
+                        funcion()
+                    except ValidationError:
+                        pass
+            segundos, queries, _ = medir(repetir)
+            filas.append({
+                'items_planilla': tamano,
+                'chequeo': nombre,
+                'queries_por_chequeo': queries // repeticiones,
+                'us_por_chequeo': round(segundos * 1e6 / repeticiones, 1),
+            })
+    return filas
+
+
+@escenario('exportacion')
+def benchmark_exportacion(tamanos=(10000, 50000, 200000)):
+    """Exportación por streaming: tiempo y pico de memoria al consumir la respuesta completa"""
+    import tracemalloc
+    from rest_framework.test import APIRequestFactory
+    from .views import PaqueteExportView
+
+    factory = APIRequestFactory()
+    vista = PaqueteExportView.as_view()
+    cliente = crear_cliente()
+    creados = 0
+    filas = []
+    for tamano in tamanos:
+        crear_paquetes(cliente, tamano - creados)
+        creados = tamano
+        for formato in ('csv', 'ndjson'):
+            def exportar():
+                request = factory.get('/api/paquetes/export/', {'formato': formato, 'cliente': cliente.id})
+                return sum(len(parte) for parte in vista(request).streaming_content)
+
+            # tracemalloc ralentiza mucho la ejecución: tiempo y memoria se miden en pasadas separadas
+            inicio = time.perf_counter()
+            total_bytes = exportar()
+            segundos = time.perf_counter() - inicio
+            tracemalloc.start()
+            exportar()
+            _, pico = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            filas.append({
+                'filas': tamano,
+                'formato': formato,
+                'MB_generados': round(total_bytes / 1e6, 1),
+                'pico_memoria_KB': round(pico / 1024),
+                'ms': round(segundos * 1000),
+                'us_por_fila': round(segundos * 1e6 / tamano, 2),
+            })
+    return filas
+
+
+@escenario('listado_rapido')
+def benchmark_listado_rapido(tamanos=(1000, 10000, 100000)):
+    """Listado de paquetes: ModelSerializer vs modo rápido desde .values() vs queryset crudo"""
+    from rest_framework.renderers import JSONRenderer
+    from .mixins import ValuesListMixin
+    from .serializers import PaqueteSerializer
+
+    renderer = JSONRenderer()
+    cliente = crear_cliente()
+    creados = 0
+    filas = []
+    for tamano in tamanos:
+        crear_paquetes(cliente, tamano - creados, peso=lambda i: 100.0 + i % 5000)
+        creados = tamano
+        queryset = Paquete.objects.filter(cliente=cliente).order_by('id')
+
+        estrategias = (
+            ('ModelSerializer', lambda: renderer.render(PaqueteSerializer(queryset, many=True).data)),
+            ('modo rapido (.values)', lambda: renderer.render(
+                ValuesListMixin.serializar_valores(queryset, PaqueteSerializer)
+            )),
+            ('queryset crudo (.values)', lambda: renderer.render(list(queryset.values()))),
+        )
+        referencia = None
+        for nombre, funcion in estrategias:
+            segundos, queries, salida = medir(funcion)
+            referencia = salida if referencia is None else referencia
+            filas.append({
+                'filas': tamano,
+                'estrategia': nombre,
+                'queries': queries,
+                'ms': round(segundos * 1000, 1),
+                'us_por_fila': round(segundos * 1e6 / tamano, 2),
+                'mismo_json': salida == referencia,
+            })
+    return filas
+
+
+@escenario('busqueda')
+def benchmark_busqueda(tamanos=(10000, 100000), repeticiones=20):
+    """
+    Búsqueda de paquetes: LIKE '%termino%' (SearchFilter) vs índice FTS5 trigram, con un
+    término selectivo (fragmento de tracking) y otro que coincide con casi todas las filas
+    """
+    from functools import reduce
+    from operator import or_
+    from django.db.models import F, Q
+    from .utils.busqueda_utils import BusquedaUtils
+
+    if not BusquedaUtils.disponible():
+        return [{'error': 'la base no tiene el índice FTS5 de paquetes'}]
+
+    campos = BusquedaUtils.COLUMNAS
+    cliente = crear_cliente()
+    paquetes = []
+    filas = []
+    for tamano in tamanos:
+        paquetes += crear_paquetes(cliente, tamano - len(paquetes))
+        busquedas = (
+            ('fragmento de tracking', [paquetes[tamano // 3].tracking[-9:]]),
+            ('nombre poco selectivo', ['Destinatario', str(tamano // 3)]),
+        )
+        for descripcion, terminos in busquedas:
+            consulta = BusquedaUtils.consulta(terminos)
+            estrategias = (
+                ('LIKE', lambda: list(Paquete.objects.filter(*[
+                    reduce(or_, [Q(**{f'{campo}__icontains': termino}) for campo in campos])
+                    for termino in terminos
+                ]).order_by('-tracking')[:100])),
+                ('FTS5 trigram + bm25', lambda: list(Paquete.objects.filter(
+                    busqueda__documento__match=consulta
+                ).annotate(relevancia=F('busqueda__rank')).order_by('relevancia')[:100])),
+            )
+            for nombre, funcion in estrategias:
+                segundos, queries, resultado = medir(lambda: [funcion() for _ in range(repeticiones)])
+                filas.append({
+                    'paquetes': tamano,
+                    'busqueda': descripcion,
+                    'estrategia': nombre,
+                    'resultados': len(resultado[0]),
+                    'queries': queries // repeticiones,
+                    'ms_por_busqueda': round(segundos * 1000 / repeticiones, 2),
+                })
+    return filas
+
+
+@escenario('lookup')
+def benchmark_lookup(tamanos=(1000, 10000, 50000)):
+    """Consulta por tracking vía paquetes/lookup/: un pedido con N trackings (10% desconocidos)"""
+    from rest_framework.test import APIRequestFactory
+    from .views import PaqueteLookupView
+
+    factory = APIRequestFactory()
+    vista = PaqueteLookupView.as_view()
+    cliente = crear_cliente()
+    paquetes = crear_paquetes(cliente, max(tamanos))
+    # la mitad de los paquetes en alguna planilla
+    for inicio in range(0, len(paquetes) // 2, 50):
+        crear_planilla(paquetes[inicio:inicio + 50])
+
+    filas = []
+    for tamano in tamanos:
+        conocidos = tamano - tamano // 10
+        trackings = [p.tracking for p in paquetes[:conocidos]]
+        trackings += [f'DESCONOCIDO{i:07d}' for i in range(tamano - conocidos)]
+        request = factory.post('/api/paquetes/lookup/', {'trackings': trackings}, format='json')
+        segundos, queries, response = medir(lambda: vista(request).render())
+        filas.append({
+            'trackings': tamano,
+            'status': response.status_code,
+            'encontrados': len(response.data['paquetes']),
+            'desconocidos': len(response.data['desconocidos']),
+            'queries': queries,
+            'ms': round(segundos * 1000, 1),
+            'us_por_tracking': round(segundos * 1e6 / tamano, 2),
+        })
+    return filas
+
+
+@escenario('contadores')
+def benchmark_contadores(tamanos=(10000, 100000), clientes=20, repeticiones=20):
+    """Paquetes por cliente, estado y tipo: COUNT sobre la tabla vs contadores mantenidos"""
+    from django.db.models import Count
+    from .models import ContadorPaquetes
+
+    lista_clientes = [crear_cliente() for _ in range(clientes)]
+    creados = 0
+    filas = []
+    for tamano in tamanos:
+        por_cliente = (tamano - creados) // clientes
+        for cliente in lista_clientes:
+            ContadorPaquetes.registrar_altas(
+                crear_paquetes(cliente, por_cliente, peso=lambda i: 100.0 + (i * 37) % 5000)
+            )
+        creados = tamano
+
+        estrategias = (
+            ('COUNT agrupado sobre paquetes', lambda: list(
+                Paquete.objects.order_by().values('cliente', 'estado', 'tipo').annotate(cantidad=Count('id'))
+            )),
+            ('contadores', lambda: list(
+                ContadorPaquetes.objects.filter(cantidad__gt=0).values('cliente', 'estado', 'tipo', 'cantidad')
+            )),
+        )
+        for nombre, funcion in estrategias:
+            segundos, queries, resultado = medir(lambda: [funcion() for _ in range(repeticiones)])
+            filas.append({
+                'paquetes': tamano,
+                'estrategia': nombre,
+                'grupos': len(resultado[0]),
+                'queries': queries // repeticiones,
+                'ms_por_consulta': round(segundos * 1000 / repeticiones, 2),
+            })
+    return filas
+
+
+@escenario('reportes')
+def benchmark_reportes(tamanos=(10000, 100000), clientes=20, dias=90, repeticiones=20):
+    """
+    Reporte por cliente de los últimos 30 días a medida que crecen paquetes y registro:
+    lectura de resúmenes diarios (endpoint) vs agregación del registro en cada consulta
+    """
+    import random
+    from datetime import timedelta
+    from django.db.models import Sum
+    from django.utils import timezone
+    from rest_framework.test import APIRequestFactory
+    from .models import RegistroCambio
+    from .utils.reporte_utils import ReporteUtils
+    from .views import ReporteClientesView
+
+    generador = random.Random(42)
+    hoy = timezone.localdate()
+    factory = APIRequestFactory()
+    vista = ReporteClientesView.as_view()
+    lista_clientes = [crear_cliente() for _ in range(clientes)]
+    ReporteUtils.procesar_registro()
+
+    creados = 0
+    filas = []
+    for tamano in tamanos:
+        eventos = []
+        for i in range(tamano - creados):
+            cliente = lista_clientes[i % clientes]
+            fecha = hoy - timedelta(days=generador.randrange(dias))
+            eventos.append(RegistroCambio(fecha=fecha, evento=RegistroCambio.Evento.INGRESO, cliente=cliente, cantidad=1, peso=500))
+            if i % 2:
+                eventos.append(RegistroCambio(
+                    fecha=fecha, evento=RegistroCambio.Evento.DISTRIBUCION, cliente=cliente, cantidad=1, peso=500
+                ))
+        crear_paquetes(lista_clientes[0], tamano - creados)
+        RegistroCambio.objects.bulk_create(eventos, batch_size=2000)
+        creados = tamano
+        segundos_proceso, _, procesados = medir(ReporteUtils.procesar_registro)
+
+        desde = hoy - timedelta(days=29)
+        estrategias = (
+            ('resúmenes diarios (endpoint)', lambda: vista(factory.get('/api/reportes/clientes/')).render()),
+            ('agregación del registro', lambda: list(
+                RegistroCambio.objects.filter(fecha__range=(desde, hoy)).order_by().values(
+                    'fecha', 'cliente_id', 'evento'
+                ).annotate(cantidad=Sum('cantidad'), peso=Sum('peso'))
+            )),
+        )
+        for nombre, funcion in estrategias:
+            segundos, queries, _ = medir(lambda: [funcion() for _ in range(repeticiones)])
+            filas.append({
+                'paquetes': tamano,
+                'eventos_registro': RegistroCambio.objects.count(),
+                'estrategia': nombre,
+                'queries': queries // repeticiones,
+                'ms_por_reporte': round(segundos * 1000 / repeticiones, 2),
+                'ms_proceso_incremental': round(segundos_proceso * 1000, 1),
+                'eventos_procesados': procesados,
+            })
+    return filas
+
+
+@escenario('motivos_compuestos')
+def benchmark_motivos_compuestos(tamanos=(50, 200), miembros=4):
+    """Listado de motivos compuestos: recorrido recursivo por request vs clausura desnormalizada"""
+    from .models import MotivoFalloCompuesto, MotivoFalloSimple
+    from .serializers import MotivoFalloCompuestoSerializer
+
+    def codigo_recursivo(compuesto):
+        # la implementación original: consulta los miembros en cada nivel
+        return "".join(
+            [motivo.get_codigo() for motivo in compuesto.motivos.all()]
+            + [codigo_recursivo(hijo) for hijo in compuesto.submotivos.all()]
+        )
+
+    def activo_recursivo(compuesto):
+        return all(motivo.is_active() for motivo in compuesto.motivos.all()) and all(
+            activo_recursivo(hijo) for hijo in compuesto.submotivos.all()
+        )
+
+    simples = [
+        MotivoFalloSimple.objects.create(codigo=f'S{i}', nombre=f'Simple {i}', descripcion='benchmark')
+        for i in range(20)
+    ]
+    compuestos = []
+    filas = []
+    for tamano in tamanos:
+        while len(compuestos) < tamano:
+            compuesto = MotivoFalloCompuesto.objects.create()
+            compuesto.motivos.add(*simples[len(compuestos) % 16:len(compuestos) % 16 + miembros])
+            if compuestos:
+                # cada compuesto contiene al anterior: árbol de profundidad creciente acotada
+                compuesto.submotivos.add(compuestos[-1] if len(compuestos) % 5 else compuestos[0])
+            compuestos.append(compuesto)
+
+        queryset = MotivoFalloCompuesto.objects.filter(id__in=[c.id for c in compuestos])
+        estrategias = (
+            ('recorrido recursivo', lambda: [
+                (codigo_recursivo(c), activo_recursivo(c)) for c in queryset
+            ]),
+            ('clausura desnormalizada', lambda: MotivoFalloCompuestoSerializer(
+                queryset.prefetch_related('clausura'), many=True
+            ).data),
+        )
+        for nombre, funcion in estrategias:
+            segundos, queries, _ = medir(funcion)
+            filas.append({
+                'compuestos': tamano,
+                'estrategia': nombre,
+                'queries': queries,
+                'ms': round(segundos * 1000, 1),
+            })
+    return filas
+
+
+@escenario('catalogo_motivos')
+def benchmark_catalogo_motivos(repeticiones=1000, motivos=50):
+    """Listado y validación de motivos: consulta por request vs catálogo versionado en memoria"""
+    from django.test import override_settings
+    from rest_framework.test import APIRequestFactory
+    from .models import MotivoFalloSimple
+    from .serializers import MotivoFalloSimpleSerializer
+    from .utils.cache_utils import CatalogoMotivos
+    from .views import MotivoSimpleListView
+
+    creados = [
+        MotivoFalloSimple.objects.create(codigo=f'C{i}', nombre=f'Motivo {i}', descripcion='benchmark')
+        for i in range(motivos)
+    ]
+    factory = APIRequestFactory()
+    vista = MotivoSimpleListView.as_view()
+    ids = [motivo.id for motivo in creados]
+
+    estrategias = (
+        ('listado: consulta + serializer', lambda: [
+            MotivoFalloSimpleSerializer(MotivoFalloSimple.objects.all(), many=True).data for _ in range(repeticiones)
+        ], 0),
+        ('listado: catálogo (TTL 0)', lambda: [
+            vista(factory.get('/api/motivos/')).data for _ in range(repeticiones)
+        ], 0),
+        ('listado: catálogo (TTL 30s)', lambda: [
+            vista(factory.get('/api/motivos/')).data for _ in range(repeticiones)
+        ], 30),
+        ('validación: get + is_active', lambda: [
+            MotivoFalloSimple.objects.get(id=ids[i % motivos]).is_active() for i in range(repeticiones)
+        ], 0),
+        ('validación: catálogo', lambda: [
+            CatalogoMotivos.simple_activo(ids[i % motivos]) for i in range(repeticiones)
+        ], 0),
+    )
+    filas = []
+    for nombre, funcion, ttl in estrategias:
+        with override_settings(PAQUETES_CATALOGO_MOTIVOS_TTL=ttl):
+            segundos, queries, _ = medir(funcion)
+        filas.append({
+            'estrategia': nombre,
+            'queries': queries,
+            'us_por_operacion': round(segundos * 1e6 / repeticiones, 1),
+        })
+    return filas
+
+
+@escenario('asignacion_motivos')
+def benchmark_asignacion_motivos(tamanos=(500, 2000), motivos=8):
+    """Cierre de un recorrido: un PATCH por ítem vs bulk_update vs UPDATE por motivo (endpoint masivo)"""
+    from django.db import transaction
+    from rest_framework.test import APIRequestFactory
+    from .models import MotivoFalloSimple
+    from .views import ItemAssignMotivoFalloView, ItemBulkAssignMotivoView
+
+    creados = [
+        MotivoFalloSimple.objects.create(codigo=f'R{i}', nombre=f'Motivo {i}', descripcion='benchmark')
+        for i in range(motivos)
+    ]
+    factory = APIRequestFactory()
+    individual = ItemAssignMotivoFalloView.as_view()
+    masiva = ItemBulkAssignMotivoView.as_view()
+
+    def por_item(items):
+        for i, item in enumerate(items):
+            individual(
+                factory.patch(f'/api/items/{item.id}/assign-motivo/', {'motivo_fallo_id': creados[i % motivos].id}, format='json'),
+                pk=item.id,
+            )
+
+    def por_bulk_update(items):
+        with transaction.atomic():
+            for i, item in enumerate(items):
+                item.motivo_fallo_id = creados[i % motivos].id
+            Item.objects.bulk_update(items, ['motivo_fallo'], batch_size=500)
+
+    def endpoint_masivo(items):
+        masiva(factory.post('/api/items/bulk-assign-motivo/', {'asignaciones': [
+            {'item_id': item.id, 'motivo_fallo_id': creados[i % motivos].id} for i, item in enumerate(items)
+        ]}, format='json'))
+
+    cliente = crear_cliente()
+    filas = []
+    for tamano in tamanos:
+        for nombre, funcion in (
+            ('un request por ítem', por_item),
+            ('bulk_update (solo el UPDATE)', por_bulk_update),
+            ('endpoint masivo', endpoint_masivo),
+        ):
+            planilla = crear_planilla(crear_paquetes(cliente, tamano, peso=10.0))
+            items = list(Item.objects.filter(planilla=planilla).only('id', 'planilla_id', 'motivo_fallo_id'))
+            segundos, queries, _ = medir(funcion, items)
+            filas.append({
+                'items': tamano,
+                'estrategia': nombre,
+                'queries': queries,
+                'ms': round(segundos * 1000, 1),
+            })
+    return filas
+
+
+def _copiar_esquema(ruta):
+    """Crea en un archivo SQLite nuevo las tablas, índices y triggers de la base actual"""
+    import sqlite3
+    from .utils.busqueda_utils import BusquedaUtils
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT type, name, sql FROM sqlite_master WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%'")
+        objetos = cursor.fetchall()
+    orden = {'table': 0, 'index': 1, 'trigger': 2}
+    destino = sqlite3.connect(ruta)
+    for tipo, nombre, sql in sorted(objetos, key=lambda objeto: orden.get(objeto[0], 3)):
+        # las tablas internas del índice FTS5 las crea su tabla virtual
+        if tipo == 'table' and nombre.startswith(BusquedaUtils.TABLA + '_'):
+            continue
+        destino.execute(sql)
+    destino.commit()
+    destino.close()
+
+
+def _registrar_alias(alias, nombre, opciones):
+    import copy
+    from django.db import connections
+
+    configuracion = copy.deepcopy(connections.settings['default'])
+    configuracion.update(NAME=nombre, OPTIONS=opciones, CONN_MAX_AGE=None, TEST={'MIRROR': None})
+    connections.settings[alias] = configuracion
+
+
+@escenario('contencion')
+def benchmark_contencion(lectores=8, escritores=4, segundos=3.0, planillas=200, por_planilla=50):
+    """
+    Lectores (página del listado + detalle de planilla) y escritores (transacción que lee
+    la planilla y después distribuye sus paquetes) en threads sobre un archivo SQLite
+    temporal con el esquema actual: journal por defecto vs perfil WAL/IMMEDIATE de
+    settings, con y sin la conexión de solo lectura
+    """
+    import random
+    import shutil
+    import tempfile
+    import threading
+    from django.conf import settings
+    from django.db import OperationalError, connections, transaction
+    from django.db.models import F
+    from .models import RegistroCambio
+
+    directorio = tempfile.mkdtemp(prefix='contencion-')
+    ruta = f'{directorio}/contencion.sqlite3'
+    _copiar_esquema(ruta)
+
+    _registrar_alias('contencion', ruta, {})
+    try:
+        cliente = Cliente(nombre='Contención')
+        Cliente.objects.using('contencion').bulk_create([cliente])
+        cliente = Cliente.objects.using('contencion').get()
+        paquetes = Paquete.objects.using('contencion').bulk_create([
+            Paquete(
+                tracking=f'CT{i:08d}', direccion_destinatario='Calle 123', telefono_destinatario='1234',
+                nombre_destinatario=f'Destinatario {i}', peso=10.0, altura=10.0, cliente_id=cliente.id, tipo='P'
+            )
+            for i in range(planillas * por_planilla)
+        ], batch_size=2000)
+        creadas = Planilla.objects.using('contencion').bulk_create([
+            Planilla(numero_planilla=f'CT-{i:05d}', peso_total=10.0 * por_planilla, item_count=por_planilla)
+            for i in range(planillas)
+        ])
+        Item.objects.using('contencion').bulk_create([
+            Item(planilla_id=planilla.id, paquete_id=paquete.id, posicion=posicion)
+            for numero, planilla in enumerate(creadas)
+            for posicion, paquete in enumerate(paquetes[numero * por_planilla:(numero + 1) * por_planilla], start=1)
+        ], batch_size=2000)
+        planilla_ids = [planilla.id for planilla in creadas]
+    finally:
+        connections['contencion'].close()
+        del connections['contencion']
+
+    def leer(alias, aleatorio):
+        list(Paquete.objects.using(alias).order_by('-tracking').values('id', 'tracking', 'estado')[:100])
+        list(Item.objects.using(alias).filter(planilla_id=aleatorio.choice(planilla_ids)).select_related('paquete'))
+
+    def escribir(alias, aleatorio):
+        planilla_id = aleatorio.choice(planilla_ids)
+        estado = aleatorio.choice(Paquete.EstadoPaquete.values)
+        with transaction.atomic(using=alias):
+            # lectura y después escritura, como Item.save o la distribución
+            Planilla.objects.using(alias).filter(pk=planilla_id).values_list('version', flat=True).first()
+            cantidad = Paquete.objects.using(alias).filter(items__planilla_id=planilla_id).update(estado=estado)
+            Planilla.objects.using(alias).filter(pk=planilla_id).update(version=F('version') + 1)
+            RegistroCambio.objects.using(alias).create(
+                evento=RegistroCambio.Evento.DISTRIBUCION, cliente_id=cliente.id, cantidad=cantidad
+            )
+
+    def trabajar(operacion, alias, fin, latencias, errores, semilla):
+        aleatorio = random.Random(semilla)
+        try:
+            while time.perf_counter() < fin:
+                inicio = time.perf_counter()
+                try:
+                    operacion(alias, aleatorio)
+                    latencias.append(time.perf_counter() - inicio)
+                except OperationalError:
+                    errores.append(time.perf_counter() - inicio)
+        finally:
+            connections.close_all()
+
+    def p99(latencias):
+        latencias = sorted(latencias)
+        return round(latencias[int(len(latencias) * 0.99)] * 1000, 1) if latencias else None
+
+    opciones = settings.DATABASES['default']['OPTIONS']
+    opciones_lectura = settings.DATABASES.get('lectura', {}).get('OPTIONS', {})
+    perfiles = (
+        ('journal por defecto, DEFERRED', {'init_command': 'PRAGMA journal_mode=DELETE'}, None),
+        ('WAL + pragmas, IMMEDIATE', opciones, None),
+        ('WAL + IMMEDIATE + conexión de lectura', opciones, opciones_lectura),
+    )
+    filas = []
+    try:
+        for nombre, opciones_escritura, opciones_solo_lectura in perfiles:
+            _registrar_alias('contencion', ruta, opciones_escritura)
+            alias_lectura = 'contencion'
+            if opciones_solo_lectura is not None:
+                _registrar_alias('contencion_lectura', f'file:{ruta}?mode=ro', opciones_solo_lectura)
+                alias_lectura = 'contencion_lectura'
+
+            lecturas, escrituras, errores_lectura, errores_escritura = [], [], [], []
+            fin = time.perf_counter() + segundos
+            hilos = [
+                threading.Thread(target=trabajar, args=(leer, alias_lectura, fin, lecturas, errores_lectura, i))
+                for i in range(lectores)
+            ] + [
+                threading.Thread(target=trabajar, args=(escribir, 'contencion', fin, escrituras, errores_escritura, i))
+                for i in range(escritores)
+            ]
+            for hilo in hilos:
+                hilo.start()
+            for hilo in hilos:
+                hilo.join()
+
+            filas.append({
+                'perfil': nombre,
+                'lecturas_s': round(len(lecturas) / segundos, 1),
+                'p99_lectura_ms': p99(lecturas),
+                'escrituras_s': round(len(escrituras) / segundos, 1),
+                'p99_escritura_ms': p99(escrituras),
+                'locked': len(errores_lectura) + len(errores_escritura),
+            })
+    finally:
+        for alias in ('contencion', 'contencion_lectura'):
+            connections.settings.pop(alias, None)
+        shutil.rmtree(directorio, ignore_errors=True)
+    return filas
+
+
+@escenario('group_commit')
+def benchmark_group_commit(clientes=(16, 64), segundos=3.0, items=5000):
+    """
+    Escrituras chicas concurrentes (alta de paquete y motivo de fallo de un ítem) desde
+    threads sobre un archivo SQLite temporal con el perfil de settings: un commit por
+    operación vs la cola de group commit
+    """
+    import copy
+    import random
+    import shutil
+    import tempfile
+    import threading
+    from django.db import OperationalError, connections
+    from .models import MotivoFalloSimple
+    from .utils.escritura_utils import ColaEscritura
+
+    directorio = tempfile.mkdtemp(prefix='group-commit-')
+    ruta = f'{directorio}/group_commit.sqlite3'
+    _copiar_esquema(ruta)
+
+    # los threads nuevos abren default sobre el archivo temporal; la conexión de este
+    # thread (dentro de la transacción del benchmark) no cambia
+    original = connections.settings['default']
+    temporal = copy.deepcopy(original)
+    temporal['NAME'] = ruta
+    connections.settings['default'] = temporal
+
+    def en_thread(funcion):
+        resultado = []
+        def correr():
+            try:
+                resultado.append(funcion())
+            finally:
+                connections.close_all()
+        hilo = threading.Thread(target=correr)
+        hilo.start()
+        hilo.join()
+        return resultado[0]
+
+    def preparar():
+        cliente = Cliente.objects.create(nombre='Group commit')
+        motivos = MotivoFalloSimple.objects.bulk_create([
+            MotivoFalloSimple(codigo=f'G{i}', nombre=f'Motivo {i}', descripcion='benchmark') for i in range(5)
+        ])
+        planilla = Planilla.objects.create(numero_planilla='GC-1', peso_total=0, item_count=items)
+        paquetes = Paquete.objects.bulk_create([
+            Paquete(
+                tracking=f'GC{i:08d}', direccion_destinatario='Calle 123', telefono_destinatario='1234',
+                nombre_destinatario=f'Destinatario {i}', peso=1.0, altura=10.0, cliente=cliente, tipo='P'
+            )
+            for i in range(items)
+        ], batch_size=2000)
+        creados = Item.objects.bulk_create([
+            Item(planilla=planilla, paquete=paquete, posicion=i) for i, paquete in enumerate(paquetes, start=1)
+        ], batch_size=2000)
+        return cliente, [motivo.id for motivo in motivos], list(Item.objects.filter(id__in=[item.id for item in creados]))
+
+    filas = []
+    try:
+        cliente, motivo_ids, todos_los_items = en_thread(preparar)
+        contador = iter(range(10 ** 9))
+
+        def operacion(aleatorio):
+            if aleatorio.random() < 0.5:
+                numero = next(contador)
+                paquete = Paquete(
+                    tracking=f'GN{numero:09d}', direccion_destinatario='Calle 123', telefono_destinatario='1234',
+                    nombre_destinatario='Nuevo', peso=500.0, altura=10.0, cliente_id=cliente.id
+                )
+                return paquete.save
+            item = aleatorio.choice(todos_los_items)
+            item = Item(id=item.id, planilla_id=item.planilla_id, paquete_id=item.paquete_id, posicion=item.posicion)
+            item.motivo_fallo_id = aleatorio.choice(motivo_ids)
+            return item.save
+
+        def cliente_http(ejecutar, fin, latencias, errores, semilla):
+            aleatorio = random.Random(semilla)
+            try:
+                while time.perf_counter() < fin:
+                    escritura = operacion(aleatorio)
+                    inicio = time.perf_counter()
+                    try:
+                        ejecutar(escritura)
+                        latencias.append(time.perf_counter() - inicio)
+                    except OperationalError:
+                        errores.append(time.perf_counter() - inicio)
+            finally:
+                connections.close_all()
+
+        def percentil(latencias, p):
+            latencias = sorted(latencias)
+            return round(latencias[int(len(latencias) * p)] * 1000, 1) if latencias else None
+
+        combinaciones = [
+            (sincronico, cantidad, nombre, espera_ms)
+            for sincronico in ('NORMAL', 'FULL')
+            for cantidad in clientes
+            for nombre, espera_ms in (
+                ('commit por operación', None), ('group commit, espera 0', 0), ('group commit, espera 2ms', 2)
+            )
+        ]
+        for sincronico, cantidad, nombre, espera_ms in combinaciones:
+            # con FULL cada commit espera el fsync: es donde más rinde agrupar
+            temporal['OPTIONS'] = {
+                **original['OPTIONS'],
+                'init_command': original['OPTIONS'].get('init_command', '') + f'PRAGMA synchronous={sincronico};',
+            }
+            cola = None
+            if espera_ms is None:
+                ejecutar = lambda escritura: escritura()
+            else:
+                cola = ColaEscritura(espera_ms=espera_ms)
+                ejecutar = lambda escritura, cola=cola: cola.encolar(escritura).result()
+            latencias, errores = [], []
+            fin = time.perf_counter() + segundos
+            hilos = [
+                threading.Thread(target=cliente_http, args=(ejecutar, fin, latencias, errores, i))
+                for i in range(cantidad)
+            ]
+            for hilo in hilos:
+                hilo.start()
+            for hilo in hilos:
+                hilo.join()
+            if cola is not None:
+                cola.detener()
+
+            filas.append({
+                'synchronous': sincronico,
+                'clientes': cantidad,
+                'estrategia': nombre,
+                'ops_s': round(len(latencias) / segundos, 1),
+                'p50_ms': percentil(latencias, 0.5),
+                'p99_ms': percentil(latencias, 0.99),
+                'errores': len(errores),
+                'ops_por_lote': cola.estadisticas()['operaciones_por_lote'] if cola else 1,
+            })
+    finally:
+        connections.settings['default'] = original
+        shutil.rmtree(directorio, ignore_errors=True)
+    return filas
+
+
+@escenario('indices')
+def benchmark_indices(clientes=10, por_cliente=10000, repeticiones=20):
+    """
+    Consultas del listado de paquetes (primera página con los filtros frecuentes y el orden
+    del modelo) y de los items de una planilla, con su plan. Comparar contra la base sin
+    los índices compuestos con `migrate app_paquetes 0012` (y volver con `migrate`)
+    """
+    creados = [crear_cliente() for _ in range(clientes)]
+    for cliente in creados:
+        paquetes = crear_paquetes(cliente, por_cliente, peso=lambda i: 100.0 + i % 5000)
+        Paquete.objects.filter(id__in=[p.id for p in paquetes[::2]]).update(
+            estado=Paquete.EstadoPaquete.EN_DISTRIBUCION
+        )
+    planilla = crear_planilla(paquetes[:50])
+    cliente_id = creados[0].id
+    en_deposito = Paquete.EstadoPaquete.EN_DEPOSITO
+
+    casos = (
+        ('?estado', Paquete.objects.filter(estado=en_deposito).order_by('-tracking')[:101]),
+        ('?cliente', Paquete.objects.filter(cliente_id=cliente_id).order_by('-tracking')[:101]),
+        ('?cliente&estado', Paquete.objects.filter(cliente_id=cliente_id, estado=en_deposito).order_by('-tracking')[:101]),
+        ('orden del modelo', Paquete.objects.all()[:101]),
+        ('items de planilla', Item.objects.filter(planilla=planilla).order_by('posicion')),
+    )
+    filas = []
+    for nombre, queryset in casos:
+        segundos = min(medir(lambda: list(queryset._chain()))[0] for _ in range(repeticiones))
+        with connection.cursor() as cursor:
+            sql, params = queryset.query.sql_with_params()
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' | '.join(fila[3] for fila in cursor.fetchall())
+        filas.append({
+            'consulta': nombre,
+            'paquetes': clientes * por_cliente,
+            'ms': round(segundos * 1000, 2),
+            'plan': plan,
+        })
+    return filas
+
+
+@escenario('instrumentacion')
+def benchmark_instrumentacion(consultas=(1, 10, 100), repeticiones=300):
+    """
+    Costo de InstrumentacionSQLMiddleware: la misma vista (N lecturas por pk) llamada
+    directamente y a través del middleware, alternadas. Mediana de las repeticiones
+    """
+    import statistics
+
+    from django.http import HttpResponse
+    from django.test import RequestFactory, override_settings
+    from django.urls import resolve
+    from .middleware import InstrumentacionSQLMiddleware
+    from .utils.instrumentacion_utils import EstadisticasSQL
+
+    cliente = crear_cliente()
+    ids = [paquete.id for paquete in crear_paquetes(cliente, 100)]
+    request = RequestFactory().get('/api/paquetes/')
+    request.resolver_match = resolve('/api/paquetes/')
+
+    filas = []
+    for cantidad in consultas:
+        def vista(request, cantidad=cantidad):
+            for i in range(cantidad):
+                Paquete.objects.filter(pk=ids[i % len(ids)]).values_list('id', flat=True).first()
+            return HttpResponse()
+
+        with override_settings(PAQUETES_INSTRUMENTACION_SQL=True):
+            middleware = InstrumentacionSQLMiddleware(vista)
+        # las dos variantes se alternan para que el ruido de la máquina afecte a ambas por igual
+        muestras = {'sin middleware': [], 'con middleware': []}
+        for _ in range(repeticiones):
+            for nombre, funcion in (('sin middleware', vista), ('con middleware', middleware)):
+                inicio = time.perf_counter()
+                funcion(request)
+                muestras[nombre].append(time.perf_counter() - inicio)
+        tiempos = {nombre: statistics.median(valores) for nombre, valores in muestras.items()}
+        extra = tiempos['con middleware'] - tiempos['sin middleware']
+        filas.append({
+            'consultas': cantidad,
+            'us_sin': round(tiempos['sin middleware'] * 1e6, 1),
+            'us_con': round(tiempos['con middleware'] * 1e6, 1),
+            'us_extra': round(extra * 1e6, 1),
+            'us_extra_por_consulta': round(extra * 1e6 / cantidad, 2),
+            'overhead_pct': round(extra * 100 / tiempos['sin middleware'], 1),
+        })
+    EstadisticasSQL.reiniciar()
+    return filas
@@ -1,11 +1,48 @@
 import django_filters
+from django.db.models import F
+from rest_framework.filters import SearchFilter
+from rest_framework.settings import api_settings
+
 from .models import Paquete
+from .utils.busqueda_utils import BusquedaUtils
 
 class PaqueteFilter(django_filters.FilterSet):
+    """
+    Filtros del listado de paquetes (sync y async) y de la exportación. cliente se
+    filtra por id sin validarlo contra la tabla de clientes: uno inexistente da un
+    resultado vacío
+    """
     estado = django_filters.ChoiceFilter(choices=Paquete.EstadoPaquete)
     cliente = django_filters.NumberFilter(field_name='cliente_id')
     tipo = django_filters.ChoiceFilter(choices=Paquete.TipoPaquete)
 
     class Meta:
         model = Paquete
-        fields = ['estado', 'cliente', 'tipo']
\ No newline at end of file
+        fields = ['estado', 'cliente', 'tipo']
+
+
+class PaqueteBusquedaFilter(SearchFilter):
+    """
+    ?search= sobre el índice FTS5 de paquetes (tracking, nombre y dirección del
+    destinatario) en lugar de LIKE '%termino%'. Cada término debe aparecer en alguna
+    de las columnas. Sin ?ordering los resultados salen ordenados por relevancia (bm25);
+    por eso debe ir después de OrderingFilter en filter_backends.
+
+    Vuelve al SearchFilter de DRF (search_fields de la vista) si la base no tiene FTS5
+    o si algún término es más corto que lo que indexa el tokenizer trigram
+    """
+    ranking_annotation = 'relevancia'
+
+    def filter_queryset(self, request, queryset, view):
+        terminos = self.get_search_terms(request)
+        if not terminos:
+            return queryset
+        if not BusquedaUtils.admite_terminos(terminos) or not BusquedaUtils.disponible():
+            return super().filter_queryset(request, queryset, view)
+
+        queryset = queryset.filter(busqueda__documento__match=BusquedaUtils.consulta(terminos))
+        if api_settings.ORDERING_PARAM not in request.query_params:
+            queryset = queryset.annotate(
+                **{self.ranking_annotation: F('busqueda__rank')}
+            ).order_by(self.ranking_annotation)
+        return queryset
@@ -0,0 +1,56 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from app_paquetes.utils.archivo_utils import ArchivoUtils
+
+
+class Command(BaseCommand):
+    help = (
+        "Mueve a la base de archivo las planillas anteriores al corte cuyos paquetes están "
+        "todos en distribución, con sus items y paquetes, en una transacción por lote. "
+        "Después corre ANALYZE y VACUUM sobre la base principal"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--antes-de', help="Fecha de corte (AAAA-MM-DD); se archivan las planillas anteriores")
+        parser.add_argument('--dias', type=int, help="Corte en días hacia atrás (por defecto PAQUETES_ARCHIVO_DIAS)")
+        parser.add_argument('--chunk-size', type=int, help="Planillas por transacción")
+        parser.add_argument('--dry-run', action='store_true', help="Solo informa cuántas planillas e items se moverían")
+        parser.add_argument('--sin-vacuum', action='store_true', help="Corre ANALYZE pero no VACUUM")
+        parser.add_argument('--sin-compactar', action='store_true', help="No corre ANALYZE ni VACUUM")
+
+    def handle(self, *args, **options):
+        if options['antes_de'] and options['dias'] is not None:
+            raise CommandError("Usar --antes-de o --dias, no ambos")
+        if options['antes_de']:
+            try:
+                antes_de = date.fromisoformat(options['antes_de'])
+            except ValueError:
+                raise CommandError("--antes-de debe tener formato AAAA-MM-DD")
+        elif options['dias'] is not None:
+            antes_de = timezone.localdate() - timedelta(days=options['dias'])
+        else:
+            antes_de = ArchivoUtils.corte_por_defecto()
+
+        totales = ArchivoUtils.archivar(
+            antes_de=antes_de, chunk_size=options['chunk_size'], dry_run=options['dry_run']
+        )
+        if options['dry_run']:
+            self.stdout.write(
+                f"Se archivarían {totales['planillas']} planillas ({totales['items']} items) "
+                f"anteriores al {antes_de}"
+            )
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"{totales['planillas']} planillas, {totales['items']} items y {totales['paquetes']} paquetes "
+            f"archivados en {totales['lotes']} lotes"
+        ))
+
+        if options['sin_compactar'] or not totales['planillas']:
+            return
+        tamanos = ArchivoUtils.compactar(vacuum=not options['sin_vacuum'])
+        self.stdout.write(
+            f"Base principal: {tamanos['antes'] / 2**20:.1f} MB -> {tamanos['despues'] / 2**20:.1f} MB"
+        )
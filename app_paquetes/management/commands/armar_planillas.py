@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from app_paquetes.models import Paquete
+from app_paquetes.utils.planilla_utils import PlanillaUtils
+
+
+class Command(BaseCommand):
+    help = "Arma planillas nuevas con los paquetes en depósito que no pertenecen a ninguna planilla"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cliente', type=int, help="Solo paquetes de este cliente")
+        parser.add_argument('--tipo', choices=Paquete.TipoPaquete.values, help="Solo paquetes de este tipo")
+        parser.add_argument(
+            '--estrategia', choices=PlanillaUtils.ESTRATEGIAS, default='bfd',
+            help="ffd (first-fit decreasing) o bfd (best-fit decreasing)"
+        )
+        parser.add_argument('--dry-run', action='store_true', help="Calcula el reparto sin crear planillas")
+
+    def handle(self, *args, **options):
+        resultado = PlanillaUtils.armar_planillas(
+            cliente=options['cliente'],
+            tipo=options['tipo'],
+            estrategia=options['estrategia'],
+            dry_run=options['dry_run'],
+        )
+        self.stdout.write(
+            f"{resultado['paquetes']} paquetes en {resultado['planillas']} planillas "
+            f"(cota inferior {resultado['cota_inferior']}, fill ratio {resultado['fill_ratio']})"
+        )
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f"{len(resultado['planillas_creadas'])} planillas creadas"))
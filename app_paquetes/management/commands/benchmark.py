@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from app_paquetes.benchmarks import ESCENARIOS
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Ejecuta escenarios de benchmark sobre datos sinteticos (los datos se descartan al terminar)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'escenarios', nargs='*',
+            help=f"Escenarios a ejecutar. Disponibles: {', '.join(sorted(ESCENARIOS))}. Por defecto todos"
+        )
+
+    def handle(self, *args, **options):
+        nombres = options['escenarios'] or sorted(ESCENARIOS)
+        desconocidos = [nombre for nombre in nombres if nombre not in ESCENARIOS]
+        if desconocidos:
+            raise CommandError(f"Escenarios desconocidos: {', '.join(desconocidos)}")
+
+        for nombre in nombres:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"== {nombre} =="))
+            try:
+                with transaction.atomic():
+                    filas = ESCENARIOS[nombre]()
+                    raise _Rollback
+            except _Rollback:
+                pass
+            self._imprimir_tabla(filas)
+
+    def _imprimir_tabla(self, filas):
+        if not filas:
+            return
+        columnas = list(filas[0])
+        anchos = {
+            columna: max(len(str(columna)), *(len(str(fila.get(columna, ''))) for fila in filas))
+            for columna in columnas
+        }
+        self.stdout.write('  '.join(str(columna).ljust(anchos[columna]) for columna in columnas))
+        for fila in filas:
+            self.stdout.write('  '.join(str(fila.get(columna, '')).ljust(anchos[columna]) for columna in columnas))
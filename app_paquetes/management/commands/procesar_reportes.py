@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from app_paquetes.utils.reporte_utils import ReporteUtils
+
+
+class Command(BaseCommand):
+    help = (
+        "Vuelca en los resúmenes diarios los eventos del registro de cambios que todavía "
+        "no fueron procesados (pensado para correr periódicamente, por ejemplo con cron)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, help="Eventos por transacción")
+
+    def handle(self, *args, **options):
+        procesados = ReporteUtils.procesar_registro(lote=options['lote'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{procesados} eventos procesados (registro procesado hasta el id {ReporteUtils.procesado_hasta()})"
+        ))
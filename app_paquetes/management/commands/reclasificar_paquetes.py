@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from app_paquetes.utils.paquete_utils import PaqueteUtils
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula el tipo de todos los paquetes según los límites de peso actuales, "
+        "con un UPDATE por rango de ids"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, help="Paquetes por transacción")
+        parser.add_argument(
+            '--pausa', type=float, default=0,
+            help="Segundos de espera entre transacciones para dejar pasar otras escrituras"
+        )
+
+    def handle(self, *args, **options):
+        actualizados = PaqueteUtils.reclasificar_tipos(
+            chunk_size=options['chunk_size'], pausa=options['pausa']
+        )
+        self.stdout.write(self.style.SUCCESS(f"{actualizados} paquetes reclasificados"))
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Sum, Value
+from django.db.models.functions import Coalesce
+
+from app_paquetes.models import Planilla
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara peso_total e item_count de cada planilla con los valores reales de sus items "
+        "y corrige las diferencias"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Solo informa las diferencias, no las corrige"
+        )
+        parser.add_argument(
+            '--tolerancia', type=float, default=0.001,
+            help="Diferencia de peso (en gramos) a partir de la cual se considera desvío"
+        )
+
+    def handle(self, *args, **options):
+        tolerancia = options['tolerancia']
+        planillas = Planilla.objects.annotate(
+            peso_real=Coalesce(Sum('items__paquete__peso'), Value(0.0)),
+            items_reales=Count('items'),
+        ).values_list('id', 'numero_planilla', 'peso_total', 'item_count', 'peso_real', 'items_reales')
+
+        desviadas = []
+        revisadas = 0
+        for pk, numero, peso_total, item_count, peso_real, items_reales in planillas.iterator():
+            revisadas += 1
+            if abs(peso_total - peso_real) > tolerancia or item_count != items_reales:
+                desviadas.append(pk)
+                self.stdout.write(
+                    f"Planilla {numero}: peso {peso_total} -> {peso_real}, items {item_count} -> {items_reales}"
+                )
+
+        if desviadas and not options['dry_run']:
+            # los valores se vuelven a calcular al escribir: los leídos arriba solo se informan
+            for inicio in range(0, len(desviadas), 500):
+                Planilla.recalcular_totales(desviadas[inicio:inicio + 500])
+
+        accion = "detectadas" if options['dry_run'] else "corregidas"
+        self.stdout.write(self.style.SUCCESS(
+            f"{revisadas} planillas revisadas, {len(desviadas)} con desvío {accion}"
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app_paquetes.utils.busqueda_utils import BusquedaUtils
+
+
+class Command(BaseCommand):
+    help = (
+        "Crea los triggers del índice de búsqueda de paquetes (FTS5) si faltan y "
+        "reconstruye el índice desde la tabla de paquetes"
+    )
+
+    def handle(self, *args, **options):
+        if not BusquedaUtils.instalar():
+            raise CommandError("La base no soporta FTS5 con tokenizer trigram; la búsqueda usa LIKE")
+        self.stdout.write(self.style.SUCCESS("Índice de búsqueda reconstruido"))
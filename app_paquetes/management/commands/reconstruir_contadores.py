@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app_paquetes.models import ContadorPaquetes
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara los contadores de paquetes por cliente, estado y tipo con el conteo real "
+        "y los reconstruye desde la tabla de paquetes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verificar', action='store_true',
+            help="Solo informa las diferencias; termina con error si hay alguna"
+        )
+
+    def handle(self, *args, **options):
+        diferencias = ContadorPaquetes.diferencias()
+        for (cliente_id, estado, tipo), (contador, real) in sorted(diferencias.items()):
+            self.stdout.write(f"Cliente {cliente_id} / {estado} / {tipo}: contador {contador}, real {real}")
+
+        if options['verificar']:
+            if diferencias:
+                raise CommandError(f"{len(diferencias)} grupos con diferencias")
+            self.stdout.write(self.style.SUCCESS("Contadores consistentes"))
+            return
+
+        grupos = ContadorPaquetes.reconstruir()
+        self.stdout.write(self.style.SUCCESS(
+            f"{grupos} grupos reconstruidos, {len(diferencias)} tenían diferencias"
+        ))
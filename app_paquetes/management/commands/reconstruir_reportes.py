@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from app_paquetes.utils.reporte_utils import ReporteUtils
+
+
+class Command(BaseCommand):
+    help = "Recalcula los resúmenes diarios de un rango de fechas desde el registro de cambios"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', required=True, help="Fecha inicial (AAAA-MM-DD)")
+        parser.add_argument('--hasta', required=True, help="Fecha final inclusive (AAAA-MM-DD)")
+
+    def handle(self, *args, **options):
+        try:
+            desde, hasta = parse_date(options['desde']), parse_date(options['hasta'])
+        except ValueError:
+            desde = hasta = None
+        if desde is None or hasta is None or desde > hasta:
+            raise CommandError("--desde y --hasta deben ser fechas AAAA-MM-DD con desde <= hasta")
+
+        eventos = ReporteUtils.reconstruir(desde, hasta)
+        self.stdout.write(self.style.SUCCESS(
+            f"Resúmenes del {desde} al {hasta} reconstruidos a partir de {eventos} eventos"
+        ))
@@ -0,0 +1,77 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .utils.instrumentacion_utils import EstadisticasSQL, MedicionSQL
+
+
+class InstrumentacionSQLMiddleware:
+    """
+    Mide el SQL de cada request con un execute wrapper instalado en todas las conexiones
+    (default, lectura y archivo): cantidad de consultas, tiempo total, la sentencia más
+    lenta y las sentencias repetidas. Lo informa en el header Server-Timing y lo acumula
+    por nombre de URL en EstadisticasSQL (GET /api/stats/sql/). Se desactiva con
+    PAQUETES_INSTRUMENTACION_SQL = False.
+
+    El costo por consulta es una llamada extra, dos perf_counter y un dict; el resto se
+    calcula una vez por request. Las respuestas en streaming (exportación) solo cuentan
+    las consultas hechas antes de empezar a enviar el cuerpo
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PAQUETES_INSTRUMENTACION_SQL:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.es_async = iscoroutinefunction(get_response)
+        if self.es_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.es_async:
+            return self.__acall__(request)
+        medicion = MedicionSQL()
+        instaladas = self.instalar(medicion)
+        try:
+            response = self.get_response(request)
+        finally:
+            self.desinstalar(instaladas, medicion)
+        return self.completar(request, response, medicion)
+
+    async def __acall__(self, request):
+        # las conexiones son por thread: el wrapper se instala en el thread donde
+        # sync_to_async ejecuta el ORM de este request (uno por request bajo ASGI)
+        medicion = MedicionSQL()
+        instaladas = await sync_to_async(self.instalar)(medicion)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(self.desinstalar)(instaladas, medicion)
+        return self.completar(request, response, medicion)
+
+    @staticmethod
+    def instalar(medicion):
+        # lo mismo que connection.execute_wrapper(medicion) en cada conexión, sin armar
+        # un context manager por conexión y por request
+        instaladas = [connections[alias] for alias in connections]
+        for connection in instaladas:
+            connection.execute_wrappers.append(medicion)
+        return instaladas
+
+    @staticmethod
+    def desinstalar(instaladas, medicion):
+        for connection in instaladas:
+            connection.execute_wrappers.remove(medicion)
+
+    @staticmethod
+    def completar(request, response, medicion):
+        duplicadas = medicion.duplicadas()
+        resolver_match = getattr(request, 'resolver_match', None)
+        EstadisticasSQL.registrar(resolver_match and resolver_match.url_name, medicion, duplicadas)
+        timing = medicion.server_timing(duplicadas)
+        if response.has_header('Server-Timing'):
+            timing = f"{response['Server-Timing']}, {timing}"
+        response['Server-Timing'] = timing
+        return response
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:13
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def calcular_totales(apps, schema_editor):
+    Planilla = apps.get_model('app_paquetes', 'Planilla')
+    Item = apps.get_model('app_paquetes', 'Item')
+    totales = Item.objects.values('planilla_id').annotate(peso=Sum('paquete__peso'), cantidad=Count('id'))
+    for total in totales.iterator():
+        Planilla.objects.filter(pk=total['planilla_id']).update(
+            peso_total=total['peso'] or 0,
+            item_count=total['cantidad']
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_paquetes', '0002_alter_paquete_tipo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='planilla',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Cantidad de ítems'),
+        ),
+        migrations.AddField(
+            model_name='planilla',
+            name='peso_total',
+            field=models.FloatField(default=0, help_text='En gramos', verbose_name='Peso total'),
+        ),
+        migrations.RunPython(calcular_totales, migrations.RunPython.noop),
+    ]
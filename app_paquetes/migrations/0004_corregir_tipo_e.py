@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+def corregir_tipo_e(apps, schema_editor):
+    # determinar_tipo_paquete devolvía 'E' (fuera de las opciones) para pesos desde 3000g
+    Paquete = apps.get_model('app_paquetes', 'Paquete')
+    Paquete.objects.filter(tipo='E').update(tipo='G')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_paquetes', '0003_planilla_totales'),
+    ]
+
+    operations = [
+        migrations.RunPython(corregir_tipo_e, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:18
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def desactivar_duplicados(apps, schema_editor):
+    # si un paquete quedó en varias planillas, solo su item más reciente sigue activo
+    Item = apps.get_model('app_paquetes', 'Item')
+    duplicados = (
+        Item.objects.values('paquete_id')
+        .annotate(cantidad=Count('id'), ultimo=Max('id'))
+        .filter(cantidad__gt=1)
+    )
+    for duplicado in duplicados.iterator():
+        Item.objects.filter(paquete_id=duplicado['paquete_id']).exclude(id=duplicado['ultimo']).update(activo=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_paquetes', '0004_corregir_tipo_e'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='activo',
+            field=models.BooleanField(default=True, verbose_name='Activo'),
+        ),
+        migrations.RunPython(desactivar_duplicados, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='item',
+            constraint=models.UniqueConstraint(condition=models.Q(('activo', True)), fields=('paquete',), name='unique_paquete_planilla_activa', violation_error_message='Este paquete está en otra planilla activa.'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_paquetes', '0005_item_activo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='planilla',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Versión'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:20
+
+from django.db import migrations, models
+
+
+def crear_versiones(apps, schema_editor):
+    VersionTabla = apps.get_model('app_paquetes', 'VersionTabla')
+    VersionTabla.objects.bulk_create(
+        [VersionTabla(tabla=tabla, version=0) for tabla in ('paquete', 'planilla', 'item')],
+        ignore_conflicts=True
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_paquetes', '0006_planilla_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionTabla',
+            fields=[
+                ('tabla', models.CharField(max_length=50, primary_key=True, serialize=False, verbose_name='Tabla')),
+                ('version', models.PositiveBigIntegerField(default=0, verbose_name='Versión')),
+            ],
+            options={
+                'verbose_name': 'Versión de tabla',
+                'verbose_name_plural': 'Versiones de tabla',
+            },
+        ),
+        migrations.RunPython(crear_versiones, migrations.RunPython.noop),
+    ]
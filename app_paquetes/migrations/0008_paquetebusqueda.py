@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:10
+
+import app_paquetes.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+from app_paquetes.utils.busqueda_utils import BusquedaUtils
+
+
+def instalar_busqueda(apps, schema_editor):
+    # sin FTS5 no se crea nada y el listado sigue usando LIKE
+    BusquedaUtils.instalar(schema_editor.connection)
+
+
+def desinstalar_busqueda(apps, schema_editor):
+    BusquedaUtils.desinstalar(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_paquetes', '0007_versiontabla'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaqueteBusqueda',
+            fields=[
+                ('paquete', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='busqueda', serialize=False, to='app_paquetes.paquete')),
+                ('tracking', models.TextField()),
+                ('nombre_destinatario', models.TextField()),
+                ('direccion_destinatario', models.TextField()),
+                ('documento', app_paquetes.models.ColumnaFTS(db_column='app_paquetes_paquete_busqueda')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'app_paquetes_paquete_busqueda',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(instalar_busqueda, desinstalar_busqueda),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def contar_paquetes(apps, schema_editor):
+    Paquete = apps.get_model('app_paquetes', 'Paquete')
+    ContadorPaquetes = apps.get_model('app_paquetes', 'ContadorPaquetes')
+    ContadorPaquetes.objects.bulk_create([
+        ContadorPaquetes(cliente_id=cliente_id, estado=estado, tipo=tipo, cantidad=cantidad)
+        for cliente_id, estado, tipo, cantidad in Paquete.objects.order_by().values_list(
+            'cliente_id', 'estado', 'tipo'
+        ).annotate(cantidad=models.Count('id'))
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_paquetes', '0008_paquetebusqueda'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorPaquetes',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estado', models.CharField(choices=[('en_deposito', 'En depósito'), ('en_distribucion', 'En distribución')], max_length=20, verbose_name='Estado')),
+                ('tipo', models.CharField(choices=[('P', 'Pequeno'), ('M', 'Mediano'), ('G', 'Grande')], max_length=1, verbose_name='Tipo de paquete')),
+                ('cantidad', models.BigIntegerField(default=0, verbose_name='Cantidad')),
+                ('cliente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contadores', to='app_paquetes.cliente', verbose_name='Cliente')),
+            ],
+            options={
+                'verbose_name': 'Contador de paquetes',
+                'verbose_name_plural': 'Contadores de paquetes',
+                'constraints': [models.UniqueConstraint(fields=('cliente', 'estado', 'tipo'), name='unique_contador_paquetes')],
+            },
+        ),
+        migrations.RunPython(contar_paquetes, migrations.RunPython.noop),
+    ]
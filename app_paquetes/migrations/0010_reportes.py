@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:34
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_paquetes', '0009_contadorpaquetes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistroCambio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(default=django.utils.timezone.localdate, verbose_name='Fecha')),
+                ('evento', models.CharField(choices=[('ingreso', 'Ingreso'), ('distribucion', 'Distribución'), ('fallo', 'Fallo')], max_length=20, verbose_name='Evento')),
+                ('cantidad', models.IntegerField(verbose_name='Cantidad')),
+                ('peso', models.FloatField(default=0, help_text='En gramos', verbose_name='Peso')),
+                ('cliente', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='app_paquetes.cliente', verbose_name='Cliente')),
+                ('motivo_fallo', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='app_paquetes.motivofallosimple', verbose_name='Motivo de fallo')),
+            ],
+            options={
+                'verbose_name': 'Registro de cambio',
+                'verbose_name_plural': 'Registro de cambios',
+                'indexes': [models.Index(fields=['fecha'], name='app_paquete_fecha_9da4bf_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenDiarioCliente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(verbose_name='Fecha')),
+                ('ingresados', models.IntegerField(default=0, verbose_name='Ingresados')),
+                ('distribuidos', models.IntegerField(default=0, verbose_name='Distribuidos')),
+                ('peso_distribuido', models.FloatField(default=0, help_text='En gramos', verbose_name='Peso distribuido')),
+                ('cliente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_diarios', to='app_paquetes.cliente', verbose_name='Cliente')),
+            ],
+            options={
+                'verbose_name': 'Resumen diario por cliente',
+                'verbose_name_plural': 'Resúmenes diarios por cliente',
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'cliente'), name='unique_resumen_diario_cliente')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenDiarioMotivo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(verbose_name='Fecha')),
+                ('fallidos', models.IntegerField(default=0, verbose_name='Fallidos')),
+                ('motivo_fallo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_diarios', to='app_paquetes.motivofallosimple', verbose_name='Motivo de fallo')),
+            ],
+            options={
+                'verbose_name': 'Resumen diario por motivo',
+                'verbose_name_plural': 'Resúmenes diarios por motivo',
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'motivo_fallo'), name='unique_resumen_diario_motivo')],
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_paquetes', '0010_reportes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MotivoFalloCompuesto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('codigo', models.CharField(default='', editable=False, max_length=200)),
+                ('nombre', models.CharField(default='', editable=False, max_length=500)),
+                ('descripcion', models.TextField(default='', editable=False)),
+                ('active', models.BooleanField(default=False, editable=False)),
+                ('motivos', models.ManyToManyField(blank=True, related_name='compuestos', to='app_paquetes.motivofallosimple')),
+                ('submotivos', models.ManyToManyField(blank=True, related_name='contenido_en', to='app_paquetes.motivofallocompuesto')),
+            ],
+            options={
+                'verbose_name': 'Motivo de fallo compuesto',
+                'verbose_name_plural': 'Motivos de fallo compuestos',
+            },
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='motivo_fallo_compuesto',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='app_paquetes.motivofallocompuesto', verbose_name='Motivo de fallo compuesto'),
+        ),
+        migrations.CreateModel(
+            name='MotivoFalloClausura',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('orden', models.PositiveIntegerField()),
+                ('motivo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='clausura_compuestos', to='app_paquetes.motivofallosimple')),
+                ('compuesto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='clausura', to='app_paquetes.motivofallocompuesto')),
+            ],
+            options={
+                'ordering': ['compuesto', 'orden'],
+                'constraints': [models.UniqueConstraint(fields=('compuesto', 'motivo'), name='unique_clausura_compuesto_motivo')],
+            },
+        ),
+    ]
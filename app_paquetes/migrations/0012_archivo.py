@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:55
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_paquetes', '0011_motivofallocompuesto'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaqueteArchivado',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('tracking', models.CharField(max_length=50, unique=True, verbose_name='Número de seguimiento')),
+                ('direccion_destinatario', models.CharField(max_length=200, verbose_name='Dirección del destinatario')),
+                ('telefono_destinatario', models.CharField(max_length=20, verbose_name='Teléfono del destinatario')),
+                ('nombre_destinatario', models.CharField(max_length=100, verbose_name='Nombre del destinatario')),
+                ('peso', models.FloatField(help_text='En gramos', verbose_name='Peso')),
+                ('altura', models.FloatField(help_text='En centímetros', verbose_name='Altura')),
+                ('estado', models.CharField(choices=[('en_deposito', 'En depósito'), ('en_distribucion', 'En distribución')], max_length=20, verbose_name='Estado')),
+                ('tipo', models.CharField(blank=True, choices=[('P', 'Pequeno'), ('M', 'Mediano'), ('G', 'Grande')], max_length=1, verbose_name='Tipo de paquete')),
+                ('cliente_id', models.BigIntegerField(verbose_name='Cliente')),
+                ('archivado_en', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Archivado en')),
+            ],
+            options={
+                'verbose_name': 'Paquete archivado',
+                'verbose_name_plural': 'Paquetes archivados',
+            },
+        ),
+        migrations.CreateModel(
+            name='PlanillaArchivada',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('numero_planilla', models.CharField(max_length=50, unique=True, verbose_name='Número de planilla')),
+                ('fecha', models.DateField(verbose_name='Fecha de creación')),
+                ('peso_total', models.FloatField(default=0, help_text='En gramos', verbose_name='Peso total')),
+                ('item_count', models.PositiveIntegerField(default=0, verbose_name='Cantidad de ítems')),
+                ('archivada_en', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Archivada en')),
+            ],
+            options={
+                'verbose_name': 'Planilla archivada',
+                'verbose_name_plural': 'Planillas archivadas',
+            },
+        ),
+        migrations.CreateModel(
+            name='ItemArchivado',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('paquete_id', models.BigIntegerField(db_index=True, verbose_name='Paquete')),
+                ('posicion', models.PositiveIntegerField(verbose_name='Posición')),
+                ('activo', models.BooleanField(default=True, verbose_name='Activo')),
+                ('motivo_fallo_id', models.BigIntegerField(blank=True, null=True, verbose_name='Motivo de fallo')),
+                ('motivo_fallo_compuesto_id', models.BigIntegerField(blank=True, null=True, verbose_name='Motivo de fallo compuesto')),
+                ('planilla', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='app_paquetes.planillaarchivada', verbose_name='Planilla')),
+            ],
+            options={
+                'verbose_name': 'Ítem archivado',
+                'verbose_name_plural': 'Ítems archivados',
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_paquetes', '0012_archivo'),
+    ]
+
+    # solo CREATE INDEX: no reconstruye las tablas (los triggers del índice FTS5 de
+    # paquetes se pierden si una migración reconstruye la tabla; ver reconstruir_busqueda)
+    operations = [
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['planilla', 'posicion'], name='item_planilla_posicion_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paquete',
+            index=models.Index(fields=['-estado', 'tracking'], name='paquete_estado_tracking_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paquete',
+            index=models.Index(fields=['cliente', 'tracking'], name='paquete_cliente_tracking_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paquete',
+            index=models.Index(fields=['cliente', 'estado', 'tracking'], name='paquete_cliente_estado_idx'),
+        ),
+    ]
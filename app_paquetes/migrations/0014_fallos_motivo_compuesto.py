@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_paquetes', '0013_indices_compuestos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registrocambio',
+            name='motivo_fallo_compuesto',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='app_paquetes.motivofallocompuesto', verbose_name='Motivo de fallo compuesto'),
+        ),
+        migrations.CreateModel(
+            name='ResumenDiarioMotivoCompuesto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(verbose_name='Fecha')),
+                ('fallidos', models.IntegerField(default=0, verbose_name='Fallidos')),
+                ('motivo_fallo_compuesto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_diarios', to='app_paquetes.motivofallocompuesto', verbose_name='Motivo de fallo compuesto')),
+            ],
+            options={
+                'verbose_name': 'Resumen diario por motivo compuesto',
+                'verbose_name_plural': 'Resúmenes diarios por motivo compuesto',
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'motivo_fallo_compuesto'), name='unique_resumen_diario_motivo_compuesto')],
+            },
+        ),
+    ]
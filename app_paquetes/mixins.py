@@ -0,0 +1,162 @@
+import hashlib
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.http import parse_etags
+from rest_framework import serializers, status
+from rest_framework.response import Response
+
+from .routers import usar_lectura
+
+
+class LecturaMixin:
+    """
+    Las lecturas de GET/HEAD van a la conexión de solo lectura (ver LecturaRouter).
+    Sirve para vistas sync (DRF) y async. Rige mientras se ejecuta la vista: una
+    respuesta en streaming fija su queryset con .using(router.db_for_read(...))
+    """
+    metodos_lectura = ('GET', 'HEAD')
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in self.metodos_lectura:
+            return super().dispatch(request, *args, **kwargs)
+        if getattr(self, 'view_is_async', False):
+            return self._dispatch_lectura_async(request, *args, **kwargs)
+        with usar_lectura():
+            return super().dispatch(request, *args, **kwargs)
+
+    async def _dispatch_lectura_async(self, request, *args, **kwargs):
+        with usar_lectura():
+            return await super().dispatch(request, *args, **kwargs)
+
+
+class ConditionalGetMixin:
+    """
+    ETag fuerte y respuesta 304 para GET sin pasar por la serialización.
+
+    La vista define get_etag_version() con una versión de cambios barata de leer
+    (por tabla o por objeto). El ETag combina esa versión con la URL completa y el
+    formato de respuesta, asi cada página/filtro tiene el suyo. Si If-None-Match
+    coincide se responde 304 antes de consultar los datos.
+    """
+
+    def get_etag_version(self, request, *args, **kwargs):
+        raise NotImplementedError
+
+    def get_etag(self, request, *args, **kwargs):
+        self.etag_version = self.get_etag_version(request, *args, **kwargs)
+        if self.etag_version is None:
+            return None
+        base = '|'.join((
+            type(self).__name__,
+            request.get_full_path(),
+            request.accepted_renderer.media_type,
+            str(self.etag_version),
+        ))
+        return '"%s"' % hashlib.sha1(base.encode('utf-8')).hexdigest()
+
+    def get(self, request, *args, **kwargs):
+        etag = self.get_etag(request, *args, **kwargs)
+        if etag is not None:
+            if_none_match = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+            if etag in if_none_match or '*' in if_none_match:
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        response = super().get(request, *args, **kwargs)
+        if etag is not None and response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+        return response
+
+
+class ValuesListMixin:
+    """
+    Modo rápido opcional para listados: arma los dicts de respuesta directamente
+    desde .values(), sin instanciar modelos ni pasar por los campos del serializer.
+    El mapeo campo -> columna se calcula una vez por vista a partir del serializer,
+    asi la salida JSON es idéntica byte a byte. Se activa con ?fast=1 o con el
+    setting PAQUETES_LISTADOS_RAPIDOS
+    """
+    fast_query_param = 'fast'
+
+    # campos del serializer soportados y su conversión, igual a su to_representation
+    conversiones = (
+        (serializers.BooleanField, bool),
+        (serializers.IntegerField, int),
+        (serializers.FloatField, float),
+        (serializers.ChoiceField, None),
+        (serializers.CharField, str),
+        (serializers.PrimaryKeyRelatedField, None),
+    )
+
+    def usar_modo_rapido(self, request):
+        valor = request.query_params.get(self.fast_query_param)
+        if valor is None:
+            return settings.PAQUETES_LISTADOS_RAPIDOS
+        return valor.lower() in ('1', 'true', 'si')
+
+    @classmethod
+    def get_mapeo_valores(cls, serializer_class):
+        """Lista de (nombre en la respuesta, columna de .values(), conversión) por campo"""
+        cache = cls.__dict__.get('_mapeos_valores')
+        if cache is None:
+            cache = {}
+            setattr(cls, '_mapeos_valores', cache)
+        if serializer_class in cache:
+            return cache[serializer_class]
+
+        modelo = serializer_class.Meta.model
+        mapeo = []
+        for nombre, campo in serializer_class().fields.items():
+            if campo.write_only:
+                continue
+            if campo.source == '*' or '.' in campo.source:
+                raise ImproperlyConfigured(f'{nombre}: el modo rápido solo admite campos directos del modelo')
+            for tipo, conversion in cls.conversiones:
+                if isinstance(campo, tipo):
+                    break
+            else:
+                raise ImproperlyConfigured(f'{nombre}: tipo de campo no soportado por el modo rápido')
+            columna = modelo._meta.get_field(campo.source).attname
+            mapeo.append((nombre, columna, conversion))
+        cache[serializer_class] = mapeo
+        return mapeo
+
+    @classmethod
+    def serializar_valores(cls, queryset, serializer_class):
+        """Equivalente a serializer_class(queryset, many=True).data usando .values()"""
+        mapeo = cls.get_mapeo_valores(serializer_class)
+        return cls.construir_filas(queryset.values(*[columna for _, columna, _ in mapeo]), mapeo)
+
+    @classmethod
+    def serializar_instancias(cls, objetos, serializer_class):
+        """serializar_valores para instancias ya cargadas (por ejemplo las del catálogo de motivos)"""
+        mapeo = cls.get_mapeo_valores(serializer_class)
+        return cls.construir_filas(
+            ({columna: getattr(objeto, columna) for _, columna, _ in mapeo} for objeto in objetos), mapeo
+        )
+
+    @staticmethod
+    def construir_filas(filas, mapeo):
+        resultado = []
+        for fila in filas:
+            item = {}
+            for nombre, columna, conversion in mapeo:
+                valor = fila[columna]
+                item[nombre] = valor if conversion is None or valor is None else conversion(valor)
+            resultado.append(item)
+        return resultado
+
+    def list(self, request, *args, **kwargs):
+        if not self.usar_modo_rapido(request):
+            return super().list(request, *args, **kwargs)
+
+        serializer_class = self.get_serializer_class()
+        mapeo = self.get_mapeo_valores(serializer_class)
+        queryset = self.filter_queryset(self.get_queryset())
+        # las anotaciones se conservan para que el paginador pueda ordenar por ellas
+        queryset = queryset.values(*[columna for _, columna, _ in mapeo], *queryset.query.annotations)
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.construir_filas(page, mapeo))
+        return Response(self.construir_filas(queryset, mapeo))
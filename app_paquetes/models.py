@@ -1,10 +1,14 @@
 from abc import ABC, abstractmethod
-from django.db import models
+from django.db import models, transaction
 from django.core.exceptions import ValidationError
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
-from django.db.models import Q, Sum
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from .utils.paquete_utils import PaqueteUtils
+from .utils.busqueda_utils import BusquedaUtils
+from .utils.cache_utils import CatalogoMotivos
 #TODO: mover las constantes a un unico archivo
 
 class Cliente(models.Model):
@@ -71,11 +75,55 @@ class Paquete(models.Model):
             raise ValidationError({"peso": "El peso debe ser menor a 25"}) #se asume como regla de negocio
 
     def save(self, *args, **kwargs):
-        """Calcula el tipo de paquete basado en el peso"""
+        """Calcula el tipo de paquete basado en el peso y actualiza los contadores"""
         if self.peso > 25000.0:
             raise ValidationError({"peso": "El peso debe ser menor a 25"}) #se asume como regla de negocio
         self.tipo = PaqueteUtils.determinar_tipo_paquete(self.peso)
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            anterior = peso_anterior = None
+            if self.pk is not None:
+                fila = Paquete.objects.filter(pk=self.pk).values_list('cliente_id', 'estado', 'tipo', 'peso').first()
+                if fila is not None:
+                    anterior, peso_anterior = fila[:3], fila[3]
+            super().save(*args, **kwargs)
+            actual = (self.cliente_id, self.estado, self.tipo)
+            if anterior != actual:
+                deltas = {actual: 1}
+                if anterior is not None:
+                    deltas[anterior] = -1
+                ContadorPaquetes.aplicar(deltas)
+
+            if peso_anterior is not None and self.peso != peso_anterior:
+                # peso_total de las planillas que lo incluyen, con la diferencia y no con el
+                # valor leído, así no pisa asignaciones concurrentes
+                Planilla.objects.filter(items__paquete_id=self.pk).update(
+                    peso_total=F('peso_total') + (self.peso - peso_anterior)
+                )
+
+            if anterior is None:
+                RegistroCambio.registrar(
+                    RegistroCambio.Evento.INGRESO, {self.cliente_id: 1}, {self.cliente_id: self.peso}
+                )
+            elif self.estado == self.EstadoPaquete.EN_DISTRIBUCION and anterior[1] != self.estado:
+                RegistroCambio.registrar(
+                    RegistroCambio.Evento.DISTRIBUCION, {self.cliente_id: 1}, {self.cliente_id: self.peso}
+                )
+            elif self.estado == self.EstadoPaquete.EN_DEPOSITO and anterior[1] != self.estado:
+                # vuelve al depósito (por ejemplo una entrega fallida): deja su planilla y
+                # se puede asignar a otra
+                Item.liberar_paquetes([self.pk])
+
+    def delete(self, *args, **kwargs):
+        # el signal post_delete descuenta el grupo guardado en la base, que puede
+        # diferir del de esta instancia si la fila cambió por un UPDATE masivo
+        self._grupo_contador = Paquete.objects.filter(pk=self.pk).values_list(
+            'cliente_id', 'estado', 'tipo'
+        ).first()
+        return super().delete(*args, **kwargs)
+
+    def grupo_contador(self):
+        """(cliente_id, estado, tipo) con el que el paquete figura en ContadorPaquetes"""
+        return getattr(self, '_grupo_contador', None) or (self.cliente_id, self.estado, self.tipo)
 
     class Meta:
         verbose_name = "Paquete"
@@ -84,8 +132,52 @@ class Paquete(models.Model):
         indexes = [
             models.Index(fields=["estado"]),
             models.Index(fields=["tipo"]),
+            # listado por cursor: orden por defecto y filtros ?estado / ?cliente con orden por tracking
+            # (las consultas verifican su plan en tests.PlanesDeConsultaTests)
+            models.Index(fields=["-estado", "tracking"], name="paquete_estado_tracking_idx"),
+            models.Index(fields=["cliente", "tracking"], name="paquete_cliente_tracking_idx"),
+            models.Index(fields=["cliente", "estado", "tracking"], name="paquete_cliente_estado_idx"),
         ]
 
+class ColumnaFTS(models.TextField):
+    """Columna oculta de una tabla FTS5 (lleva el nombre de la tabla); admite el lookup match"""
+
+
+@ColumnaFTS.register_lookup
+class Coincide(models.Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", [*lhs_params, *rhs_params]
+
+
+class PaqueteBusqueda(models.Model):
+    """
+    Índice de texto completo de paquetes (tabla virtual FTS5, ver BusquedaUtils).
+    No la administra Django: la crean la migración y los triggers la mantienen.
+    Se usa desde Paquete con busqueda__documento__match y busqueda__rank
+    """
+    paquete = models.OneToOneField(
+        Paquete,
+        primary_key=True,
+        db_column='rowid',
+        db_constraint=False,
+        on_delete=models.DO_NOTHING,
+        related_name='busqueda'
+    )
+    tracking = models.TextField()
+    nombre_destinatario = models.TextField()
+    direccion_destinatario = models.TextField()
+    documento = ColumnaFTS(db_column=BusquedaUtils.TABLA)
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = BusquedaUtils.TABLA
+
+
 class Planilla(models.Model):
     numero_planilla = models.CharField(
         max_length=50,
@@ -93,6 +185,11 @@ class Planilla(models.Model):
         verbose_name="Número de planilla"
     )
     fecha = models.DateField(auto_now_add=True, verbose_name="Fecha de creación")
+    # totales desnormalizados, se actualizan al agregar o quitar items
+    peso_total = models.FloatField(default=0, verbose_name="Peso total", help_text="En gramos")
+    item_count = models.PositiveIntegerField(default=0, verbose_name="Cantidad de ítems")
+    # se incrementa ante cualquier cambio visible en el resumen (items, estado de paquetes, motivos)
+    version = models.PositiveIntegerField(default=0, editable=False, verbose_name="Versión")
     PESO_LIMITE = 25000
 
     def __str__(self):
@@ -100,20 +197,71 @@ class Planilla(models.Model):
 
     def marcar_paquetes_en_distribucion(self):
         """Cambia estado de todos los paquetes a 'en distribución'"""
-        updated_count = 0
-        for item in self.items.all():
-            if item.paquete.estado == Paquete.EstadoPaquete.EN_DEPOSITO:
-                item.paquete.estado = Paquete.EstadoPaquete.EN_DISTRIBUCION
-                item.paquete.save()
-                updated_count += 1
-        return updated_count
+        return Planilla.distribuir_planillas([self.pk])
+
+    @staticmethod
+    def distribuir_planillas(planilla_ids):
+        """
+        Pasa a 'en distribución' los paquetes en depósito de las planillas indicadas
+        con un único UPDATE transaccional. Devuelve la cantidad de paquetes actualizados.
+        El tipo no depende del estado, por eso no se pasa por Paquete.save()
+        """
+        with transaction.atomic():
+            paquetes = Paquete.objects.filter(
+                estado=Paquete.EstadoPaquete.EN_DEPOSITO,
+                id__in=Item.objects.filter(planilla_id__in=planilla_ids).values('paquete_id'),
+            )
+            # los contadores se mueven por grupo, antes de que el UPDATE cambie el estado
+            grupos = list(
+                paquetes.order_by().values_list('cliente_id', 'tipo').annotate(cantidad=Count('id'), peso=Sum('peso'))
+            )
+            updated_count = paquetes.update(estado=Paquete.EstadoPaquete.EN_DISTRIBUCION)
+            if updated_count:
+                ContadorPaquetes.aplicar(ContadorPaquetes.deltas_cambio_estado(
+                    grupos, Paquete.EstadoPaquete.EN_DEPOSITO, Paquete.EstadoPaquete.EN_DISTRIBUCION
+                ))
+                cantidades, pesos = {}, {}
+                for cliente_id, _, cantidad, peso in grupos:
+                    cantidades[cliente_id] = cantidades.get(cliente_id, 0) + cantidad
+                    pesos[cliente_id] = pesos.get(cliente_id, 0) + peso
+                RegistroCambio.registrar(RegistroCambio.Evento.DISTRIBUCION, cantidades, pesos)
+                VersionTabla.incrementar(VersionTabla.PAQUETE)
+                Planilla.incrementar_version(planilla_ids)
+            return updated_count
+
+    @staticmethod
+    def incrementar_version(planilla_ids):
+        """Marca como modificadas las planillas, invalidando sus resúmenes cacheados"""
+        VersionTabla.incrementar(VersionTabla.PLANILLA)
+        return Planilla.objects.filter(id__in=planilla_ids).update(version=F('version') + 1)
 
     def get_peso_total(self):
-        """Calcula el peso total de todos los paquetes """
+        """Peso total de todos los paquetes, mantenido en la planilla (ver reconciliar_planillas)"""
+        return self.peso_total
+
+    def calcular_peso_total(self):
+        """Recalcula el peso total desde los items, solo para reconciliación"""
         return self.items.aggregate(
             total_peso=Sum("paquete__peso")
         )["total_peso"] or 0
 
+    @staticmethod
+    def recalcular_totales(planilla_ids):
+        """
+        Reemplaza peso_total e item_count por los valores reales de sus items, calculados
+        con subconsultas en el mismo UPDATE: un item agregado o quitado entre la detección
+        del desvío y la corrección no se pisa. Devuelve la cantidad de planillas corregidas
+        """
+        items = Item.objects.filter(planilla_id=OuterRef('pk')).order_by().values('planilla_id')
+        with transaction.atomic():
+            corregidas = Planilla.objects.filter(id__in=planilla_ids).update(
+                peso_total=Coalesce(Subquery(items.annotate(total=Sum('paquete__peso')).values('total')), Value(0.0)),
+                item_count=Coalesce(Subquery(items.annotate(total=Count('id')).values('total')), Value(0)),
+                version=F('version') + 1
+            )
+            VersionTabla.incrementar(VersionTabla.PLANILLA)
+        return corregidas
+
     def verificar_limite_peso(self, peso_a_agregar):
         """
         Verifica si agregar el peso excede el peso limite
@@ -121,6 +269,34 @@ class Planilla(models.Model):
         peso_actual = self.get_peso_total()
         return (peso_actual + peso_a_agregar) <= self.PESO_LIMITE 
 
+    def agregar_paquetes(self, paquetes):
+        """
+        Agrega los paquetes al final de la planilla. El peso y las posiciones se reservan
+        con un único UPDATE condicional, asi dos asignaciones concurrentes no pueden superar
+        el límite. Devuelve los items creados o None si se excedería el peso límite
+        """
+        peso = sum(paquete.peso for paquete in paquetes)
+        cantidad = len(paquetes)
+        with transaction.atomic():
+            reservado = Planilla.objects.filter(
+                pk=self.pk,
+                peso_total__lte=self.PESO_LIMITE - peso
+            ).update(
+                peso_total=F('peso_total') + peso,
+                item_count=F('item_count') + cantidad,
+                version=F('version') + 1
+            )
+            if not reservado:
+                return None
+
+            self.refresh_from_db(fields=['peso_total', 'item_count', 'version'])
+            VersionTabla.incrementar(VersionTabla.PLANILLA, VersionTabla.ITEM)
+            posicion_inicial = self.item_count - cantidad + 1
+            return Item.objects.bulk_create([
+                Item(planilla=self, paquete=paquete, posicion=posicion_inicial + i)
+                for i, paquete in enumerate(paquetes)
+            ])
+
     class Meta:
         verbose_name = "Planilla"
         verbose_name_plural = "Planillas"
@@ -162,24 +338,141 @@ class MotivoFalloSimple(MotivoFallo, models.Model):
         return self.active  
 
 
-# class MotivoFalloCompuesto(MotivoFallo, models.Model):
-#     """(WIP): Futura combinación de motivos simples y compuestos, implementa el patron Composite"""
-#     motivos = models.ManyToManyField(MotivoFalloSimple)
+class MotivoFalloCompuesto(MotivoFallo, models.Model):
+    """
+    Combinación de motivos simples y compuestos (patron Composite).
+    El árbol se aplana al escribir: MotivoFalloClausura guarda todos los motivos simples
+    alcanzables y codigo, nombre, descripcion y active quedan guardados en la fila, así
+    listar compuestos o validar un item nunca recorre el árbol. Se recalculan por
+    signals cuando cambian los miembros o algún motivo simple incluido (ver recalcular_clausura)
+    """
+    # la concatenación de los miembros puede superar los largos de MotivoFallo
+    codigo = models.CharField(max_length=200, default='', editable=False)
+    nombre = models.CharField(max_length=500, default='', editable=False)
+    descripcion = models.TextField(default='', editable=False)
+    active = models.BooleanField(default=False, editable=False)
+
+    motivos = models.ManyToManyField(MotivoFalloSimple, blank=True, related_name='compuestos')
+    submotivos = models.ManyToManyField('self', symmetrical=False, blank=True, related_name='contenido_en')
+
+    class Meta:
+        verbose_name = "Motivo de fallo compuesto"
+        verbose_name_plural = "Motivos de fallo compuestos"
+
+    def __str__(self):
+        return self.nombre or f"Motivo compuesto {self.pk}"
 
-#     def get_codigo(self) -> str:
-#         return "".join(motivo.get_codigo() for motivo in self.motivos.all())
+    def get_codigo(self) -> str:
+        return self.codigo
 
-#     def get_nombre(self) -> str:
-#         return " y ".join(motivo.get_nombre() for motivo in self.motivos.all())
+    def get_nombre(self) -> str:
+        return self.nombre
 
-#     def get_descripcion(self) -> str:
-#         return " Y ".join(
-#             f"({motivo.get_nombre()}: {motivo.get_descripcion()})"
-#             for motivo in self.motivos.all()
-#         )
+    def get_descripcion(self) -> str:
+        return self.descripcion
+
+    def is_active(self) -> bool:
+        return self.active
+
+    @staticmethod
+    def con_ancestros(ids):
+        """Los compuestos indicados y todos los que los contienen, a cualquier profundidad"""
+        Submotivo = MotivoFalloCompuesto.submotivos.through
+        resultado = set(ids)
+        frontera = set(ids)
+        while frontera:
+            frontera = set(Submotivo.objects.filter(
+                to_motivofallocompuesto_id__in=frontera
+            ).values_list('from_motivofallocompuesto_id', flat=True)) - resultado
+            resultado |= frontera
+        return resultado
+
+    @staticmethod
+    def contiene(compuesto_id, buscado_id):
+        """Indica si buscado_id es alcanzable desde compuesto_id (para evitar ciclos)"""
+        Submotivo = MotivoFalloCompuesto.submotivos.through
+        visitados = {compuesto_id}
+        frontera = {compuesto_id}
+        while frontera:
+            if buscado_id in frontera:
+                return True
+            frontera = set(Submotivo.objects.filter(
+                from_motivofallocompuesto_id__in=frontera
+            ).values_list('to_motivofallocompuesto_id', flat=True)) - visitados
+            visitados |= frontera
+        return False
+
+    @staticmethod
+    def recalcular_clausura(ids):
+        """
+        Reconstruye la clausura de los compuestos indicados y de sus ancestros y luego
+        sus campos desnormalizados. Los motivos simples quedan en orden de recorrido
+        (primero los simples propios, después los de cada submotivo), sin repetir
+        """
+        afectados = MotivoFalloCompuesto.con_ancestros(ids)
+        if not afectados:
+            return
+        # el catálogo de motivos es chico: se cargan todas las aristas en dos consultas
+        simples, hijos = {}, {}
+        for compuesto_id, motivo_id in MotivoFalloCompuesto.motivos.through.objects.order_by(
+            'motivofallosimple_id'
+        ).values_list('motivofallocompuesto_id', 'motivofallosimple_id'):
+            simples.setdefault(compuesto_id, []).append(motivo_id)
+        for padre_id, hijo_id in MotivoFalloCompuesto.submotivos.through.objects.order_by(
+            'to_motivofallocompuesto_id'
+        ).values_list('from_motivofallocompuesto_id', 'to_motivofallocompuesto_id'):
+            hijos.setdefault(padre_id, []).append(hijo_id)
+
+        def hojas(compuesto_id, visitados):
+            yield from simples.get(compuesto_id, [])
+            for hijo_id in hijos.get(compuesto_id, []):
+                if hijo_id not in visitados:
+                    visitados.add(hijo_id)
+                    yield from hojas(hijo_id, visitados)
+
+        with transaction.atomic():
+            MotivoFalloClausura.objects.filter(compuesto_id__in=afectados).delete()
+            MotivoFalloClausura.objects.bulk_create([
+                MotivoFalloClausura(compuesto_id=compuesto_id, motivo_id=motivo_id, orden=orden)
+                for compuesto_id in afectados
+                for orden, motivo_id in enumerate(dict.fromkeys(hojas(compuesto_id, {compuesto_id})))
+            ])
+            MotivoFalloCompuesto.recalcular_datos(afectados)
+
+    @staticmethod
+    def recalcular_datos(ids):
+        """Recalcula codigo, nombre, descripcion y active desde la clausura ya guardada"""
+        motivos = {}
+        for fila in MotivoFalloClausura.objects.filter(compuesto_id__in=ids).select_related('motivo'):
+            motivos.setdefault(fila.compuesto_id, []).append(fila.motivo)
+
+        compuestos = list(MotivoFalloCompuesto.objects.filter(id__in=ids))
+        for compuesto in compuestos:
+            simples = motivos.get(compuesto.id, [])
+            compuesto.codigo = "".join(motivo.get_codigo() for motivo in simples)
+            compuesto.nombre = " y ".join(motivo.get_nombre() for motivo in simples)
+            compuesto.descripcion = " Y ".join(
+                f"({motivo.get_nombre()}: {motivo.get_descripcion()})" for motivo in simples
+            )
+            # un compuesto vacío no es asignable
+            compuesto.active = bool(simples) and all(motivo.is_active() for motivo in simples)
+        MotivoFalloCompuesto.objects.bulk_update(compuestos, ['codigo', 'nombre', 'descripcion', 'active'])
+        VersionTabla.incrementar(VersionTabla.MOTIVO)
+        transaction.on_commit(CatalogoMotivos.invalidar)
+
+
+class MotivoFalloClausura(models.Model):
+    """Motivos simples alcanzables desde cada compuesto (árbol aplanado), en orden"""
+    compuesto = models.ForeignKey(MotivoFalloCompuesto, on_delete=models.CASCADE, related_name="clausura")
+    motivo = models.ForeignKey(MotivoFalloSimple, on_delete=models.CASCADE, related_name="clausura_compuestos")
+    orden = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ["compuesto", "orden"]
+        constraints = [
+            models.UniqueConstraint(fields=["compuesto", "motivo"], name="unique_clausura_compuesto_motivo"),
+        ]
 
-#     def is_active(self) -> bool:
-#         return all(motivo.is_active() for motivo in self.motivos.all())
 
 class Item(models.Model):
     planilla = models.ForeignKey(
@@ -203,15 +496,48 @@ class Item(models.Model):
         blank=True,
         verbose_name="Motivo de fallo"
     )
+    motivo_fallo_compuesto = models.ForeignKey(
+        MotivoFalloCompuesto,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        verbose_name="Motivo de fallo compuesto"
+    )
+    # asignación vigente del paquete; la base garantiza una sola por paquete. Sigue vigente
+    # mientras el paquete se distribuye y se libera cuando vuelve al depósito (liberar_paquetes)
+    activo = models.BooleanField(default=True, verbose_name="Activo")
+
+    @staticmethod
+    def sumar_fallo(simples, compuestos, motivos, signo):
+        """
+        Suma signo al motivo de un ítem, dado como (motivo_fallo_id, motivo_fallo_compuesto_id),
+        en los dicts de fallos por motivo simple y compuesto (ver RegistroCambio.registrar_fallos)
+        """
+        simple_id, compuesto_id = motivos
+        if simple_id is not None:
+            simples[simple_id] = simples.get(simple_id, 0) + signo
+        if compuesto_id is not None:
+            compuestos[compuesto_id] = compuestos.get(compuesto_id, 0) + signo
+
+    @staticmethod
+    def liberar_paquetes(paquete_ids):
+        """Desactiva los items vigentes de los paquetes indicados. Devuelve cuántos liberó"""
+        liberados = Item.objects.filter(paquete_id__in=paquete_ids, activo=True).update(activo=False)
+        if liberados:
+            VersionTabla.incrementar(VersionTabla.ITEM)
+        return liberados
 
     def validar_paquete_unico_en_planilla(item: 'Item') -> None:    #Agregado
-        """Validacion de que un paquete no esté en múltiples planillas activas"""
-        if item.paquete.estado != Paquete.EstadoPaquete.EN_DEPOSITO:
+        """
+        Validacion de que un paquete no esté en múltiples planillas activas.
+        Es una búsqueda sobre el índice único parcial de items activos
+        """
+        if not item.activo:
             return
 
         query = Item.objects.filter(
-            paquete=item.paquete,
-            planilla__items__paquete__estado=Paquete.EstadoPaquete.EN_DEPOSITO
+            paquete_id=item.paquete_id,
+            activo=True
         ).exclude(id=item.id)
 
         if query.exists():
@@ -224,21 +550,441 @@ class Item(models.Model):
             models.UniqueConstraint(
                 fields=["planilla", "paquete"],
                 name="unique_planilla_paquete"
-            )
+            ),
+            models.UniqueConstraint(
+                fields=["paquete"],
+                condition=Q(activo=True),
+                name="unique_paquete_planilla_activa",
+                violation_error_message="Este paquete está en otra planilla activa."
+            ),
         ]
         ordering = ["posicion"]
+        indexes = [
+            # items de una planilla en orden, sin ordenar en memoria
+            models.Index(fields=["planilla", "posicion"], name="item_planilla_posicion_idx"),
+        ]
         verbose_name = "Ítem de Planilla"
         verbose_name_plural = "Ítems de Planilla"
 
     def __str__(self):
         return f"Ítem {self.posicion} - {self.paquete.tracking}"
 
+    def save(self, *args, **kwargs):
+        """
+        Un item creado individualmente (admin, shell) suma su paquete a los totales de la planilla.
+        Cualquier cambio del item (por ejemplo el motivo de fallo) incrementa la versión de la planilla
+        """
+        nuevo = self._state.adding
+        with transaction.atomic():
+            motivos_anteriores = None
+            if not nuevo:
+                motivos_anteriores = Item.objects.filter(pk=self.pk).values_list(
+                    'motivo_fallo_id', 'motivo_fallo_compuesto_id'
+                ).first()
+            motivos_anteriores = motivos_anteriores or (None, None)
+            super().save(*args, **kwargs)
+            if nuevo:
+                Planilla.objects.filter(pk=self.planilla_id).update(
+                    peso_total=F('peso_total') + self.paquete.peso,
+                    item_count=F('item_count') + 1,
+                    version=F('version') + 1
+                )
+            else:
+                Planilla.incrementar_version([self.planilla_id])
+
+            motivos = (self.motivo_fallo_id, self.motivo_fallo_compuesto_id)
+            if motivos != motivos_anteriores:
+                # un cambio de motivo corrige el fallo: se descuenta del anterior
+                simples, compuestos = {}, {}
+                Item.sumar_fallo(simples, compuestos, motivos_anteriores, -1)
+                Item.sumar_fallo(simples, compuestos, motivos, 1)
+                RegistroCambio.registrar_fallos(simples, compuestos)
+
     def clean(self):
         """Solo permite motivos actives"""
-        if self.motivo_fallo and not self.motivo_fallo.is_active():            
+        # se consulta el catálogo con la versión verificada y no la instancia en memoria,
+        # que puede ser anterior a una desactivación
+        if self.motivo_fallo_id and not CatalogoMotivos.simple_activo(self.motivo_fallo_id):
             raise ValidationError({
                 "motivo_fallo": "No se puede usar un motivo de fallo inactive."
             })
+        if self.motivo_fallo_id and self.motivo_fallo_compuesto_id:
+            raise ValidationError("Un ítem tiene un solo motivo de fallo: simple o compuesto.")
+        # active del compuesto está desnormalizado, no se recorren sus miembros
+        if self.motivo_fallo_compuesto_id and not CatalogoMotivos.compuesto_activo(self.motivo_fallo_compuesto_id):
+            raise ValidationError({
+                "motivo_fallo_compuesto": "No se puede usar un motivo de fallo compuesto inactive."
+            })
 
         # Agregado: Validar que el paquete no esté en múltiples planillas activas
-        self.validar_paquete_unico_en_planilla(self)
+        self.validar_paquete_unico_en_planilla()
+
+
+class VersionTabla(models.Model):
+    """
+    Contador de cambios por tabla. Cada escritura sobre paquetes, planillas o items
+    (incluidos los caminos masivos) lo incrementa en la misma transacción; los
+    listados lo usan para generar ETags sin recorrer los datos
+    """
+    PAQUETE = "paquete"
+    PLANILLA = "planilla"
+    ITEM = "item"
+    MOTIVO = "motivo"
+    # no es una versión: guarda el último id de RegistroCambio volcado en los resúmenes diarios
+    REPORTES = "reportes"
+
+    tabla = models.CharField(max_length=50, primary_key=True, verbose_name="Tabla")
+    version = models.PositiveBigIntegerField(default=0, verbose_name="Versión")
+
+    class Meta:
+        verbose_name = "Versión de tabla"
+        verbose_name_plural = "Versiones de tabla"
+
+    def __str__(self):
+        return f"{self.tabla} v{self.version}"
+
+    @staticmethod
+    def incrementar(*tablas):
+        """Incrementa la versión de las tablas indicadas con un único UPDATE"""
+        actualizadas = VersionTabla.objects.filter(tabla__in=tablas).update(version=F('version') + 1)
+        if actualizadas < len(tablas):
+            for tabla in tablas:
+                VersionTabla.objects.get_or_create(tabla=tabla, defaults={'version': 1})
+
+    @staticmethod
+    def obtener(tabla):
+        return VersionTabla.objects.filter(tabla=tabla).values_list('version', flat=True).first() or 0
+
+
+class ContadorPaquetes(models.Model):
+    """
+    Cantidad de paquetes por (cliente, estado, tipo), mantenida en la misma transacción
+    que cada escritura: Paquete.save, el borrado (signal), la carga masiva, la
+    distribución de planillas y la reclasificación de tipos. Ver reconstruir_contadores
+    """
+    cliente = models.ForeignKey(
+        Cliente,
+        on_delete=models.CASCADE,
+        related_name="contadores",
+        verbose_name="Cliente"
+    )
+    estado = models.CharField(max_length=20, choices=Paquete.EstadoPaquete.choices, verbose_name="Estado")
+    tipo = models.CharField(max_length=1, choices=Paquete.TipoPaquete.choices, verbose_name="Tipo de paquete")
+    cantidad = models.BigIntegerField(default=0, verbose_name="Cantidad")
+
+    class Meta:
+        verbose_name = "Contador de paquetes"
+        verbose_name_plural = "Contadores de paquetes"
+        constraints = [
+            models.UniqueConstraint(fields=["cliente", "estado", "tipo"], name="unique_contador_paquetes"),
+        ]
+
+    def __str__(self):
+        return f"{self.cliente_id}/{self.estado}/{self.tipo}: {self.cantidad}"
+
+    @staticmethod
+    def aplicar(deltas):
+        """
+        Suma a cada grupo su delta, con un dict {(cliente_id, estado, tipo): delta}.
+        Crea los grupos que faltan y hace un UPDATE por cada valor de delta distinto
+        """
+        deltas = {grupo: delta for grupo, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        ContadorPaquetes.objects.bulk_create(
+            [
+                ContadorPaquetes(cliente_id=cliente_id, estado=estado, tipo=tipo)
+                for (cliente_id, estado, tipo), delta in deltas.items() if delta > 0
+            ],
+            ignore_conflicts=True
+        )
+        por_delta = {}
+        for grupo, delta in deltas.items():
+            por_delta.setdefault(delta, []).append(grupo)
+        for delta, grupos in por_delta.items():
+            # 3 parámetros por grupo: lotes por debajo del límite de SQLite
+            for inicio in range(0, len(grupos), 300):
+                condicion = Q()
+                for cliente_id, estado, tipo in grupos[inicio:inicio + 300]:
+                    condicion |= Q(cliente_id=cliente_id, estado=estado, tipo=tipo)
+                ContadorPaquetes.objects.filter(condicion).update(cantidad=F('cantidad') + delta)
+
+    @staticmethod
+    def registrar_altas(paquetes):
+        """Suma paquetes creados sin pasar por save() (bulk_create)"""
+        deltas = {}
+        for paquete in paquetes:
+            grupo = (paquete.cliente_id, paquete.estado, paquete.tipo)
+            deltas[grupo] = deltas.get(grupo, 0) + 1
+        ContadorPaquetes.aplicar(deltas)
+
+    @staticmethod
+    def deltas_cambio_estado(grupos, estado_anterior, estado_nuevo):
+        """Deltas para paquetes que pasan de estado, a partir de (cliente_id, tipo, cantidad, ...)"""
+        deltas = {}
+        for cliente_id, tipo, cantidad, *_ in grupos:
+            deltas[(cliente_id, estado_anterior, tipo)] = deltas.get((cliente_id, estado_anterior, tipo), 0) - cantidad
+            deltas[(cliente_id, estado_nuevo, tipo)] = deltas.get((cliente_id, estado_nuevo, tipo), 0) + cantidad
+        return deltas
+
+    @staticmethod
+    def contar_paquetes():
+        """Conteo real por grupo, recorriendo la tabla de paquetes"""
+        return {
+            (cliente_id, estado, tipo): cantidad
+            for cliente_id, estado, tipo, cantidad in Paquete.objects.order_by().values_list(
+                'cliente_id', 'estado', 'tipo'
+            ).annotate(cantidad=Count('id'))
+        }
+
+    @staticmethod
+    def diferencias():
+        """Grupos donde el contador no coincide con el conteo real: {grupo: (contador, real)}"""
+        reales = ContadorPaquetes.contar_paquetes()
+        contadores = {
+            (cliente_id, estado, tipo): cantidad
+            for cliente_id, estado, tipo, cantidad in ContadorPaquetes.objects.values_list(
+                'cliente_id', 'estado', 'tipo', 'cantidad'
+            )
+        }
+        return {
+            grupo: (contadores.get(grupo, 0), reales.get(grupo, 0))
+            for grupo in contadores.keys() | reales.keys()
+            if contadores.get(grupo, 0) != reales.get(grupo, 0)
+        }
+
+    @staticmethod
+    def reconstruir():
+        """Reemplaza los contadores por el conteo real. Devuelve la cantidad de grupos"""
+        with transaction.atomic():
+            reales = ContadorPaquetes.contar_paquetes()
+            ContadorPaquetes.objects.all().delete()
+            ContadorPaquetes.objects.bulk_create([
+                ContadorPaquetes(cliente_id=cliente_id, estado=estado, tipo=tipo, cantidad=cantidad)
+                for (cliente_id, estado, tipo), cantidad in reales.items()
+            ])
+            return len(reales)
+
+
+class RegistroCambio(models.Model):
+    """
+    Registro de eventos para los reportes: ingresos y distribuciones por cliente y
+    fallos por motivo simple o compuesto, escrito en la misma transacción que el cambio.
+    ReporteUtils.procesar_registro lo vuelca de forma incremental en los resúmenes diarios
+    """
+    class Evento(models.TextChoices):
+        INGRESO = "ingreso", "Ingreso"
+        DISTRIBUCION = "distribucion", "Distribución"
+        FALLO = "fallo", "Fallo"
+
+    fecha = models.DateField(default=timezone.localdate, verbose_name="Fecha")
+    evento = models.CharField(max_length=20, choices=Evento.choices, verbose_name="Evento")
+    cliente = models.ForeignKey(
+        Cliente,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="+",
+        verbose_name="Cliente"
+    )
+    motivo_fallo = models.ForeignKey(
+        MotivoFalloSimple,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="+",
+        verbose_name="Motivo de fallo"
+    )
+    motivo_fallo_compuesto = models.ForeignKey(
+        MotivoFalloCompuesto,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="+",
+        verbose_name="Motivo de fallo compuesto"
+    )
+    cantidad = models.IntegerField(verbose_name="Cantidad")
+    peso = models.FloatField(default=0, verbose_name="Peso", help_text="En gramos")
+
+    class Meta:
+        verbose_name = "Registro de cambio"
+        verbose_name_plural = "Registro de cambios"
+        indexes = [
+            models.Index(fields=["fecha"]),
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} {self.evento} x{self.cantidad}"
+
+    @staticmethod
+    def registrar(evento, cantidades, pesos=None):
+        """
+        Agrega un evento por cliente con un único INSERT (los fallos van por registrar_fallos).
+        cantidades y pesos son dicts {cliente_id: valor}
+        """
+        pesos = pesos or {}
+        fecha = timezone.localdate()
+        RegistroCambio.objects.bulk_create([
+            RegistroCambio(fecha=fecha, evento=evento, cantidad=cantidad, peso=pesos.get(cliente_id, 0), cliente_id=cliente_id)
+            for cliente_id, cantidad in cantidades.items() if cantidad
+        ])
+
+    @staticmethod
+    def registrar_fallos(simples, compuestos):
+        """
+        Fallos por motivo simple y por motivo compuesto ({motivo_id: cantidad}) con un único
+        INSERT. Un ítem con motivo compuesto cuenta una vez, para el compuesto
+        """
+        fecha = timezone.localdate()
+        RegistroCambio.objects.bulk_create([
+            RegistroCambio(fecha=fecha, evento=RegistroCambio.Evento.FALLO, cantidad=cantidad, **{campo: motivo_id})
+            for campo, cantidades in (('motivo_fallo_id', simples), ('motivo_fallo_compuesto_id', compuestos))
+            for motivo_id, cantidad in cantidades.items() if cantidad
+        ])
+
+    @staticmethod
+    def registrar_ingresos(paquetes):
+        """Ingresos de paquetes creados sin pasar por save() (bulk_create)"""
+        cantidades, pesos = {}, {}
+        for paquete in paquetes:
+            cantidades[paquete.cliente_id] = cantidades.get(paquete.cliente_id, 0) + 1
+            pesos[paquete.cliente_id] = pesos.get(paquete.cliente_id, 0) + paquete.peso
+        RegistroCambio.registrar(RegistroCambio.Evento.INGRESO, cantidades, pesos)
+
+
+class ResumenDiarioCliente(models.Model):
+    """Paquetes ingresados y distribuidos (y su peso) por cliente y día, derivado de RegistroCambio"""
+    fecha = models.DateField(verbose_name="Fecha")
+    cliente = models.ForeignKey(
+        Cliente,
+        on_delete=models.CASCADE,
+        related_name="resumenes_diarios",
+        verbose_name="Cliente"
+    )
+    ingresados = models.IntegerField(default=0, verbose_name="Ingresados")
+    distribuidos = models.IntegerField(default=0, verbose_name="Distribuidos")
+    peso_distribuido = models.FloatField(default=0, verbose_name="Peso distribuido", help_text="En gramos")
+
+    class Meta:
+        verbose_name = "Resumen diario por cliente"
+        verbose_name_plural = "Resúmenes diarios por cliente"
+        constraints = [
+            models.UniqueConstraint(fields=["fecha", "cliente"], name="unique_resumen_diario_cliente"),
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} cliente {self.cliente_id}"
+
+
+class ResumenDiarioMotivo(models.Model):
+    """Ítems fallidos por motivo y día, derivado de RegistroCambio"""
+    fecha = models.DateField(verbose_name="Fecha")
+    motivo_fallo = models.ForeignKey(
+        MotivoFalloSimple,
+        on_delete=models.CASCADE,
+        related_name="resumenes_diarios",
+        verbose_name="Motivo de fallo"
+    )
+    fallidos = models.IntegerField(default=0, verbose_name="Fallidos")
+
+    class Meta:
+        verbose_name = "Resumen diario por motivo"
+        verbose_name_plural = "Resúmenes diarios por motivo"
+        constraints = [
+            models.UniqueConstraint(fields=["fecha", "motivo_fallo"], name="unique_resumen_diario_motivo"),
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} motivo {self.motivo_fallo_id}"
+
+
+class ResumenDiarioMotivoCompuesto(models.Model):
+    """Ítems fallidos por motivo compuesto y día, derivado de RegistroCambio"""
+    fecha = models.DateField(verbose_name="Fecha")
+    motivo_fallo_compuesto = models.ForeignKey(
+        MotivoFalloCompuesto,
+        on_delete=models.CASCADE,
+        related_name="resumenes_diarios",
+        verbose_name="Motivo de fallo compuesto"
+    )
+    fallidos = models.IntegerField(default=0, verbose_name="Fallidos")
+
+    class Meta:
+        verbose_name = "Resumen diario por motivo compuesto"
+        verbose_name_plural = "Resúmenes diarios por motivo compuesto"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["fecha", "motivo_fallo_compuesto"], name="unique_resumen_diario_motivo_compuesto"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} motivo compuesto {self.motivo_fallo_compuesto_id}"
+
+
+class PlanillaArchivada(models.Model):
+    """
+    Planilla cerrada (todos sus paquetes en distribución) movida a la base de archivo
+    por ArchivoUtils. Conserva el id original; vive solo en la base 'archivo' (ver ArchivoRouter)
+    """
+    id = models.BigIntegerField(primary_key=True)
+    numero_planilla = models.CharField(max_length=50, unique=True, verbose_name="Número de planilla")
+    fecha = models.DateField(verbose_name="Fecha de creación")
+    peso_total = models.FloatField(default=0, verbose_name="Peso total", help_text="En gramos")
+    item_count = models.PositiveIntegerField(default=0, verbose_name="Cantidad de ítems")
+    archivada_en = models.DateTimeField(default=timezone.now, verbose_name="Archivada en")
+
+    class Meta:
+        verbose_name = "Planilla archivada"
+        verbose_name_plural = "Planillas archivadas"
+
+    def __str__(self):
+        return f"Planilla archivada {self.numero_planilla} - {self.fecha}"
+
+
+class PaqueteArchivado(models.Model):
+    """Paquete de planillas archivadas, con el id original. Cliente y motivos quedan como ids"""
+    id = models.BigIntegerField(primary_key=True)
+    tracking = models.CharField(max_length=50, unique=True, verbose_name="Número de seguimiento")
+    direccion_destinatario = models.CharField(max_length=200, verbose_name="Dirección del destinatario")
+    telefono_destinatario = models.CharField(max_length=20, verbose_name="Teléfono del destinatario")
+    nombre_destinatario = models.CharField(max_length=100, verbose_name="Nombre del destinatario")
+    peso = models.FloatField(verbose_name="Peso", help_text="En gramos")
+    altura = models.FloatField(verbose_name="Altura", help_text="En centímetros")
+    estado = models.CharField(max_length=20, choices=Paquete.EstadoPaquete.choices, verbose_name="Estado")
+    tipo = models.CharField(max_length=1, choices=Paquete.TipoPaquete.choices, blank=True, verbose_name="Tipo de paquete")
+    cliente_id = models.BigIntegerField(verbose_name="Cliente")
+    archivado_en = models.DateTimeField(default=timezone.now, verbose_name="Archivado en")
+
+    class Meta:
+        verbose_name = "Paquete archivado"
+        verbose_name_plural = "Paquetes archivados"
+
+    def __str__(self):
+        return f"Paquete archivado {self.tracking}"
+
+
+class ItemArchivado(models.Model):
+    """
+    Item de una planilla archivada. El paquete es un id: puede seguir en la base principal
+    si todavía figura en otra planilla sin archivar
+    """
+    id = models.BigIntegerField(primary_key=True)
+    planilla = models.ForeignKey(
+        PlanillaArchivada,
+        on_delete=models.CASCADE,
+        related_name="items",
+        verbose_name="Planilla"
+    )
+    paquete_id = models.BigIntegerField(db_index=True, verbose_name="Paquete")
+    posicion = models.PositiveIntegerField(verbose_name="Posición")
+    activo = models.BooleanField(default=True, verbose_name="Activo")
+    motivo_fallo_id = models.BigIntegerField(null=True, blank=True, verbose_name="Motivo de fallo")
+    motivo_fallo_compuesto_id = models.BigIntegerField(null=True, blank=True, verbose_name="Motivo de fallo compuesto")
+
+    class Meta:
+        verbose_name = "Ítem archivado"
+        verbose_name_plural = "Ítems archivados"
+
+    def __str__(self):
+        return f"Ítem archivado {self.id} de planilla {self.planilla_id}"
@@ -0,0 +1,208 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginacion por cursor (keyset) sobre una o varias columnas de orden.
+
+    El cursor guarda los valores de orden de la ultima fila devuelta y la
+    pagina siguiente se obtiene con un WHERE sobre esos valores, por lo que el
+    costo no depende de la profundidad de la pagina y nunca se ejecuta COUNT(*).
+    Si el orden no incluye un campo unico se agrega la pk como desempate.
+    """
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Cursor inválido'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    ordering = ('-pk',)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.preparar_pagina(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.cortar_pagina(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Igual a paginate_queryset para vistas async: la página se lee con el ORM async"""
+        queryset = self.preparar_pagina(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.cortar_pagina([fila async for fila in queryset.aiterator()])
+
+    def preparar_pagina(self, queryset, request, view=None):
+        """Aplica el cursor y el orden; devuelve el queryset de la página más una fila, sin ejecutarlo"""
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(queryset, view)
+        self.cursor = self.decode_cursor(request)
+
+        self.reverse = False
+        if self.cursor is not None:
+            valores, self.reverse = self.cursor
+            queryset = queryset.filter(self.get_keyset_filter(valores, self.reverse))
+
+        order_by = [
+            ('-' if desc != self.reverse else '') + campo
+            for campo, desc in self.ordering
+        ]
+        return queryset.order_by(*order_by)[:self.page_size + 1]
+
+    def cortar_pagina(self, results):
+        reverse = self.reverse
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+
+        if reverse:
+            self.has_next = self.cursor is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                valor = int(request.query_params[self.page_size_query_param])
+                if valor > 0:
+                    return min(valor, self.max_page_size)
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def get_ordering(self, queryset, view):
+        """
+        Devuelve el orden como lista de (campo, descendente).
+        Respeta el orden aplicado por OrderingFilter y garantiza un desempate unico.
+        """
+        ordering = list(queryset.query.order_by)
+        if not ordering:
+            ordering = list(getattr(view, 'ordering', None) or self.ordering)
+        if isinstance(ordering, str):
+            ordering = [ordering]
+
+        opts = queryset.model._meta
+        resultado = []
+        for termino in ordering:
+            if not isinstance(termino, str):
+                raise ValueError('KeysetPagination solo admite ordenes por nombre de campo')
+            desc = termino.startswith('-')
+            campo = termino.lstrip('-')
+            if campo == 'pk':
+                campo = opts.pk.name
+            resultado.append((campo, desc))
+
+        if not any(self._es_unico(opts, campo) for campo, _ in resultado):
+            resultado.append((opts.pk.name, resultado[-1][1] if resultado else True))
+        return resultado
+
+    @staticmethod
+    def _es_unico(opts, campo):
+        try:
+            field = opts.get_field(campo)
+        except Exception:
+            return False
+        return field.primary_key or field.unique
+
+    def get_keyset_filter(self, valores, reverse):
+        """Construye (a > x) OR (a = x AND b > y) ... segun la direccion de cada campo"""
+        condicion = Q()
+        igualdad = {}
+        for (campo, desc), valor in zip(self.ordering, valores):
+            lookup = 'lt' if desc != reverse else 'gt'
+            condicion |= Q(**igualdad, **{f'{campo}__{lookup}': valor})
+            igualdad[campo] = valor
+        return condicion
+
+    def get_position(self, obj):
+        posicion = []
+        for campo, _ in self.ordering:
+            if isinstance(obj, dict):
+                valor = obj[campo]
+            else:
+                try:
+                    valor = getattr(obj, obj._meta.get_field(campo).attname)
+                except FieldDoesNotExist:
+                    # orden por una anotacion (por ejemplo la relevancia de la busqueda)
+                    valor = getattr(obj, campo)
+            if hasattr(valor, 'isoformat'):
+                valor = valor.isoformat()
+            posicion.append(valor)
+        return posicion
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.get_position(self.page[-1]), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.get_position(self.page[0]), reverse=True)
+
+    def _firma_orden(self):
+        return ','.join(('-' if desc else '') + campo for campo, desc in self.ordering)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            valores = data['p']
+            reverse = bool(data.get('r'))
+            if data.get('o') != self._firma_orden() or len(valores) != len(self.ordering):
+                raise ValueError
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        return valores, reverse
+
+    def encode_cursor(self, posicion, reverse):
+        data = {'p': posicion, 'o': self._firma_orden()}
+        if reverse:
+            data['r'] = 1
+        encoded = base64.urlsafe_b64encode(
+            json.dumps(data, separators=(',', ':')).encode('utf-8')
+        ).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+
+class PaqueteCursorPagination(KeysetPagination):
+    """Paginacion del listado de paquetes, por defecto ordenado por -tracking"""
+    ordering = ('-tracking',)
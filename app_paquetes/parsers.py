@@ -0,0 +1,39 @@
+import json
+
+from django.conf import settings
+from rest_framework.parsers import BaseParser
+
+
+class FilaInvalida:
+    """Línea de un cuerpo NDJSON que no se pudo decodificar"""
+
+    def __init__(self, error):
+        self.error = error
+
+
+class NDJSONParser(BaseParser):
+    """
+    Parsea un cuerpo NDJSON (un objeto JSON por línea) de forma perezosa:
+    devuelve un generador que lee el stream línea a línea, asi el cuerpo
+    nunca se carga completo en memoria. Las líneas vacías se ignoran y las
+    inválidas se entregan como FilaInvalida para reportarlas por fila.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        return self._filas(stream, encoding)
+
+    @staticmethod
+    def _filas(stream, encoding):
+        if stream is None:
+            return
+        for linea in stream:
+            linea = linea.strip()
+            if not linea:
+                continue
+            try:
+                yield json.loads(linea.decode(encoding))
+            except (UnicodeDecodeError, ValueError) as exc:
+                yield FilaInvalida(f'JSON inválido: {exc}')
@@ -0,0 +1,100 @@
+import contextvars
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+ALIAS_LECTURA = 'lectura'
+
+_en_lectura = contextvars.ContextVar('paquetes_en_lectura', default=False)
+
+
+@contextmanager
+def usar_lectura():
+    """
+    Dentro del bloque las lecturas del ORM van a la conexión de solo lectura.
+    Es un contextvar: vale para el thread o la tarea async actual (y lo que ésta
+    ejecute con sync_to_async), no para el resto de los requests
+    """
+    token = _en_lectura.set(True)
+    try:
+        yield
+    finally:
+        _en_lectura.reset(token)
+
+
+class LecturaRouter:
+    """
+    Envía las lecturas a la conexión 'lectura' (mismo archivo SQLite, abierto en modo
+    solo lectura) mientras rige usar_lectura(); el resto del tiempo, y siempre para las
+    escrituras, usa default. Con WAL la conexión de lectura ve todo lo confirmado sin
+    competir por el lock de escritura. Si el alias no está configurado (o en los tests)
+    no hace nada
+    """
+
+    def db_for_read(self, model, **hints):
+        if _en_lectura.get() and self.lectura_disponible():
+            return ALIAS_LECTURA
+        return None
+
+    @staticmethod
+    def lectura_disponible():
+        # en los tests el alias es espejo de default (TEST MIRROR) y comparte su base en
+        # memoria: una segunda conexión no vería la transacción del test
+        if ALIAS_LECTURA not in settings.DATABASES:
+            return False
+        return connections[ALIAS_LECTURA].settings_dict['NAME'] != connections[DEFAULT_DB_ALIAS].settings_dict['NAME']
+
+    def db_for_write(self, model, **hints):
+        # una instancia leída de 'lectura' se guarda en default (sin esto Django usaría su base)
+        instancia = hints.get('instance')
+        if instancia is not None and instancia._state.db == ALIAS_LECTURA:
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # las dos conexiones son la misma base
+        if {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, ALIAS_LECTURA}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == ALIAS_LECTURA:
+            return False
+        return None
+
+
+ALIAS_ARCHIVO = 'archivo'
+MODELOS_ARCHIVO = {'planillaarchivada', 'paquetearchivado', 'itemarchivado'}
+
+
+class ArchivoRouter:
+    """
+    Los modelos archivados (PlanillaArchivada, PaqueteArchivado, ItemArchivado) viven solo
+    en la base 'archivo', un archivo SQLite aparte: la base principal conserva solo el
+    trabajo activo. Sus tablas se crean con `manage.py migrate --database archivo`.
+    Las operaciones de migración sin modelo (RunPython de datos, índice FTS5) no corren
+    en esa base
+    """
+
+    def _es_archivo(self, model):
+        return model._meta.app_label == 'app_paquetes' and model._meta.model_name in MODELOS_ARCHIVO
+
+    def db_for_read(self, model, **hints):
+        return ALIAS_ARCHIVO if self._es_archivo(model) else None
+
+    def db_for_write(self, model, **hints):
+        return ALIAS_ARCHIVO if self._es_archivo(model) else None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if self._es_archivo(type(obj1)) or self._es_archivo(type(obj2)):
+            return self._es_archivo(type(obj1)) and self._es_archivo(type(obj2))
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        archivado = app_label == 'app_paquetes' and model_name in MODELOS_ARCHIVO
+        if db == ALIAS_ARCHIVO:
+            return archivado
+        if archivado:
+            return False
+        return None
@@ -1,6 +1,7 @@
 # serializers.py
 from rest_framework import serializers
-from .models import Cliente, Paquete, Planilla, Item, MotivoFalloSimple
+from .models import Cliente, Paquete, Planilla, Item, MotivoFalloSimple, MotivoFalloCompuesto
+from .utils.planilla_utils import PlanillaUtils
 
 
 class ClienteSerializer(serializers.ModelSerializer):
@@ -25,10 +26,53 @@ class PaqueteCreateSerializer(serializers.ModelSerializer):
         ]
 
 
+class PaqueteBulkCreateSerializer(serializers.ModelSerializer):
+    """
+    Validación de una fila de la carga masiva sin consultas a la base:
+    el cliente y la unicidad del tracking se resuelven por lote en la vista
+    """
+    cliente = serializers.IntegerField()
+
+    class Meta:
+        model = Paquete
+        fields = [
+            'tracking', 'direccion_destinatario', 'telefono_destinatario',
+            'nombre_destinatario', 'peso', 'altura', 'cliente'
+        ]
+        extra_kwargs = {'tracking': {'validators': []}}
+
+    def validate_peso(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("El peso debe ser mayor a 0")
+        if value > 25000.0:
+            raise serializers.ValidationError("El peso debe ser menor a 25") #se asume como regla de negocio
+        return value
+
+
 class PlanillaSerializer(serializers.ModelSerializer):
     class Meta:
         model = Planilla
         fields = '__all__'
+        read_only_fields = ('peso_total', 'item_count', 'version')
+
+
+class PlanillaArmarSerializer(serializers.Serializer):
+    """Parámetros de planillas/armar/: dry_run acepta true/false también como texto"""
+    cliente = serializers.IntegerField(required=False, allow_null=True, min_value=1)
+    tipo = serializers.ChoiceField(
+        choices=Paquete.TipoPaquete.values, required=False, allow_null=True,
+        error_messages={'invalid_choice': 'Tipo de paquete inválido'}
+    )
+    estrategia = serializers.ChoiceField(
+        choices=PlanillaUtils.ESTRATEGIAS, default='bfd',
+        error_messages={'invalid_choice': f'Estrategia inválida, opciones: {", ".join(PlanillaUtils.ESTRATEGIAS)}'}
+    )
+    dry_run = serializers.BooleanField(default=False)
+
+
+class PlanillaBulkDistribuirSerializer(serializers.Serializer):
+    """Parámetros de planillas/bulk-distribuir/: una lista no vacía de ids"""
+    planilla_ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False)
 
 
 class ItemSerializer(serializers.ModelSerializer):
@@ -46,7 +90,7 @@ class ItemWithDetailsSerializer(serializers.ModelSerializer):
     class Meta:
         model = Item
         fields = ['id', 'posicion', 'paquete_tracking', 'paquete_estado', 
-                 'paquete_tipo', 'paquete_peso', 'motivo_fallo']
+                 'paquete_tipo', 'paquete_peso', 'motivo_fallo', 'motivo_fallo_compuesto']
 
 
 class PlanillaResumenSerializer(serializers.ModelSerializer):
@@ -67,8 +111,14 @@ class MotivoFalloSimpleSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-# class MotivoFalloCompuestoSerializer(serializers.ModelSerializer):
-#     class Meta:
-#         model = MotivoFalloCompuesto
-#         fields = '__all__'
+class MotivoFalloCompuestoSerializer(serializers.ModelSerializer):
+    """Campos desnormalizados del compuesto y sus motivos simples ya aplanados (clausura)"""
+    motivos_simples = serializers.SerializerMethodField()
+
+    class Meta:
+        model = MotivoFalloCompuesto
+        fields = ['id', 'codigo', 'nombre', 'descripcion', 'active', 'motivos_simples']
+
+    def get_motivos_simples(self, obj):
+        return [fila.motivo_id for fila in obj.clausura.all()]
 
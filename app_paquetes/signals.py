@@ -0,0 +1,132 @@
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import (
+    ContadorPaquetes, Item, MotivoFalloClausura, MotivoFalloCompuesto, MotivoFalloSimple,
+    Paquete, Planilla, VersionTabla,
+)
+from .utils.cache_utils import CatalogoMotivos
+
+
+@receiver(post_delete, sender=Item)
+def descontar_item_de_planilla(sender, instance, **kwargs):
+    """Resta el paquete del item borrado (directamente o en cascada) de los totales de la planilla"""
+    peso = Paquete.objects.filter(pk=instance.paquete_id).values_list('peso', flat=True).first() or 0
+    Planilla.objects.filter(pk=instance.planilla_id).update(
+        peso_total=F('peso_total') - peso,
+        item_count=Greatest(F('item_count') - 1, 0),
+        version=F('version') + 1
+    )
+
+
+@receiver(post_save, sender=Paquete)
+def invalidar_planillas_del_paquete(sender, instance, created, **kwargs):
+    """Un paquete modificado (estado, peso, tracking...) cambia el resumen de sus planillas"""
+    if created:
+        return
+    Planilla.objects.filter(items__paquete_id=instance.pk).update(version=F('version') + 1)
+
+
+@receiver(post_delete, sender=Paquete)
+def descontar_paquete_de_contadores(sender, instance, **kwargs):
+    ContadorPaquetes.aplicar({instance.grupo_contador(): -1})
+
+
+@receiver([post_save, post_delete], sender=Paquete)
+def versionar_paquetes(sender, **kwargs):
+    VersionTabla.incrementar(VersionTabla.PAQUETE)
+
+
+@receiver([post_save, post_delete], sender=Planilla)
+def versionar_planillas(sender, **kwargs):
+    VersionTabla.incrementar(VersionTabla.PLANILLA)
+
+
+@receiver([post_save, post_delete], sender=Item)
+def versionar_items(sender, **kwargs):
+    # toda escritura de items también actualiza los totales o la versión de su planilla
+    VersionTabla.incrementar(VersionTabla.ITEM, VersionTabla.PLANILLA)
+
+
+# motivos compuestos: la clausura y los campos desnormalizados se recalculan al escribir
+
+@receiver(m2m_changed, sender=MotivoFalloCompuesto.motivos.through)
+def recalcular_compuesto_por_motivos(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # desde el motivo simple: se guardan los compuestos antes de perder la relación
+        instance._compuestos_afectados = set(instance.compuestos.values_list('id', flat=True))
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        MotivoFalloCompuesto.recalcular_clausura([instance.pk])
+    else:
+        MotivoFalloCompuesto.recalcular_clausura(pk_set or getattr(instance, '_compuestos_afectados', ()))
+
+
+@receiver(m2m_changed, sender=MotivoFalloCompuesto.submotivos.through)
+def recalcular_compuesto_por_submotivos(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_add':
+        padres, hijos = (pk_set, [instance.pk]) if reverse else ([instance.pk], pk_set)
+        for padre_id in padres:
+            for hijo_id in hijos:
+                if MotivoFalloCompuesto.contiene(hijo_id, padre_id):
+                    raise ValidationError("Un motivo compuesto no puede contenerse a sí mismo.")
+        return
+    if reverse and action == 'pre_clear':
+        instance._compuestos_afectados = set(instance.contenido_en.values_list('id', flat=True))
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        MotivoFalloCompuesto.recalcular_clausura([instance.pk])
+    else:
+        MotivoFalloCompuesto.recalcular_clausura(pk_set or getattr(instance, '_compuestos_afectados', ()))
+
+
+@receiver(post_save, sender=MotivoFalloCompuesto)
+def recalcular_datos_compuesto(sender, instance, **kwargs):
+    # los campos son derivados: una edición directa se pisa con los valores calculados
+    MotivoFalloCompuesto.recalcular_datos([instance.pk])
+
+
+@receiver(pre_delete, sender=MotivoFalloCompuesto)
+def recordar_padres_compuesto(sender, instance, **kwargs):
+    instance._compuestos_afectados = set(instance.contenido_en.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=MotivoFalloCompuesto)
+def recalcular_padres_compuesto(sender, instance, **kwargs):
+    MotivoFalloCompuesto.recalcular_clausura(getattr(instance, '_compuestos_afectados', ()))
+
+
+@receiver(post_save, sender=MotivoFalloSimple)
+def recalcular_compuestos_del_motivo(sender, instance, created, **kwargs):
+    """Un motivo simple modificado (nombre, active...) cambia los compuestos que lo incluyen"""
+    if created:
+        return
+    MotivoFalloCompuesto.recalcular_datos(
+        MotivoFalloClausura.objects.filter(motivo=instance).values_list('compuesto_id', flat=True)
+    )
+
+
+@receiver(pre_delete, sender=MotivoFalloSimple)
+def recordar_compuestos_del_motivo(sender, instance, **kwargs):
+    instance._compuestos_afectados = set(
+        MotivoFalloClausura.objects.filter(motivo=instance).values_list('compuesto_id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=MotivoFalloSimple)
+def recalcular_compuestos_sin_motivo(sender, instance, **kwargs):
+    MotivoFalloCompuesto.recalcular_clausura(getattr(instance, '_compuestos_afectados', ()))
+
+
+@receiver([post_save, post_delete], sender=MotivoFalloSimple)
+@receiver([post_save, post_delete], sender=MotivoFalloCompuesto)
+def versionar_motivos(sender, **kwargs):
+    VersionTabla.incrementar(VersionTabla.MOTIVO)
+    # la copia de este proceso se verifica apenas se confirma el cambio, aun con TTL
+    transaction.on_commit(CatalogoMotivos.invalidar)
@@ -1,3 +1,1685 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import re
+import threading
+from contextlib import ExitStack
+from datetime import timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.test import APIClient
+
+from .models import (
+    Cliente, ContadorPaquetes, Item, ItemArchivado, MotivoFalloClausura, MotivoFalloCompuesto, MotivoFalloSimple, Paquete,
+    PaqueteArchivado, Planilla, ResumenDiarioCliente, VersionTabla,
+)
+from .middleware import InstrumentacionSQLMiddleware
+from .mixins import ValuesListMixin
+from .routers import ALIAS_ARCHIVO, ALIAS_LECTURA, LecturaRouter
+from .serializers import MotivoFalloSimpleSerializer, PaqueteSerializer
+from .utils.archivo_utils import ArchivoUtils
+from .utils.busqueda_utils import BusquedaUtils
+from .utils.cache_utils import CatalogoMotivos, ResumenPlanillaCache
+from .utils.escritura_utils import ColaEscritura
+from .utils.instrumentacion_utils import EstadisticasSQL
+from .utils.paquete_utils import PaqueteUtils
+from .utils.planilla_utils import PlanillaUtils
+from .utils.reporte_utils import ReporteUtils
+from .views import PaqueteExportView
+
+
+def crear_paquete(cliente, tracking, peso=1000, **campos):
+    return Paquete.objects.create(
+        tracking=tracking, direccion_destinatario=campos.pop('direccion_destinatario', 'Calle 1'),
+        telefono_destinatario='1', nombre_destinatario=campos.pop('nombre_destinatario', 'Destinatario'),
+        peso=peso, altura=10, cliente=cliente, **campos
+    )
+
+
+class PlanesDeConsultaTests(TestCase):
+    """
+    EXPLAIN QUERY PLAN de las consultas frecuentes de las vistas y los modelos. Cada
+    prueba ejecuta el camino real (endpoint o método), captura sus consultas y falla si
+    alguna recorre una tabla entera o necesita un B-tree temporal para ordenar: señal de
+    que se perdió (o no se usa) el índice compuesto que la resuelve.
+
+    La base de tests no tiene estadísticas (ANALYZE), así que el planificador elige por
+    la forma de los índices, igual que en una base recién migrada
+    """
+    # SCAN sin USING: recorrido completo de la tabla
+    RECORRIDO = re.compile(r'^SCAN (?!CONSTANT ROW)\S+$')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente = Cliente.objects.create(nombre='Cliente', email='cliente@test.com', telefono='1')
+        cls.paquetes = [
+            Paquete.objects.create(
+                tracking=f'TRK{i:03}', direccion_destinatario='Calle 1', telefono_destinatario='1',
+                nombre_destinatario='Destinatario', peso=1000, altura=10, cliente=cls.cliente
+            )
+            for i in range(6)
+        ]
+        cls.planilla = Planilla.objects.create(numero_planilla='PL-1')
+        cls.planilla.agregar_paquetes(cls.paquetes[:3])
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def planes(self, funcion):
+        """Ejecuta la función y devuelve [(sql, [líneas del plan])] de sus consultas"""
+        with CaptureQueriesContext(connection) as capturadas:
+            funcion()
+        planes = []
+        with connection.cursor() as cursor:
+            for consulta in capturadas.captured_queries:
+                sql = consulta['sql']
+                if not sql.startswith(('SELECT', 'UPDATE', 'DELETE')):
+                    continue
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                planes.append((sql, [fila[3] for fila in cursor.fetchall()]))
+        return planes
+
+    def assertUsaIndices(self, funcion, agrupado=False):
+        """
+        Falla ante un recorrido completo o un B-tree temporal. Con agrupado se admite el
+        B-tree de un GROUP BY (agregados sobre filas ya buscadas por índice)
+        """
+        planes = self.planes(funcion)
+        self.assertTrue(planes, 'La función no ejecutó consultas')
+        for sql, plan in planes:
+            for linea in plan:
+                temporal = 'USE TEMP B-TREE' in linea and not (agrupado and 'GROUP BY' in linea)
+                if self.RECORRIDO.match(linea) or temporal:
+                    self.fail(f'{linea}\n  en: {sql}\n  plan: {plan}')
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return response
+
+    def test_listado_paquetes(self):
+        for url in [
+            '/api/paquetes/',
+            '/api/paquetes/?estado=en_deposito',
+            f'/api/paquetes/?cliente={self.cliente.id}',
+            f'/api/paquetes/?cliente={self.cliente.id}&estado=en_deposito',
+            '/api/paquetes/?ordering=-estado,tracking',
+            '/api/paquetes/?ordering=estado',
+        ]:
+            with self.subTest(url=url):
+                self.assertUsaIndices(lambda: self.get(url))
+
+    def test_listado_paquetes_segunda_pagina(self):
+        for url in ['/api/paquetes/?page_size=2', '/api/paquetes/?page_size=2&estado=en_deposito']:
+            siguiente = self.get(url).json()['next']
+            with self.subTest(url=url):
+                self.assertUsaIndices(lambda: self.get(siguiente))
+
+    def test_orden_por_defecto_del_modelo(self):
+        self.assertUsaIndices(lambda: list(Paquete.objects.all()[:100]))
+        self.assertUsaIndices(lambda: list(Paquete.objects.filter(estado=Paquete.EstadoPaquete.EN_DEPOSITO)[:100]))
+
+    def test_exportacion_filtrada(self):
+        for url in [
+            '/api/paquetes/export/?estado=en_deposito',
+            f'/api/paquetes/export/?cliente={self.cliente.id}&formato=ndjson',
+        ]:
+            with self.subTest(url=url):
+                self.assertUsaIndices(lambda: b''.join(self.get(url).streaming_content))
+
+    def test_detalle_planilla(self):
+        self.assertUsaIndices(lambda: self.get(f'/api/planillas/{self.planilla.id}/'))
+
+    def test_consulta_por_tracking(self):
+        self.assertUsaIndices(lambda: PaqueteUtils.consultar_trackings(['TRK000', 'TRK004', 'NO-EXISTE']))
+
+    def test_asignacion_a_planilla(self):
+        paquete = self.paquetes[3]
+        self.assertUsaIndices(lambda: self.client.patch(
+            f'/api/paquetes/{paquete.id}/assign-planilla/', {'planilla_id': self.planilla.id}, format='json'
+        ))
+        self.assertTrue(Item.objects.filter(paquete=paquete, activo=True).exists())
+
+    def test_paquetes_disponibles(self):
+        for cliente, tipo in [(None, None), (self.cliente.id, None), (self.cliente.id, Paquete.TipoPaquete.PEQUENO)]:
+            with self.subTest(cliente=cliente, tipo=tipo):
+                self.assertUsaIndices(lambda: list(
+                    PlanillaUtils.paquetes_disponibles(cliente, tipo).order_by('id').values_list('id', 'peso')
+                ))
+
+    def test_distribucion(self):
+        # paquetes de los items de la planilla filtrados por estado; el GROUP BY es sobre esas filas
+        self.assertUsaIndices(lambda: Planilla.distribuir_planillas([self.planilla.id]), agrupado=True)
+        self.assertEqual(
+            Paquete.objects.filter(estado=Paquete.EstadoPaquete.EN_DISTRIBUCION).count(), 3
+        )
+
+    def test_guardado_de_paquete(self):
+        paquete = self.paquetes[0]
+        paquete.peso = 2000
+        self.assertUsaIndices(paquete.save)
+
+
+class PaginacionPorCursorTests(TestCase):
+    """Listado de paquetes por cursor: recorrido completo, ida y vuelta y cursores inválidos"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente = Cliente.objects.create(nombre='Cliente')
+        for i in range(7):
+            crear_paquete(cls.cliente, f'TRK{i:03}')
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def recorrer(self, url):
+        """Sigue los links next desde url; devuelve los tracking de cada página"""
+        paginas = []
+        while url:
+            datos = self.client.get(url).json()
+            paginas.append([paquete['tracking'] for paquete in datos['results']])
+            url = datos['next']
+        return paginas
+
+    def test_recorre_todas_las_filas_sin_repetir(self):
+        paginas = self.recorrer('/api/paquetes/?page_size=3')
+        self.assertEqual([len(pagina) for pagina in paginas], [3, 3, 1])
+        self.assertEqual(sum(paginas, []), [f'TRK{i:03}' for i in range(6, -1, -1)])
+
+    def test_orden_con_desempate(self):
+        # estado no es único: el cursor agrega el id y no pierde filas con el mismo estado
+        paginas = self.recorrer('/api/paquetes/?page_size=2&ordering=estado')
+        trackings = sum(paginas, [])
+        self.assertEqual(len(trackings), 7)
+        self.assertEqual(set(trackings), {f'TRK{i:03}' for i in range(7)})
+
+    def test_filas_nuevas_no_desplazan_la_pagina_siguiente(self):
+        primera = self.client.get('/api/paquetes/?page_size=3').json()
+        # una fila anterior al cursor no cambia lo que sigue (con OFFSET se repetiría TRK004)
+        crear_paquete(self.cliente, 'TRK999')
+        segunda = self.client.get(primera['next']).json()
+        self.assertEqual([paquete['tracking'] for paquete in segunda['results']], ['TRK003', 'TRK002', 'TRK001'])
+
+    def test_pagina_anterior(self):
+        primera = self.client.get('/api/paquetes/?page_size=3').json()
+        self.assertIsNone(primera['previous'])
+        segunda = self.client.get(primera['next']).json()
+        anterior = self.client.get(segunda['previous']).json()
+        self.assertEqual(anterior['results'], primera['results'])
+
+    def test_cursor_invalido(self):
+        self.assertEqual(self.client.get('/api/paquetes/?cursor=no-es-un-cursor').status_code, 404)
+        # un cursor de otro orden no se aplica
+        siguiente = self.client.get('/api/paquetes/?page_size=3').json()['next']
+        self.assertEqual(self.client.get(siguiente + '&ordering=estado').status_code, 404)
+
+
+class ListadoRapidoTests(TestCase):
+    """?fast=1 arma el listado desde .values() con el mismo JSON que el serializer"""
+
+    @classmethod
+    def setUpTestData(cls):
+        clientes = [Cliente.objects.create(nombre=f'Cliente {i}') for i in range(2)]
+        for i in range(7):
+            crear_paquete(
+                clientes[i % 2], f'TRK{i:03}', peso=500 + i * 3000.5, nombre_destinatario=f'Destinatario ñ {i}',
+                estado=Paquete.EstadoPaquete.EN_DISTRIBUCION if i % 3 else Paquete.EstadoPaquete.EN_DEPOSITO,
+            )
+        MotivoFalloSimple.objects.create(codigo='A', nombre='Ausente', active=False)
+        MotivoFalloSimple.objects.create(codigo='D', nombre='Dirección')
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def recorrer(self, url):
+        """Resultados de todas las páginas, como texto JSON (distingue 1000 de 1000.0)"""
+        resultados = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            datos = response.json()
+            resultados.extend(datos['results'])
+            url = datos['next']
+        return json.dumps(resultados)
+
+    def test_misma_salida_que_el_serializer(self):
+        tipo = PaqueteUtils.determinar_tipo_paquete(3500.5)
+        for parametros in ['', 'estado=en_deposito', 'ordering=estado', 'page_size=2', 'search=TRK00', f'tipo={tipo}']:
+            with self.subTest(parametros=parametros):
+                normal = self.recorrer(f'/api/paquetes/?{parametros}')
+                self.assertEqual(self.recorrer(f'/api/paquetes/?{parametros}&fast=1'), normal)
+                self.assertNotEqual(normal, '[]')
+
+    def test_setting_y_parametro(self):
+        normal = self.recorrer('/api/paquetes/')
+        with override_settings(PAQUETES_LISTADOS_RAPIDOS=True), \
+                mock.patch.object(PaqueteSerializer, 'to_representation', side_effect=AssertionError):
+            self.assertEqual(self.recorrer('/api/paquetes/'), normal)
+            with self.assertRaises(AssertionError):
+                self.client.get('/api/paquetes/?fast=0')
+
+    def test_serializar_valores(self):
+        for queryset, serializer_class in [
+            (Paquete.objects.order_by('id'), PaqueteSerializer),
+            (MotivoFalloSimple.objects.order_by('id'), MotivoFalloSimpleSerializer),
+        ]:
+            with self.subTest(serializer=serializer_class.__name__):
+                self.assertEqual(
+                    json.dumps(ValuesListMixin.serializar_valores(queryset, serializer_class)),
+                    json.dumps(serializer_class(queryset, many=True).data),
+                )
+
+    def test_campos_no_soportados(self):
+        class ConCampoCalculado(PaqueteSerializer):
+            etiqueta = serializers.SerializerMethodField()
+
+        with self.assertRaises(ImproperlyConfigured):
+            ValuesListMixin.get_mapeo_valores(ConCampoCalculado)
+
+
+class ArmadoDePlanillasTests(TestCase):
+    """planillas/armar/: validación de los parámetros y reparto de los paquetes disponibles"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente = Cliente.objects.create(nombre='Cliente')
+        for i, peso in enumerate([15000, 12000, 9000, 4000]):
+            crear_paquete(cls.cliente, f'TRK{i:03}', peso=peso)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def armar(self, datos):
+        return self.client.post('/api/planillas/armar/', datos, format='json')
+
+    def test_parametros_invalidos(self):
+        for datos in [
+            {'cliente': 'abc'},
+            {'estrategia': 'otra'},
+            {'tipo': 'X'},
+            {'dry_run': 'quizas'},
+        ]:
+            with self.subTest(datos=datos):
+                self.assertEqual(self.armar(datos).status_code, 400)
+        self.assertFalse(Planilla.objects.exists())
+
+    def test_dry_run_como_texto(self):
+        response = self.armar({'dry_run': 'true', 'cliente': str(self.cliente.id)})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['planillas'], 2)
+        self.assertFalse(Planilla.objects.exists())
+
+        response = self.armar({'dry_run': 'false', 'estrategia': 'ffd'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.json()['planillas_creadas']), 2)
+        self.assertEqual(Item.objects.filter(activo=True).count(), 4)
+
+    def test_solo_paquetes_disponibles(self):
+        self.armar({})
+        # una segunda corrida no encuentra paquetes sin planilla
+        response = self.armar({})
+        self.assertEqual(response.json()['paquetes'], 0)
+        self.assertEqual(Planilla.objects.count(), 2)
+        self.assertLessEqual(max(Planilla.objects.values_list('peso_total', flat=True)), Planilla.PESO_LIMITE)
+
+
+class DistribucionMasivaTests(TestCase):
+    """planillas/bulk-distribuir/: validación de planilla_ids y distribución en un UPDATE"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cliente = Cliente.objects.create(nombre='Cliente')
+        cls.planillas = [Planilla.objects.create(numero_planilla=f'PL-{i}') for i in range(3)]
+        for i, planilla in enumerate(cls.planillas):
+            planilla.agregar_paquetes([crear_paquete(cliente, f'TRK{i}{j}') for j in range(2)])
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def distribuir(self, datos):
+        return self.client.post('/api/planillas/bulk-distribuir/', datos, format='json')
+
+    def test_parametros_invalidos(self):
+        for datos in [
+            [self.planillas[0].id],
+            # un texto no se recorre caracter por caracter
+            {'planilla_ids': str(self.planillas[0].id)},
+            {'planilla_ids': []},
+            {'planilla_ids': ['abc']},
+            {},
+        ]:
+            with self.subTest(datos=datos):
+                self.assertEqual(self.distribuir(datos).status_code, 400)
+        self.assertFalse(Paquete.objects.filter(estado=Paquete.EstadoPaquete.EN_DISTRIBUCION).exists())
+
+    def test_distribuye_por_la_cola_de_escritura(self):
+        ids = [self.planillas[0].id, self.planillas[1].id]
+        with mock.patch.object(
+            ColaEscritura, 'ejecutar', side_effect=lambda funcion, *args: funcion(*args)
+        ) as ejecutar:
+            # los ids repetidos o como texto se normalizan
+            response = self.distribuir({'planilla_ids': [*ids, str(ids[0])]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['paquetes_actualizados'], 4)
+        ejecutar.assert_called_once()
+        self.assertEqual(
+            set(Paquete.objects.filter(estado=Paquete.EstadoPaquete.EN_DISTRIBUCION).values_list('items__planilla_id', flat=True)),
+            set(ids),
+        )
+
+    def test_planillas_inexistentes(self):
+        response = self.distribuir({'planilla_ids': [self.planillas[2].id, 999]})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json()['planillas_no_encontradas'], [999])
+        self.assertFalse(Paquete.objects.filter(estado=Paquete.EstadoPaquete.EN_DISTRIBUCION).exists())
+
+
+class CargaMasivaTests(TestCase):
+    """paquetes/bulk-create/: errores por fila sin frenar al resto, en JSON y NDJSON"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente = Cliente.objects.create(nombre='Cliente')
+        crear_paquete(cls.cliente, 'EXISTENTE')
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def fila(self, tracking, **campos):
+        return {
+            'tracking': tracking, 'direccion_destinatario': 'Calle 1', 'telefono_destinatario': '1',
+            'nombre_destinatario': 'Destinatario', 'peso': 1000, 'altura': 10, 'cliente': self.cliente.id,
+            **campos,
+        }
+
+    def test_errores_por_fila(self):
+        filas = [
+            self.fila('NUEVO-1'),
+            self.fila('EXISTENTE'),
+            self.fila('NUEVO-1'),
+            self.fila('NUEVO-2', cliente=999),
+            self.fila('NUEVO-3', peso=30000),
+            'no es un objeto',
+            self.fila('NUEVO-4', peso=20000),
+        ]
+        response = self.client.post('/api/paquetes/bulk-create/?chunk_size=2', filas, format='json')
+        self.assertEqual(response.status_code, 207)
+        datos = response.json()
+        self.assertEqual((datos['filas'], datos['creados'], datos['con_errores']), (7, 2, 5))
+        self.assertEqual([error['fila'] for error in datos['errores']], [1, 2, 3, 4, 5])
+        self.assertIn('tracking', datos['errores'][0]['errores'])
+        self.assertIn('cliente', datos['errores'][2]['errores'])
+        self.assertIn('peso', datos['errores'][3]['errores'])
+        # el tipo se calcula igual que en Paquete.save
+        self.assertEqual(
+            dict(Paquete.objects.filter(tracking__startswith='NUEVO').values_list('tracking', 'tipo')),
+            {'NUEVO-1': PaqueteUtils.determinar_tipo_paquete(1000), 'NUEVO-4': PaqueteUtils.determinar_tipo_paquete(20000)},
+        )
+
+    def test_ndjson_con_linea_invalida(self):
+        cuerpo = '\n'.join([json.dumps(self.fila('ND-1')), '{no es json', '', json.dumps(self.fila('ND-2'))])
+        response = self.client.post(
+            '/api/paquetes/bulk-create/', cuerpo, content_type='application/x-ndjson'
+        )
+        self.assertEqual(response.status_code, 207)
+        datos = response.json()
+        self.assertEqual((datos['filas'], datos['creados']), (3, 2))
+        self.assertEqual(datos['errores'][0]['fila'], 1)
+
+    def test_sin_filas_validas(self):
+        response = self.client.post('/api/paquetes/bulk-create/', [self.fila('EXISTENTE')], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Paquete.objects.count(), 1)
+
+
+class AsignacionMasivaTests(TestCase):
+    """paquetes/bulk-assign-planilla/: cantidad fija de consultas y límite de peso"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente = Cliente.objects.create(nombre='Cliente')
+        cls.paquetes = [crear_paquete(cls.cliente, f'TRK{i:03}', peso=2000) for i in range(8)]
+        cls.pesados = [crear_paquete(cls.cliente, f'PES{i:03}', peso=10000) for i in range(3)]
+        cls.liviano = crear_paquete(cls.cliente, 'LIV000', peso=1000)
+        cls.planilla = Planilla.objects.create(numero_planilla='PL-1')
+        cls.otra = Planilla.objects.create(numero_planilla='PL-2')
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def asignar(self, planilla, paquetes):
+        return self.client.post('/api/paquetes/bulk-assign-planilla/', {
+            'planilla_id': planilla.id, 'paquete_ids': [paquete.id for paquete in paquetes],
+        }, format='json')
+
+    def test_consultas_fijas(self):
+        consultas = []
+        for planilla, paquetes in [(self.planilla, self.paquetes[:2]), (self.otra, self.paquetes[2:])]:
+            with CaptureQueriesContext(connection) as capturadas:
+                self.assertEqual(self.asignar(planilla, paquetes).status_code, 200)
+            consultas.append(len(capturadas))
+        # 2 y 6 paquetes: las mismas consultas
+        self.assertEqual(consultas[0], consultas[1])
+        self.assertEqual(list(self.otra.items.values_list('posicion', flat=True)), [1, 2, 3, 4, 5, 6])
+
+    def test_limite_de_peso(self):
+        response = self.asignar(self.planilla, self.pesados)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'La planilla excedería el límite de peso total')
+        self.planilla.refresh_from_db()
+        self.assertEqual((self.planilla.peso_total, self.planilla.item_count), (0, 0))
+        self.assertFalse(Item.objects.exists())
+
+        # justo en el límite se acepta
+        self.assertEqual(
+            self.asignar(self.planilla, [*self.pesados[:2], *self.paquetes[:2], self.liviano]).status_code, 200
+        )
+        self.planilla.refresh_from_db()
+        self.assertEqual(self.planilla.peso_total, Planilla.PESO_LIMITE)
+
+    def test_errores_de_validacion_no_son_500(self):
+        self.asignar(self.planilla, self.paquetes[:1])
+        with mock.patch.object(Item.objects, 'filter', return_value=Item.objects.none()):
+            # la verificación previa no ve el item: el índice único lo rechaza en el INSERT
+            response = self.asignar(self.otra, self.paquetes[:1])
+        self.assertEqual(response.status_code, 400)
+
+        with mock.patch.object(Planilla, 'agregar_paquetes', side_effect=ValidationError('Paquete inválido')):
+            response = self.asignar(self.otra, self.paquetes[1:2])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Paquete inválido', response.json()['error'])
+
+
+class TotalesDePlanillaTests(TestCase):
+    """peso_total e item_count mantenidos en cada escritura y reconciliar_planillas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente = Cliente.objects.create(nombre='Cliente')
+        cls.planilla = Planilla.objects.create(numero_planilla='PL-1')
+
+    def totales(self):
+        self.planilla.refresh_from_db()
+        return self.planilla.peso_total, self.planilla.item_count
+
+    def assertTotalesReales(self):
+        self.assertEqual(self.totales(), (self.planilla.calcular_peso_total(), self.planilla.items.count()))
+
+    def test_agregar_y_quitar(self):
+        paquetes = [crear_paquete(self.cliente, f'TRK{i:03}', peso=5000) for i in range(3)]
+        self.planilla.agregar_paquetes(paquetes[:2])
+        Item.objects.create(planilla=self.planilla, paquete=paquetes[2], posicion=3)
+        self.assertEqual(self.totales(), (15000, 3))
+
+        Item.objects.get(paquete=paquetes[0]).delete()
+        self.assertEqual(self.totales(), (10000, 2))
+        paquetes[1].delete()
+        self.assertEqual(self.totales(), (5000, 1))
+        self.assertTotalesReales()
+
+    def test_editar_el_peso(self):
+        paquete = crear_paquete(self.cliente, 'TRK001', peso=20000)
+        self.planilla.agregar_paquetes([paquete])
+
+        paquete.peso = 24000
+        paquete.save()
+        self.assertEqual(self.totales(), (24000, 1))
+        # con el peso editado ya no entra otro de 4 kg
+        self.assertIsNone(self.planilla.agregar_paquetes([crear_paquete(self.cliente, 'TRK002', peso=4000)]))
+
+        paquete.peso = 10000
+        paquete.save()
+        self.assertEqual(self.totales(), (10000, 1))
+        # vuelve al depósito y pasa a otra planilla: la anterior también lo incluye
+        Planilla.distribuir_planillas([self.planilla.id])
+        paquete.refresh_from_db()
+        paquete.estado = Paquete.EstadoPaquete.EN_DEPOSITO
+        paquete.save()
+        otra = Planilla.objects.create(numero_planilla='PL-2')
+        otra.agregar_paquetes([paquete])
+        paquete.peso = 12000
+        paquete.save()
+        otra.refresh_from_db()
+        self.assertEqual((self.totales()[0], otra.peso_total), (12000, 12000))
+        self.assertTotalesReales()
+
+    def test_reconciliar(self):
+        paquetes = [crear_paquete(self.cliente, f'TRK{i:03}', peso=3000) for i in range(3)]
+        self.planilla.agregar_paquetes(paquetes[:2])
+        Planilla.objects.filter(pk=self.planilla.pk).update(peso_total=1, item_count=9)
+
+        salida = io.StringIO()
+        call_command('reconciliar_planillas', dry_run=True, stdout=salida)
+        self.assertIn('1 con desvío detectadas', salida.getvalue())
+        self.assertEqual(self.totales(), (1, 9))
+
+        recalcular = Planilla.recalcular_totales
+
+        def agregar_y_recalcular(planilla_ids):
+            # un item agregado entre la lectura del comando y la corrección
+            self.planilla.agregar_paquetes([paquetes[2]])
+            return recalcular(planilla_ids)
+
+        version = self.planilla.version
+        with mock.patch.object(Planilla, 'recalcular_totales', side_effect=agregar_y_recalcular):
+            call_command('reconciliar_planillas', stdout=io.StringIO())
+        self.assertEqual(self.totales(), (9000, 3))
+        self.assertGreater(self.planilla.version, version)
+
+        salida = io.StringIO()
+        call_command('reconciliar_planillas', stdout=salida)
+        self.assertIn('0 con desvío corregidas', salida.getvalue())
+
+
+class ExportacionTests(TestCase):
+    """paquetes/export/: CSV y NDJSON en streaming, de a bloques"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente = Cliente.objects.create(nombre='Cliente')
+        Paquete.objects.bulk_create([
+            Paquete(
+                tracking=f'TRK{i:04}', direccion_destinatario=f'Calle {i}, piso "{i % 3}"', telefono_destinatario='1',
+                nombre_destinatario='Destinatario', peso=1000 + i, altura=10, cliente=cls.cliente,
+                tipo=PaqueteUtils.determinar_tipo_paquete(1000 + i),
+                estado=Paquete.EstadoPaquete.EN_DISTRIBUCION if i % 2 else Paquete.EstadoPaquete.EN_DEPOSITO,
+            )
+            for i in range(300)
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def exportar(self, **parametros):
+        with mock.patch.object(PaqueteExportView, 'tamano_bloque', 1024), \
+                override_settings(PAQUETES_EXPORT_CHUNK_SIZE=100):
+            response = self.client.get('/api/paquetes/export/', parametros)
+            self.assertEqual(response.status_code, 200)
+            self.assertIsInstance(response, StreamingHttpResponse)
+            bloques = [bloque.decode() for bloque in response.streaming_content]
+        self.assertGreater(len(bloques), 1)
+        return response, ''.join(bloques)
+
+    def test_csv(self):
+        response, contenido = self.exportar()
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="paquetes.csv"')
+        filas = list(csv.reader(io.StringIO(contenido)))
+        self.assertEqual(filas[0], [
+            'id', 'tracking', 'direccion_destinatario', 'telefono_destinatario',
+            'nombre_destinatario', 'peso', 'altura', 'estado', 'tipo', 'cliente',
+        ])
+        self.assertEqual(len(filas), 301)
+        paquete = Paquete.objects.get(tracking='TRK0005')
+        self.assertIn([
+            str(paquete.id), 'TRK0005', 'Calle 5, piso "2"', '1', 'Destinatario', '1005.0', '10.0',
+            Paquete.EstadoPaquete.EN_DISTRIBUCION, paquete.tipo, str(self.cliente.id),
+        ], filas)
+        # en orden de id y sin repetir filas entre bloques
+        ids = [int(fila[0]) for fila in filas[1:]]
+        self.assertEqual(ids, sorted(set(ids)))
+
+    def test_ndjson_filtrado(self):
+        response, contenido = self.exportar(formato='ndjson', estado=Paquete.EstadoPaquete.EN_DEPOSITO)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        filas = [json.loads(linea) for linea in contenido.splitlines()]
+        self.assertEqual(len(filas), 150)
+        self.assertEqual({fila['estado'] for fila in filas}, {Paquete.EstadoPaquete.EN_DEPOSITO})
+        paquete = Paquete.objects.get(tracking='TRK0000')
+        self.assertEqual(filas[0], {
+            'id': paquete.id, 'tracking': 'TRK0000', 'direccion_destinatario': 'Calle 0, piso "0"',
+            'telefono_destinatario': '1', 'nombre_destinatario': 'Destinatario', 'peso': 1000.0, 'altura': 10.0,
+            'estado': Paquete.EstadoPaquete.EN_DEPOSITO, 'tipo': paquete.tipo, 'cliente': self.cliente.id,
+        })
+
+    def test_parametros_invalidos(self):
+        for parametros in [{'formato': 'xml'}, {'cliente': 'abc'}]:
+            with self.subTest(parametros=parametros):
+                self.assertEqual(self.client.get('/api/paquetes/export/', parametros).status_code, 400)
+
+
+class ConsultaPorTrackingTests(TestCase):
+    """paquetes/lookup/: estado, tipo y planilla vigente de muchos trackings"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cliente = Cliente.objects.create(nombre='Cliente')
+        cls.paquetes = [crear_paquete(cliente, f'TRK{i:03}') for i in range(4)]
+        cls.primera = Planilla.objects.create(numero_planilla='PL-1')
+        cls.segunda = Planilla.objects.create(numero_planilla='PL-2')
+        cls.primera.agregar_paquetes(cls.paquetes[:2])
+        # TRK000 vuelve al depósito y pasa a la segunda: dos items, uno solo vigente
+        Planilla.distribuir_planillas([cls.primera.id])
+        paquete = Paquete.objects.get(pk=cls.paquetes[0].pk)
+        paquete.estado = Paquete.EstadoPaquete.EN_DEPOSITO
+        paquete.save()
+        cls.segunda.agregar_paquetes([paquete])
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def consultar(self, datos):
+        return self.client.post('/api/paquetes/lookup/', datos, format='json')
+
+    @override_settings(PAQUETES_LOOKUP_CHUNK_SIZE=2)
+    def test_encontrados_y_desconocidos(self):
+        trackings = ['TRK003', ' TRK000 ', 'NO-EXISTE', 'TRK001', 'TRK000', 'TRK002']
+        with self.assertNumQueries(3):
+            # una consulta por lote de 2 (sin repetidos quedan 5 trackings)
+            response = self.consultar({'trackings': trackings})
+        self.assertEqual(response.status_code, 200)
+        datos = response.json()
+        self.assertEqual(datos['desconocidos'], ['NO-EXISTE'])
+        # en el orden pedido, sin repetidos y con la planilla vigente
+        self.assertEqual(
+            [(paquete['tracking'], paquete['estado'], paquete['planilla'] and paquete['planilla']['numero_planilla'])
+             for paquete in datos['paquetes']],
+            [
+                ('TRK003', Paquete.EstadoPaquete.EN_DEPOSITO, None),
+                ('TRK000', Paquete.EstadoPaquete.EN_DEPOSITO, 'PL-2'),
+                ('TRK001', Paquete.EstadoPaquete.EN_DISTRIBUCION, 'PL-1'),
+                ('TRK002', Paquete.EstadoPaquete.EN_DEPOSITO, None),
+            ],
+        )
+        self.assertEqual(datos['paquetes'][0]['tipo'], self.paquetes[3].tipo)
+
+    def test_formatos_admitidos(self):
+        for datos in [['TRK001'], {'trackings': 'TRK001'}]:
+            with self.subTest(datos=datos):
+                response = self.consultar(datos)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual([paquete['tracking'] for paquete in response.json()['paquetes']], ['TRK001'])
+
+    @override_settings(PAQUETES_LOOKUP_MAX_TRACKINGS=3)
+    def test_parametros_invalidos(self):
+        for datos in [{}, {'trackings': []}, {'trackings': ['  ']}, {'trackings': ['TRK001', 5]},
+                      {'trackings': {'a': 'TRK001'}}, {'trackings': ['A', 'B', 'C', 'D']}]:
+            with self.subTest(datos=datos):
+                response = self.consultar(datos)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+        # los repetidos no cuentan para el máximo
+        self.assertEqual(self.consultar({'trackings': ['A', 'B', 'C', 'A']}).status_code, 200)
+
+
+class ReasignacionDePaquetesTests(TestCase):
+    """Una sola planilla vigente por paquete, que se libera cuando el paquete vuelve al depósito"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente = Cliente.objects.create(nombre='Cliente')
+        cls.paquete = crear_paquete(cls.cliente, 'TRK001')
+        cls.primera = Planilla.objects.create(numero_planilla='PL-1')
+        cls.segunda = Planilla.objects.create(numero_planilla='PL-2')
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def asignar(self, planilla):
+        return self.client.patch(
+            f'/api/paquetes/{self.paquete.id}/assign-planilla/', {'planilla_id': planilla.id}, format='json'
+        )
+
+    def test_no_se_asigna_a_dos_planillas_vigentes(self):
+        self.assertEqual(self.asignar(self.primera).status_code, 200)
+        self.assertEqual(self.asignar(self.segunda).status_code, 400)
+        self.assertFalse(PlanillaUtils.paquetes_disponibles().filter(pk=self.paquete.pk).exists())
+
+    def test_reasignacion_al_volver_al_deposito(self):
+        self.asignar(self.primera)
+        self.assertEqual(self.client.patch(f'/api/planillas/{self.primera.id}/distribuir/').status_code, 200)
+        # en distribución sigue figurando en su planilla
+        self.assertEqual(PaqueteUtils.consultar_trackings(['TRK001'])['TRK001']['planilla']['id'], self.primera.id)
+
+        self.paquete.refresh_from_db()
+        self.paquete.estado = Paquete.EstadoPaquete.EN_DEPOSITO
+        self.paquete.save()
+        self.assertTrue(PlanillaUtils.paquetes_disponibles().filter(pk=self.paquete.pk).exists())
+
+        self.assertEqual(self.asignar(self.segunda).status_code, 200)
+        self.assertEqual(
+            list(Item.objects.filter(paquete=self.paquete).order_by('id').values_list('planilla_id', 'activo')),
+            [(self.primera.id, False), (self.segunda.id, True)],
+        )
+
+
+class GetCondicionalTests(TestCase):
+    """ETag por versión y 304 en el listado de paquetes y el detalle de planilla"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente = Cliente.objects.create(nombre='Cliente')
+        cls.paquetes = [crear_paquete(cls.cliente, f'TRK{i:03}') for i in range(4)]
+        cls.planilla = Planilla.objects.create(numero_planilla='PL-1')
+        cls.items = cls.planilla.agregar_paquetes(cls.paquetes[:2])
+        cls.motivo = MotivoFalloSimple.objects.create(codigo='A', nombre='Ausente')
+
+    def setUp(self):
+        cache.clear()
+        CatalogoMotivos.reiniciar()
+        self.client = APIClient()
+        self.detalle = f'/api/planillas/{self.planilla.id}/'
+
+    def etag(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response['ETag'], r'^"[0-9a-f]{40}"$')
+        return response['ETag']
+
+    def assertCambiaEtag(self, url, escribir):
+        anterior = self.etag(url)
+        escribir()
+        self.assertNotEqual(self.etag(url), anterior)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=anterior).status_code, 200)
+
+    def test_304_sin_consultar_los_datos(self):
+        for url in ['/api/paquetes/', '/api/paquetes/?estado=en_deposito', self.detalle]:
+            with self.subTest(url=url):
+                etag = self.etag(url)
+                with self.assertNumQueries(1):
+                    # solo la versión
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=f'"otro", {etag}')
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], etag)
+                self.assertFalse(response.content)
+        # cada filtro o página tiene su propio ETag
+        self.assertNotEqual(self.etag('/api/paquetes/'), self.etag('/api/paquetes/?estado=en_deposito'))
+
+    def test_planilla_inexistente(self):
+        response = self.client.get('/api/planillas/999/', HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header('ETag'))
+
+    def test_escrituras_de_paquetes(self):
+        def editar():
+            paquete = Paquete.objects.get(pk=self.paquetes[3].pk)
+            paquete.nombre_destinatario = 'Otro'
+            paquete.save()
+
+        def reclasificar():
+            Paquete.objects.filter(pk=self.paquetes[3].pk).update(tipo=Paquete.TipoPaquete.GRANDE)
+            self.assertEqual(PaqueteUtils.reclasificar_tipos(), 1)
+
+        def carga_masiva():
+            response = self.client.post('/api/paquetes/bulk-create/', [{
+                'tracking': 'TRK100', 'direccion_destinatario': 'Calle 1', 'telefono_destinatario': '1',
+                'nombre_destinatario': 'Destinatario', 'peso': 1000, 'altura': 10, 'cliente': self.cliente.id,
+            }], format='json')
+            self.assertEqual(response.status_code, 201)
+
+        for escribir in [editar, reclasificar, carga_masiva,
+                         lambda: Planilla.distribuir_planillas([self.planilla.id]),
+                         lambda: Paquete.objects.get(tracking='TRK100').delete()]:
+            with self.subTest(escritura=getattr(escribir, '__name__', '')):
+                self.assertCambiaEtag('/api/paquetes/', escribir)
+
+    def test_escrituras_de_la_planilla(self):
+        def asignar_motivo():
+            item = Item.objects.get(pk=self.items[0].pk)
+            item.motivo_fallo = self.motivo
+            item.save()
+
+        def asignacion_masiva_de_motivos():
+            response = self.client.post('/api/items/bulk-assign-motivo/', {'asignaciones': [
+                {'item_id': item.id, 'motivo_fallo_id': self.motivo.id} for item in self.items
+            ]}, format='json')
+            self.assertEqual(response.status_code, 200)
+
+        def editar_paquete():
+            paquete = Paquete.objects.get(pk=self.paquetes[0].pk)
+            paquete.peso = 3000
+            paquete.save()
+
+        def reconciliar():
+            Planilla.objects.filter(pk=self.planilla.pk).update(peso_total=0)
+            Planilla.recalcular_totales([self.planilla.id])
+
+        for escribir in [lambda: self.planilla.agregar_paquetes([self.paquetes[2]]), asignar_motivo,
+                         asignacion_masiva_de_motivos, editar_paquete, reconciliar,
+                         lambda: Planilla.distribuir_planillas([self.planilla.id])]:
+            with self.subTest(escritura=getattr(escribir, '__name__', '')):
+                self.assertCambiaEtag(self.detalle, escribir)
+
+
+class CacheDeResumenTests(TestCase):
+    """Resumen de planilla cacheado por versión: cada cambio visible lo invalida"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente = Cliente.objects.create(nombre='Cliente')
+        cls.paquetes = [crear_paquete(cls.cliente, f'TRK{i:03}') for i in range(3)]
+        cls.planilla = Planilla.objects.create(numero_planilla='PL-1')
+        cls.planilla.agregar_paquetes(cls.paquetes[:2])
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = f'/api/planillas/{self.planilla.id}/'
+
+    def resumen(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_segunda_lectura_sin_consultar_los_items(self):
+        primero = self.resumen()
+        with self.assertNumQueries(1):
+            # solo la versión de la planilla
+            self.assertEqual(self.resumen(), primero)
+        self.assertEqual(ResumenPlanillaCache.estadisticas()['hits'], 1)
+
+    def test_cambios_que_invalidan(self):
+        self.assertEqual(len(self.resumen()['items']), 2)
+
+        self.planilla.agregar_paquetes([self.paquetes[2]])
+        self.assertEqual(len(self.resumen()['items']), 3)
+
+        Planilla.distribuir_planillas([self.planilla.id])
+        self.assertEqual(
+            {item['paquete_estado'] for item in self.resumen()['items']}, {Paquete.EstadoPaquete.EN_DISTRIBUCION}
+        )
+
+        paquete = Paquete.objects.get(pk=self.paquetes[0].pk)
+        paquete.peso = 20000
+        paquete.save()
+        self.assertEqual(self.resumen()['items'][0]['paquete_peso'], 20000)
+        self.assertEqual(ResumenPlanillaCache.estadisticas()['hits'], 0)
+
+
+@skipUnless(BusquedaUtils.fts5_soportado(connection), 'SQLite sin FTS5 con tokenizer trigram')
+class BusquedaTests(TestCase):
+    """?search= sobre el índice FTS5, que los triggers mantienen ante altas, cambios y borrados"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente = Cliente.objects.create(nombre='Cliente')
+        crear_paquete(cls.cliente, 'AR-1001', nombre_destinatario='Juana Pérez', direccion_destinatario='Av. Corrientes 1234')
+        crear_paquete(cls.cliente, 'AR-1002', nombre_destinatario='Pedro Gómez', direccion_destinatario='Calle Perú 55')
+        crear_paquete(cls.cliente, 'UY-2001', nombre_destinatario='Ana Corral', direccion_destinatario='Rivera 900')
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def buscar(self, termino, **parametros):
+        response = self.client.get('/api/paquetes/', {'search': termino, **parametros})
+        self.assertEqual(response.status_code, 200)
+        return [paquete['tracking'] for paquete in response.json()['results']]
+
+    def test_coincidencias_parciales_en_varias_columnas(self):
+        self.assertEqual(self.buscar('1001'), ['AR-1001'])
+        self.assertEqual(self.buscar('corr', ordering='tracking'), ['AR-1001', 'UY-2001'])
+        # todos los términos son requeridos
+        self.assertEqual(self.buscar('corr rivera'), ['UY-2001'])
+        self.assertEqual(self.buscar('inexistente'), [])
+
+    def test_relevancia_sin_ordering(self):
+        # un acierto en el tracking pesa más que uno en la dirección
+        crear_paquete(self.cliente, 'PERU-1', nombre_destinatario='Otro', direccion_destinatario='Otra 1')
+        self.assertEqual(self.buscar('peru')[0], 'PERU-1')
+
+    def test_terminos_cortos_usan_like(self):
+        self.assertEqual(self.buscar('UY'), ['UY-2001'])
+
+    def test_indice_sincronizado(self):
+        paquete = Paquete.objects.get(tracking='AR-1002')
+        paquete.nombre_destinatario = 'Rosario Sánchez'
+        paquete.save()
+        self.assertEqual(self.buscar('gómez'), [])
+        self.assertEqual(self.buscar('rosario'), ['AR-1002'])
+
+        Paquete.objects.filter(tracking='UY-2001').update(direccion_destinatario='Colonia 10')
+        self.assertEqual(self.buscar('rivera'), [])
+        Paquete.objects.get(tracking='AR-1001').delete()
+        self.assertEqual(self.buscar('corrientes'), [])
+
+
+class ContadoresTests(TestCase):
+    """ContadorPaquetes coincide con el conteo real después de cada camino de escritura"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente = Cliente.objects.create(nombre='Cliente')
+        cls.otro = Cliente.objects.create(nombre='Otro')
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def assertContadoresConsistentes(self):
+        self.assertEqual(ContadorPaquetes.diferencias(), {})
+
+    def test_caminos_de_escritura(self):
+        paquetes = [crear_paquete(self.cliente, f'TRK{i:03}', peso=500 * (i + 1)) for i in range(4)]
+        self.assertContadoresConsistentes()
+
+        self.client.post('/api/paquetes/bulk-create/', [
+            {'tracking': f'BULK{i}', 'direccion_destinatario': 'Calle 1', 'telefono_destinatario': '1',
+             'nombre_destinatario': 'Destinatario', 'peso': 2000, 'altura': 10, 'cliente': self.otro.id}
+            for i in range(3)
+        ], format='json')
+        self.assertContadoresConsistentes()
+
+        planilla = Planilla.objects.create(numero_planilla='PL-1')
+        planilla.agregar_paquetes(paquetes[:2])
+        Planilla.distribuir_planillas([planilla.id])
+        self.assertContadoresConsistentes()
+
+        # cambio de cliente y de tipo por save, borrado individual y en cascada
+        paquete = Paquete.objects.get(pk=paquetes[2].pk)
+        paquete.cliente = self.otro
+        paquete.peso = 10000
+        paquete.save()
+        Paquete.objects.get(pk=paquetes[3].pk).delete()
+        self.assertContadoresConsistentes()
+        Paquete.objects.filter(tracking='BULK0').delete()
+        self.assertContadoresConsistentes()
+
+        # un UPDATE masivo del peso deja tipos viejos: la reclasificación mueve los contadores
+        Paquete.objects.filter(cliente=self.otro).update(peso=100)
+        self.assertEqual(PaqueteUtils.reclasificar_tipos(chunk_size=2), 3)
+        self.assertContadoresConsistentes()
+
+        self.otro.delete()
+        self.assertContadoresConsistentes()
+
+    def test_endpoint(self):
+        crear_paquete(self.cliente, 'TRK001', peso=500)
+        crear_paquete(self.cliente, 'TRK002', peso=500)
+        crear_paquete(self.otro, 'TRK003', peso=5000)
+        datos = self.client.get('/api/stats/counters/', {'cliente': self.cliente.id}).json()
+        self.assertEqual(datos['total'], 2)
+        self.assertEqual(datos['grupos'], [{
+            'cliente': self.cliente.id, 'estado': Paquete.EstadoPaquete.EN_DEPOSITO,
+            'tipo': Paquete.TipoPaquete.PEQUENO, 'cantidad': 2,
+        }])
+        self.assertEqual(self.client.get('/api/stats/counters/', {'cliente': 'abc'}).status_code, 400)
+
+
+class ReportesTests(TestCase):
+    """Resúmenes diarios volcados desde RegistroCambio de forma incremental"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente = Cliente.objects.create(nombre='Cliente')
+        cls.motivo = MotivoFalloSimple.objects.create(codigo='A', nombre='Ausente')
+        cls.otro_motivo = MotivoFalloSimple.objects.create(codigo='D', nombre='Dirección errónea')
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def reporte(self, url, **parametros):
+        response = self.client.get(url, parametros)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_volcado_incremental(self):
+        paquetes = [crear_paquete(self.cliente, f'TRK{i:03}', peso=1000) for i in range(3)]
+        planilla = Planilla.objects.create(numero_planilla='PL-1')
+        items = planilla.agregar_paquetes(paquetes[:2])
+        Planilla.distribuir_planillas([planilla.id])
+        # tres ingresos y una distribución (agrupada por cliente), en lotes chicos
+        self.assertEqual(ReporteUtils.procesar_registro(lote=3), 4)
+        self.assertEqual(ReporteUtils.procesar_registro(), 0)
+
+        totales = self.reporte('/api/reportes/clientes/', cliente=self.cliente.id)['totales']
+        self.assertEqual(totales, {'ingresados': 3, 'distribuidos': 2, 'peso_distribuido': 2000})
+
+        # un motivo corregido descuenta el fallo del anterior
+        item = Item.objects.get(pk=items[0].pk)
+        item.motivo_fallo = self.motivo
+        item.save()
+        item.motivo_fallo = self.otro_motivo
+        item.save()
+        ReporteUtils.procesar_registro()
+        dias = self.reporte('/api/reportes/motivos/')['dias']
+        self.assertEqual(
+            {fila['motivo_fallo']: fila['fallidos'] for fila in dias},
+            {self.motivo.id: 0, self.otro_motivo.id: 1},
+        )
+
+        hoy = timezone.localdate()
+        antes = list(ResumenDiarioCliente.objects.values('cliente', 'ingresados', 'distribuidos', 'peso_distribuido'))
+        ReporteUtils.reconstruir(hoy, hoy)
+        self.assertEqual(
+            list(ResumenDiarioCliente.objects.values('cliente', 'ingresados', 'distribuidos', 'peso_distribuido')), antes
+        )
+
+    def test_fallos_con_motivo_compuesto(self):
+        CatalogoMotivos.reiniciar()
+        compuesto = MotivoFalloCompuesto.objects.create()
+        compuesto.motivos.add(self.motivo, self.otro_motivo)
+        planilla = Planilla.objects.create(numero_planilla='PL-1')
+        items = planilla.agregar_paquetes([crear_paquete(self.cliente, f'TRK{i:03}') for i in range(3)])
+
+        item = Item.objects.get(pk=items[0].pk)
+        item.motivo_fallo_compuesto = compuesto
+        item.save()
+        response = self.client.post('/api/items/bulk-assign-motivo/', {'asignaciones': [
+            {'item_id': items[1].id, 'motivo_fallo_compuesto_id': compuesto.id},
+            {'item_id': items[2].id, 'motivo_fallo_id': self.motivo.id},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        ReporteUtils.procesar_registro()
+
+        reporte = self.reporte('/api/reportes/motivos/')
+        # cada ítem cuenta una vez: el compuesto no se reparte entre sus motivos
+        self.assertEqual(reporte['totales'], {'fallidos': 3})
+        self.assertEqual(
+            [(fila['motivo_fallo'], fila['motivo_fallo_compuesto'], fila['fallidos']) for fila in reporte['dias']],
+            [(self.motivo.id, None, 1), (None, compuesto.id, 2)],
+        )
+        self.assertEqual(self.reporte('/api/reportes/motivos/', motivo_compuesto=compuesto.id)['totales'], {'fallidos': 2})
+        self.assertEqual(self.reporte('/api/reportes/motivos/', motivo=self.motivo.id)['totales'], {'fallidos': 1})
+
+        # pasar de compuesto a simple mueve el fallo
+        self.client.patch(f'/api/items/{items[0].id}/assign-motivo/', {'motivo_fallo_id': self.otro_motivo.id}, format='json')
+        ReporteUtils.procesar_registro()
+        filas = self.reporte('/api/reportes/motivos/')['dias']
+        self.assertEqual(
+            {(fila['motivo_fallo'], fila['motivo_fallo_compuesto']): fila['fallidos'] for fila in filas},
+            {(self.motivo.id, None): 1, (self.otro_motivo.id, None): 1, (None, compuesto.id): 1},
+        )
+
+        hoy = timezone.localdate()
+        ReporteUtils.reconstruir(hoy, hoy)
+        self.assertEqual(self.reporte('/api/reportes/motivos/')['dias'], filas)
+
+    def test_rango_invalido(self):
+        for parametros in [{'desde': '2026-13-01'}, {'desde': '2026-02-01', 'hasta': '2026-01-01'},
+                           {'desde': '2020-01-01', 'hasta': '2026-01-01'}, {'cliente': 'abc'}]:
+            with self.subTest(parametros=parametros):
+                self.assertEqual(self.client.get('/api/reportes/clientes/', parametros).status_code, 400)
+        self.assertEqual(self.client.get('/api/reportes/motivos/', {'motivo_compuesto': 'abc'}).status_code, 400)
+
+
+class MotivosCompuestosTests(TestCase):
+    """Clausura de los motivos compuestos y asignación de un único motivo por ítem"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ausente = MotivoFalloSimple.objects.create(codigo='A', nombre='Ausente', descripcion='Nadie atendió')
+        cls.direccion = MotivoFalloSimple.objects.create(codigo='D', nombre='Dirección', descripcion='No existe')
+        cls.lluvia = MotivoFalloSimple.objects.create(codigo='L', nombre='Lluvia', descripcion='Clima')
+
+    def setUp(self):
+        CatalogoMotivos.reiniciar()
+
+    def clausura(self, compuesto):
+        return list(MotivoFalloClausura.objects.filter(compuesto=compuesto).values_list('motivo_id', flat=True))
+
+    def test_clausura_y_campos_derivados(self):
+        interno = MotivoFalloCompuesto.objects.create()
+        interno.motivos.add(self.ausente)
+        externo = MotivoFalloCompuesto.objects.create()
+        externo.motivos.add(self.direccion)
+        externo.submotivos.add(interno)
+
+        externo.refresh_from_db()
+        self.assertEqual(self.clausura(externo), [self.direccion.id, self.ausente.id])
+        self.assertEqual((externo.codigo, externo.nombre), ('DA', 'Dirección y Ausente'))
+        self.assertTrue(externo.active)
+
+        # un cambio en el submotivo llega a los compuestos que lo contienen
+        interno.motivos.add(self.lluvia)
+        self.assertEqual(self.clausura(externo), [self.direccion.id, self.ausente.id, self.lluvia.id])
+        self.lluvia.active = False
+        self.lluvia.save()
+        externo.refresh_from_db()
+        self.assertFalse(externo.active)
+
+        self.lluvia.delete()
+        externo.submotivos.remove(interno)
+        externo.refresh_from_db()
+        self.assertEqual(self.clausura(externo), [self.direccion.id])
+        self.assertEqual(externo.nombre, 'Dirección')
+        self.assertTrue(externo.active)
+
+    def test_ciclos(self):
+        primero = MotivoFalloCompuesto.objects.create()
+        segundo = MotivoFalloCompuesto.objects.create()
+        primero.submotivos.add(segundo)
+        for padre, hijo in [(segundo, primero), (primero, primero)]:
+            with self.subTest(padre=padre.id, hijo=hijo.id):
+                with self.assertRaises(ValidationError), transaction.atomic():
+                    padre.submotivos.add(hijo)
+        self.assertEqual(self.clausura(primero), [])
+
+    def test_asignar_simple_borra_el_compuesto(self):
+        cliente = Cliente.objects.create(nombre='Cliente')
+        planilla = Planilla.objects.create(numero_planilla='PL-1')
+        item, = planilla.agregar_paquetes([crear_paquete(cliente, 'TRK001')])
+        compuesto = MotivoFalloCompuesto.objects.create()
+        compuesto.motivos.add(self.ausente)
+        Item.objects.filter(pk=item.pk).update(motivo_fallo_compuesto=compuesto)
+
+        response = APIClient().patch(
+            f'/api/items/{item.id}/assign-motivo/', {'motivo_fallo_id': self.direccion.id}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        item.refresh_from_db()
+        self.assertEqual((item.motivo_fallo_id, item.motivo_fallo_compuesto_id), (self.direccion.id, None))
+        item.full_clean()
+
+
+class AsignacionMasivaDeMotivosTests(TestCase):
+    """items/bulk-assign-motivo/: fallos correctos, cantidad fija de consultas y errores por índice"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente = Cliente.objects.create(nombre='Cliente')
+        cls.ausente = MotivoFalloSimple.objects.create(codigo='A', nombre='Ausente')
+        cls.direccion = MotivoFalloSimple.objects.create(codigo='D', nombre='Dirección')
+        cls.inactivo = MotivoFalloSimple.objects.create(codigo='X', nombre='Dado de baja', active=False)
+        cls.compuesto = MotivoFalloCompuesto.objects.create()
+        cls.compuesto.motivos.add(cls.ausente, cls.direccion)
+        cls.planilla = Planilla.objects.create(numero_planilla='PL-1')
+        cls.items = cls.planilla.agregar_paquetes([crear_paquete(cls.cliente, f'TRK{i:03}') for i in range(8)])
+
+    def setUp(self):
+        CatalogoMotivos.reiniciar()
+        self.client = APIClient()
+
+    def asignar(self, asignaciones):
+        return self.client.post('/api/items/bulk-assign-motivo/', {'asignaciones': asignaciones}, format='json')
+
+    def fallos(self):
+        ReporteUtils.procesar_registro()
+        filas = self.client.get('/api/reportes/motivos/').json()['dias']
+        return {(fila['motivo_fallo'], fila['motivo_fallo_compuesto']): fila['fallidos'] for fila in filas}
+
+    def test_asignacion_y_fallos(self):
+        item = Item.objects.get(pk=self.items[0].pk)
+        item.motivo_fallo = self.ausente
+        item.save()
+        response = self.asignar([
+            {'item_id': self.items[0].id, 'motivo_fallo_compuesto_id': self.compuesto.id},
+            {'item_id': self.items[1].id, 'motivo_fallo_id': self.direccion.id},
+            {'item_id': self.items[2].id, 'motivo_fallo_id': self.direccion.id},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'asignaciones': 3, 'asignados': 3, 'con_errores': 0, 'errores': []})
+        self.assertEqual(
+            list(Item.objects.filter(pk__in=[item.id for item in self.items[:3]]).order_by('id').values_list(
+                'motivo_fallo_id', 'motivo_fallo_compuesto_id')),
+            [(None, self.compuesto.id), (self.direccion.id, None), (self.direccion.id, None)],
+        )
+        # el compuesto reemplaza al simple: el fallo del anterior se descuenta
+        self.assertEqual(self.fallos(), {
+            (self.ausente.id, None): 0, (self.direccion.id, None): 2, (None, self.compuesto.id): 1,
+        })
+
+        # repetir la misma asignación no suma fallos
+        self.assertEqual(self.asignar([
+            {'item_id': self.items[1].id, 'motivo_fallo_id': self.direccion.id},
+        ]).status_code, 200)
+        self.assertEqual(self.fallos()[(self.direccion.id, None)], 2)
+
+    def test_consultas_fijas(self):
+        # el catálogo ya cargado: solo queda la consulta de versión
+        CatalogoMotivos.obtener_simple(self.ausente.id)
+        consultas = []
+        for items in [self.items[:2], self.items[2:]]:
+            asignaciones = [
+                {'item_id': item.id, 'motivo_fallo_id': motivo.id}
+                for item, motivo in zip(items, [self.ausente, self.direccion] * len(items))
+            ]
+            with CaptureQueriesContext(connection) as capturadas:
+                self.assertEqual(self.asignar(asignaciones).status_code, 200)
+            consultas.append(len(capturadas))
+        # 2 y 6 ítems con los mismos dos motivos: las mismas consultas
+        self.assertEqual(consultas[0], consultas[1])
+
+    def test_errores_por_indice(self):
+        response = self.asignar([
+            {'item_id': self.items[0].id, 'motivo_fallo_id': self.ausente.id},
+            {'item_id': self.items[1].id, 'motivo_fallo_id': self.inactivo.id},
+            {'item_id': self.items[2].id, 'motivo_fallo_id': 999999},
+            {'item_id': 999999, 'motivo_fallo_id': self.ausente.id},
+            {'item_id': self.items[0].id, 'motivo_fallo_id': self.direccion.id},
+            {'item_id': self.items[3].id, 'motivo_fallo_id': self.ausente.id,
+             'motivo_fallo_compuesto_id': self.compuesto.id},
+            {'item_id': 'abc', 'motivo_fallo_id': self.ausente.id},
+            'no es un objeto',
+        ])
+        self.assertEqual(response.status_code, 207)
+        datos = response.json()
+        self.assertEqual((datos['asignaciones'], datos['asignados'], datos['con_errores']), (8, 1, 7))
+        self.assertEqual([(error['indice'], error['error']) for error in datos['errores']], [
+            (1, 'No se puede usar un motivo de fallo inactive.'),
+            (2, 'Motivo de fallo no encontrado'),
+            (3, 'Ítem no encontrado'),
+            (4, 'Ítem repetido en el pedido'),
+            (5, 'Se requiere motivo_fallo_id o motivo_fallo_compuesto_id (uno solo)'),
+            (6, 'item_id debe ser un id'),
+            (7, 'Se espera un objeto {item_id, motivo_fallo_id}'),
+        ])
+        self.assertEqual(self.fallos(), {(self.ausente.id, None): 1})
+
+        # nada aplicado: 400 y sin cambios
+        response = self.asignar([{'item_id': self.items[1].id, 'motivo_fallo_id': self.inactivo.id}])
+        self.assertEqual(response.status_code, 400)
+        self.assertIsNone(Item.objects.get(pk=self.items[1].pk).motivo_fallo_id)
+
+        for cuerpo in [{}, {'asignaciones': []}, {'asignaciones': 'abc'}]:
+            with self.subTest(cuerpo=cuerpo):
+                response = self.client.post('/api/items/bulk-assign-motivo/', cuerpo, format='json')
+                self.assertEqual(response.status_code, 400)
+
+    @override_settings(PAQUETES_BULK_MOTIVO_MAX=2)
+    def test_maximo_por_pedido(self):
+        response = self.asignar([
+            {'item_id': item.id, 'motivo_fallo_id': self.ausente.id} for item in self.items[:3]
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Item.objects.filter(motivo_fallo__isnull=False).exists())
+
+    def test_motivo_cambiado_antes_de_escribir(self):
+        # otro pedido asigna un motivo justo antes de que este tome el lock de escritura:
+        # los fallos se calculan desde el motivo vigente, no desde una lectura previa
+        atomic = transaction.atomic
+        concurrente = []
+
+        def atomic_con_escritura_previa(*args, **kwargs):
+            if not concurrente:
+                concurrente.append(True)
+                with mock.patch.object(transaction, 'atomic', atomic):
+                    item = Item.objects.get(pk=self.items[0].pk)
+                    item.motivo_fallo = self.ausente
+                    item.save()
+            return atomic(*args, **kwargs)
+
+        with mock.patch.object(transaction, 'atomic', atomic_con_escritura_previa):
+            response = self.asignar([
+                {'item_id': self.items[0].id, 'motivo_fallo_id': self.direccion.id},
+                {'item_id': self.items[1].id, 'motivo_fallo_id': self.direccion.id},
+            ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.fallos(), {(self.ausente.id, None): 0, (self.direccion.id, None): 2})
+
+
+class CatalogoMotivosTests(TestCase):
+    """Catálogo de motivos en memoria: se recarga cuando cambia VersionTabla.MOTIVO"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.motivo = MotivoFalloSimple.objects.create(codigo='A', nombre='Ausente')
+
+    def setUp(self):
+        # el rollback de cada test vuelve la versión atrás con los mismos ids
+        CatalogoMotivos.reiniciar()
+
+    def test_cambios_por_el_orm(self):
+        self.assertTrue(CatalogoMotivos.simple_activo(self.motivo.id))
+        recargas = CatalogoMotivos.estadisticas()['recargas']
+        # sin cambios no se recarga
+        self.assertTrue(CatalogoMotivos.simple_activo(self.motivo.id))
+        self.assertEqual(CatalogoMotivos.estadisticas()['recargas'], recargas)
+
+        self.motivo.active = False
+        self.motivo.save()
+        self.assertFalse(CatalogoMotivos.simple_activo(self.motivo.id))
+        nuevo = MotivoFalloSimple.objects.create(codigo='N', nombre='Nuevo')
+        self.assertEqual(CatalogoMotivos.obtener_simple(str(nuevo.id)).nombre, 'Nuevo')
+        self.assertIsNone(CatalogoMotivos.obtener_simple('abc'))
+
+    def test_cambios_de_otro_proceso(self):
+        # otro proceso escribe con UPDATE e incrementa la versión en la misma transacción
+        self.assertEqual(CatalogoMotivos.obtener_simple(self.motivo.id).nombre, 'Ausente')
+        MotivoFalloSimple.objects.filter(pk=self.motivo.pk).update(nombre='No atendió', active=False)
+        VersionTabla.incrementar(VersionTabla.MOTIVO)
+        self.assertEqual(CatalogoMotivos.obtener_simple(self.motivo.id).nombre, 'No atendió')
+
+        response = APIClient().get('/api/motivos/')
+        self.assertEqual([motivo['nombre'] for motivo in response.json()], ['No atendió'])
+
+    def test_listado_rapido_desde_el_catalogo(self):
+        MotivoFalloSimple.objects.create(codigo='D', nombre='Dirección', active=False)
+        client = APIClient()
+        with mock.patch.object(MotivoFalloSimpleSerializer, 'to_representation', side_effect=AssertionError):
+            rapido = client.get('/api/motivos/?fast=1').content
+            with self.assertNumQueries(1):
+                # solo la versión del catálogo
+                client.get('/api/motivos/?fast=1')
+        self.assertEqual(client.get('/api/motivos/').content, rapido)
+
+        self.motivo.nombre = 'No atendió'
+        self.motivo.save()
+        self.assertEqual(client.get('/api/motivos/?fast=1').json()[0]['nombre'], 'No atendió')
+
+    @override_settings(PAQUETES_CATALOGO_MOTIVOS_TTL=3600)
+    def test_validaciones_ignoran_el_ttl(self):
+        CatalogoMotivos.listar_simples()
+        MotivoFalloSimple.objects.filter(pk=self.motivo.pk).update(active=False)
+        VersionTabla.incrementar(VersionTabla.MOTIVO)
+        # el listado puede usar la copia durante el TTL; la validación no
+        self.assertTrue(CatalogoMotivos.listar_simples()[0].active)
+        self.assertFalse(CatalogoMotivos.simple_activo(self.motivo.id))
+
+        cliente = Cliente.objects.create(nombre='Cliente')
+        planilla = Planilla.objects.create(numero_planilla='PL-1')
+        item, = planilla.agregar_paquetes([crear_paquete(cliente, 'TRK001')])
+        response = APIClient().patch(
+            f'/api/items/{item.id}/assign-motivo/', {'motivo_fallo_id': self.motivo.id}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class ListadoAsyncTests(TestCase):
+    """La variante async del listado de paquetes responde igual que la sync"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente = Cliente.objects.create(nombre='Cliente')
+        cls.otro = Cliente.objects.create(nombre='Otro')
+        for i in range(4):
+            crear_paquete(cls.cliente if i % 2 else cls.otro, f'TRK{i:03}', peso=500 + 1000 * i)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_mismas_respuestas(self):
+        for parametros in [
+            '',
+            '?page_size=3',
+            f'?cliente={self.cliente.id}',
+            '?cliente=999',
+            '?estado=en_deposito&tipo=P',
+            '?ordering=estado,-id',
+            '?cliente=abc',
+            '?estado=otro',
+        ]:
+            with self.subTest(parametros=parametros):
+                sync = self.client.get(f'/api/paquetes/{parametros}')
+                asincronica = self.client.get(f'/api/async/paquetes/{parametros}')
+                self.assertEqual(asincronica.status_code, sync.status_code)
+                if sync.status_code == 200:
+                    self.assertEqual(
+                        json.loads(asincronica.content)['results'], json.loads(sync.content)['results']
+                    )
+
+    def test_cliente_inexistente(self):
+        for url in ['/api/paquetes/?cliente=999', '/api/async/paquetes/?cliente=999']:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(json.loads(response.content)['results'], [])
+
+
+class ConexionDeLecturaTests(TransactionTestCase):
+    """
+    Los GET de LecturaMixin leen de la conexión 'lectura', incluida la exportación en
+    streaming. Sin la transacción de TestCase: la segunda conexión a la base en memoria
+    no puede leer tablas con escrituras sin confirmar
+    """
+    databases = {'default', ALIAS_LECTURA}
+
+    def setUp(self):
+        crear_paquete(Cliente.objects.create(nombre='Cliente'), 'TRK001')
+        self.client = APIClient()
+        # en los tests 'lectura' es espejo de default y el router no la usa
+        parche = mock.patch.object(LecturaRouter, 'lectura_disponible', return_value=True)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def aliases(self, funcion):
+        """Aliases de las conexiones donde se ejecutaron las consultas de la función"""
+        usados = set()
+
+        def registrar(execute, sql, params, many, context):
+            usados.add(context['connection'].alias)
+            return execute(sql, params, many, context)
+
+        with ExitStack() as pila:
+            for alias in self.databases:
+                pila.enter_context(connections[alias].execute_wrapper(registrar))
+            funcion()
+        return usados
+
+    def test_exportacion(self):
+        def exportar():
+            response = self.client.get('/api/paquetes/export/')
+            self.assertEqual(response.status_code, 200)
+            # el cuerpo se genera al consumirlo, fuera de la vista
+            b''.join(response.streaming_content)
+
+        self.assertEqual(self.aliases(exportar), {ALIAS_LECTURA})
+
+    def test_listado(self):
+        self.assertEqual(self.aliases(lambda: self.client.get('/api/paquetes/?page_size=1')), {ALIAS_LECTURA})
+
+
+class ColaEscrituraTests(TransactionTestCase):
+    """
+    Group commit: lotes en un thread escritor con su propia conexión (por eso sin la
+    transacción de TestCase, que retendría el lock de escritura de la base de tests)
+    """
+
+    def setUp(self):
+        self.cliente = Cliente.objects.create(nombre='Cliente')
+        self.colas = []
+
+    def tearDown(self):
+        for cola in self.colas:
+            if cola.activa():
+                cola.detener()
+
+    def cola(self, **kwargs):
+        cola = ColaEscritura(**kwargs)
+        self.colas.append(cola)
+        return cola
+
+    def test_lote_con_una_operacion_fallida(self):
+        cola = self.cola(espera_ms=200)
+
+        def fallar():
+            crear_paquete(self.cliente, 'FALLIDO')
+            raise ValueError('falla solo esta operación')
+
+        futuros = [
+            cola.encolar(crear_paquete, self.cliente, 'TRK001'),
+            cola.encolar(fallar),
+            cola.encolar(crear_paquete, self.cliente, 'TRK002'),
+        ]
+        self.assertEqual(futuros[0].result(timeout=5).tracking, 'TRK001')
+        with self.assertRaises(ValueError):
+            futuros[1].result(timeout=5)
+        self.assertEqual(futuros[2].result(timeout=5).tracking, 'TRK002')
+        self.assertEqual(cola.estadisticas()['lotes'], 1)
+        self.assertEqual(sorted(Paquete.objects.values_list('tracking', flat=True)), ['TRK001', 'TRK002'])
+
+    def test_error_fatal_resuelve_todo_el_lote(self):
+        cola = self.cola(max_operaciones=2, espera_ms=200)
+        liberar = threading.Event()
+
+        def crear_al_liberar():
+            liberar.wait(5)
+            return crear_paquete(self.cliente, 'TRK001')
+
+        def salir():
+            raise SystemExit
+
+        lote = [cola.encolar(crear_al_liberar), cola.encolar(salir)]
+        # quedan en la cola detrás del lote
+        pendientes = [cola.encolar(crear_paquete, self.cliente, f'TRK00{i}') for i in (2, 3)]
+        liberar.set()
+
+        # el lote se deshizo entero, también la operación que había terminado bien
+        for futuro in lote:
+            with self.assertRaises(SystemExit):
+                futuro.result(timeout=5)
+        for futuro in pendientes:
+            with self.assertRaises(RuntimeError):
+                futuro.result(timeout=5)
+        cola._hilo.join(timeout=5)
+        self.assertFalse(cola.activa())
+        self.assertFalse(Paquete.objects.exists())
+
+    @override_settings(PAQUETES_GROUP_COMMIT=True)
+    def test_se_recrea_si_el_escritor_murio(self):
+        with mock.patch.object(ColaEscritura, '_global', None):
+            muerta = ColaEscritura.obtener()
+            self.colas.append(muerta)
+            muerta.detener()
+            paquete = ColaEscritura.ejecutar(crear_paquete, self.cliente, 'TRK001')
+            self.assertIsNot(ColaEscritura._global, muerta)
+            self.colas.append(ColaEscritura._global)
+        self.assertTrue(Paquete.objects.filter(pk=paquete.pk).exists())
+
+    @override_settings(PAQUETES_GROUP_COMMIT=True, PAQUETES_GROUP_COMMIT_TIMEOUT=0.2)
+    def test_timeout_con_el_escritor_trabado(self):
+        cola = self.cola()
+        liberar = threading.Event()
+        trabada = cola.encolar(liberar.wait, 5)
+        with mock.patch.object(ColaEscritura, '_global', cola):
+            # no llegó a ejecutarse en el escritor: se cancela y se ejecuta en este thread
+            self.assertEqual(ColaEscritura.ejecutar(threading.get_ident), threading.get_ident())
+        liberar.set()
+        self.assertTrue(trabada.result(timeout=5))
+        self.assertEqual(cola.estadisticas()['operaciones'], 1)
+
+
+class ArchivoTests(TestCase):
+    """Archivo de planillas cerradas en la base 'archivo'"""
+    databases = {'default', ALIAS_ARCHIVO}
+
+    @classmethod
+    def setUpTestData(cls):
+        cliente = Cliente.objects.create(nombre='Cliente')
+        cls.paquetes = [crear_paquete(cliente, f'TRK{i:03}') for i in range(5)]
+        cls.cerrada = Planilla.objects.create(numero_planilla='CERRADA')
+        cls.pendiente = Planilla.objects.create(numero_planilla='PENDIENTE')
+        cls.vacia = Planilla.objects.create(numero_planilla='VACIA')
+        cls.reciente = Planilla.objects.create(numero_planilla='RECIENTE')
+
+        cls.cerrada.agregar_paquetes(cls.paquetes[:3])
+        Planilla.distribuir_planillas([cls.cerrada.id])
+        # TRK002 vuelve al depósito y pasa a otra planilla, que sigue pendiente
+        devuelto = Paquete.objects.get(pk=cls.paquetes[2].pk)
+        devuelto.estado = Paquete.EstadoPaquete.EN_DEPOSITO
+        devuelto.save()
+        cls.pendiente.agregar_paquetes([devuelto])
+        cls.reciente.agregar_paquetes([cls.paquetes[3]])
+        Planilla.distribuir_planillas([cls.reciente.id])
+
+        hace_tiempo = timezone.localdate() - timedelta(days=settings.PAQUETES_ARCHIVO_DIAS + 10)
+        Planilla.objects.exclude(pk=cls.reciente.pk).update(fecha=hace_tiempo)
+
+    def test_planillas_archivables(self):
+        self.assertEqual(list(ArchivoUtils.planillas_archivables().values_list('numero_planilla', flat=True)), ['CERRADA'])
+        self.assertEqual(ArchivoUtils.archivar(dry_run=True)['items'], 3)
+
+    def test_archivar(self):
+        totales = ArchivoUtils.archivar(chunk_size=1)
+        self.assertEqual((totales['planillas'], totales['items'], totales['paquetes']), (1, 3, 2))
+
+        self.assertFalse(Planilla.objects.filter(pk=self.cerrada.pk).exists())
+        # el paquete que sigue en una planilla de la base principal no se mueve
+        self.assertEqual(sorted(Paquete.objects.values_list('tracking', flat=True)), ['TRK002', 'TRK003', 'TRK004'])
+        self.assertEqual(
+            sorted(ItemArchivado.objects.filter(planilla_id=self.cerrada.id).values_list('paquete_id', 'activo')),
+            [(self.paquetes[0].id, True), (self.paquetes[1].id, True), (self.paquetes[2].id, False)],
+        )
+        self.assertEqual(PaqueteArchivado.objects.count(), 2)
+        self.assertEqual(ContadorPaquetes.diferencias(), {})
+
+        # idempotente: una segunda corrida no encuentra nada
+        self.assertEqual(ArchivoUtils.archivar()['planillas'], 0)
+
+        datos = APIClient().post('/api/paquetes/archivados/lookup/', {'trackings': ['TRK000', 'TRK002']}, format='json').json()
+        self.assertEqual(datos['desconocidos'], ['TRK002'])
+        self.assertEqual(datos['paquetes'][0]['planilla']['numero_planilla'], 'CERRADA')
+
+
+class InstrumentacionSQLTests(TestCase):
+    """Header Server-Timing del middleware y estadísticas por ruta en stats/sql/"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente = Cliente.objects.create(nombre='Cliente')
+        cls.paquetes = [crear_paquete(cls.cliente, f'TRK{i:03}') for i in range(3)]
+
+    def setUp(self):
+        EstadisticasSQL.reiniciar()
+        self.client = APIClient()
+
+    def metricas(self, response):
+        return dict(re.findall(r'([\w-]+);((?:dur|desc)=[^,]+(?:;desc="[^"]*")?)', response['Server-Timing']))
+
+    def test_header_server_timing(self):
+        with CaptureQueriesContext(connection) as capturadas:
+            response = self.client.get('/api/paquetes/', {'cliente': self.cliente.id})
+        self.assertEqual(response.status_code, 200)
+        consultas = len(capturadas)
+        self.assertGreater(consultas, 0)
+        metricas = self.metricas(response)
+        self.assertRegex(metricas['db'], rf'^dur=\d+\.\d{{2}};desc="consultas: {consultas}"$')
+        self.assertRegex(metricas['db-lenta'], r'^dur=\d+\.\d{2}$')
+        self.assertNotIn('db-duplicadas', metricas)
+
+    def test_sentencias_duplicadas(self):
+        def get_response(request):
+            # la misma consulta con listas IN de distinto largo: un N+1
+            for ids in [[1, 2], [1, 2, 3], [1, 2, 3, 4]]:
+                list(Paquete.objects.filter(id__in=ids))
+            return HttpResponse()
+
+        response = InstrumentacionSQLMiddleware(get_response)(RequestFactory().get('/sin-ruta/'))
+        self.assertEqual(self.metricas(response)['db-duplicadas'], 'desc="3"')
+
+        sin_ruta = EstadisticasSQL.estadisticas()[EstadisticasSQL.SIN_RUTA]
+        self.assertEqual((sin_ruta['requests'], sin_ruta['consultas_max'], sin_ruta['requests_con_duplicadas']), (1, 3, 1))
+        duplicada, = sin_ruta['duplicadas']
+        self.assertEqual(duplicada['veces'], 3)
+        self.assertIn('IN (%s, ...)', duplicada['sql'])
+
+    def test_estadisticas_por_ruta(self):
+        consultas = []
+        for paquete in self.paquetes[:2]:
+            response = self.client.post('/api/paquetes/lookup/', {'trackings': [paquete.tracking]}, format='json')
+            self.assertEqual(response.status_code, 200)
+            consultas.append(int(re.search(r'consultas: (\d+)', response['Server-Timing']).group(1)))
+        self.client.get('/api/motivos/')
+
+        estadisticas = self.client.get('/api/stats/sql/').json()
+        self.assertEqual(set(estadisticas), {'paquete-lookup', 'motivo-list'})
+        lookup = estadisticas['paquete-lookup']
+        self.assertEqual(lookup['requests'], 2)
+        self.assertEqual(lookup['consultas_max'], max(consultas))
+        self.assertEqual(lookup['consultas_promedio'], round(sum(consultas) / 2, 2))
+        self.assertGreaterEqual(lookup['sql_ms_total'], lookup['sql_ms_max'])
+        self.assertIsNotNone(lookup['mas_lenta']['sql'])
+        self.assertEqual(estadisticas['motivo-list']['requests'], 1)
+
+    def test_reinicio_requiere_staff(self):
+        self.client.get('/api/motivos/')
+        with override_settings(DEBUG=False):
+            response = self.client.delete('/api/stats/sql/')
+            self.assertEqual(response.status_code, 403)
+            self.assertIn('motivo-list', EstadisticasSQL.estadisticas())
+
+            staff = User.objects.create_user('staff', password='clave', is_staff=True)
+            self.client.force_authenticate(staff)
+            self.assertEqual(self.client.delete('/api/stats/sql/').status_code, 204)
+        # el DELETE reinicia antes de que el middleware registre su propio request
+        self.assertEqual(set(EstadisticasSQL.estadisticas()), {'stats-sql'})
+
+        self.client.force_authenticate(None)
+        with override_settings(DEBUG=True):
+            self.assertEqual(self.client.delete('/api/stats/sql/').status_code, 204)
+
+    @override_settings(PAQUETES_INSTRUMENTACION_SQL=False)
+    def test_desactivado(self):
+        response = APIClient().get('/api/motivos/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertEqual(EstadisticasSQL.estadisticas(), {})
@@ -3,13 +3,27 @@ from django.urls import path
 from .views import (
     PaqueteListView,
     PaqueteCreateView,
+    PaqueteBulkCreateView,
+    PaqueteExportView,
+    PaqueteLookupView,
+    PaqueteArchivoLookupView,
     PaqueteAssignPlanillaView,
     PlanillaDetailView,
     PlanillaDistribuirView,
+    PlanillaBulkDistribuirView,
+    PlanillaArmarView,
     ItemAssignMotivoFalloView,
+    ItemBulkAssignMotivoView,
     PaqueteBulkAssignPlanillaView,
     MotivoSimpleListView,
+    MotivoCompuestoListView,
+    CacheStatsView,
+    SQLStatsView,
+    ContadoresStatsView,
+    ReporteClientesView,
+    ReporteMotivosView,
 )
+from .async_views import MotivoAsyncListView, PaqueteAsyncListView, PlanillaAsyncDetailView
 
 app_name = 'app_paquetes'
 
@@ -17,16 +31,38 @@ urlpatterns = [
     # paquetes
     path('paquetes/', PaqueteListView.as_view(), name='paquete-list'),
     path('paquetes/create/', PaqueteCreateView.as_view(), name='paquete-create'),
+    path('paquetes/bulk-create/', PaqueteBulkCreateView.as_view(), name='paquete-bulk-create'),
+    path('paquetes/export/', PaqueteExportView.as_view(), name='paquete-export'),
+    path('paquetes/lookup/', PaqueteLookupView.as_view(), name='paquete-lookup'),
+    path('paquetes/archivados/lookup/', PaqueteArchivoLookupView.as_view(), name='paquete-archivo-lookup'),
     path('paquetes/<int:pk>/assign-planilla/', PaqueteAssignPlanillaView.as_view(), name='paquete-assign-planilla'),
     path('paquetes/bulk-assign-planilla/', PaqueteBulkAssignPlanillaView.as_view(), name='paquete-bulk-assign-planilla'),
     
     # planillas
     path('planillas/<int:pk>/', PlanillaDetailView.as_view(), name='planilla-detail'),
     path('planillas/<int:pk>/distribuir/', PlanillaDistribuirView.as_view(), name='planilla-distribuir'),
+    path('planillas/bulk-distribuir/', PlanillaBulkDistribuirView.as_view(), name='planilla-bulk-distribuir'),
+    path('planillas/armar/', PlanillaArmarView.as_view(), name='planilla-armar'),
     
     # items
     path('items/<int:pk>/assign-motivo/', ItemAssignMotivoFalloView.as_view(), name='item-assign-motivo'),
+    path('items/bulk-assign-motivo/', ItemBulkAssignMotivoView.as_view(), name='item-bulk-assign-motivo'),
 
     # motivos
-    path('motivos/', MotivoSimpleListView.as_view(), name='motivo-list')
+    path('motivos/', MotivoSimpleListView.as_view(), name='motivo-list'),
+    path('motivos/compuestos/', MotivoCompuestoListView.as_view(), name='motivo-compuesto-list'),
+
+    # reportes (leen solo los resúmenes diarios)
+    path('reportes/clientes/', ReporteClientesView.as_view(), name='reporte-clientes'),
+    path('reportes/motivos/', ReporteMotivosView.as_view(), name='reporte-motivos'),
+
+    # lecturas async (para correr bajo un servidor ASGI)
+    path('async/paquetes/', PaqueteAsyncListView.as_view(), name='async-paquete-list'),
+    path('async/planillas/<int:pk>/', PlanillaAsyncDetailView.as_view(), name='async-planilla-detail'),
+    path('async/motivos/', MotivoAsyncListView.as_view(), name='async-motivo-list'),
+
+    # estadisticas internas
+    path('stats/cache/', CacheStatsView.as_view(), name='stats-cache'),
+    path('stats/counters/', ContadoresStatsView.as_view(), name='stats-counters'),
+    path('stats/sql/', SQLStatsView.as_view(), name='stats-sql'),
 ]   
\ No newline at end of file
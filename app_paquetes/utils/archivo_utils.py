@@ -0,0 +1,211 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from ..routers import ALIAS_ARCHIVO
+from .busqueda_utils import BusquedaUtils
+
+
+class ArchivoUtils:
+    """
+    Archivo de planillas cerradas: las planillas anteriores al corte cuyos paquetes están
+    todos en distribución se mueven, con sus items y paquetes, a la base 'archivo'.
+    Así las tablas principales (y sus índices) crecen con el trabajo activo y no con la
+    historia.
+
+    Cada lote de planillas se copia al archivo (idempotente: mismos ids, los conflictos
+    se ignoran) y después se borra de la base principal en una transacción. Si el proceso
+    se corta entre los dos pasos, las filas quedan en ambas bases hasta la próxima corrida,
+    que vuelve a tomar esas planillas.
+
+    El borrado no pasa por los signals (serían varias consultas por fila): el lote
+    descuenta los contadores de paquetes e incrementa las versiones de tablas una vez.
+    Los triggers del índice FTS5 siguen actuando sobre el DELETE. El registro de cambios y
+    los resúmenes diarios no cambian: los eventos de esos paquetes ya se registraron
+    """
+
+    CAMPOS_PLANILLA = ('id', 'numero_planilla', 'fecha', 'peso_total', 'item_count')
+    CAMPOS_ITEM = ('id', 'planilla_id', 'paquete_id', 'posicion', 'activo', 'motivo_fallo_id', 'motivo_fallo_compuesto_id')
+    CAMPOS_PAQUETE = (
+        'id', 'tracking', 'direccion_destinatario', 'telefono_destinatario', 'nombre_destinatario',
+        'peso', 'altura', 'estado', 'tipo', 'cliente_id',
+    )
+    # ids por consulta IN (SQLite admite 999 parámetros en versiones viejas)
+    TRAMO = 900
+
+    @staticmethod
+    def corte_por_defecto():
+        return timezone.localdate() - timedelta(days=settings.PAQUETES_ARCHIVO_DIAS)
+
+    @staticmethod
+    def planillas_archivables(antes_de=None):
+        """
+        Planillas anteriores al corte con items y con todos sus paquetes vigentes en
+        distribución. Una planilla sin items (vacía o recién creada) no está cerrada; un
+        item liberado (el paquete volvió al depósito y pasó a otra planilla) no la frena
+        """
+        from ..models import Item, Paquete, Planilla
+
+        antes_de = antes_de or ArchivoUtils.corte_por_defecto()
+        items = Item.objects.filter(planilla_id=OuterRef('pk'))
+        pendientes = items.filter(activo=True).exclude(paquete__estado=Paquete.EstadoPaquete.EN_DISTRIBUCION)
+        return Planilla.objects.filter(fecha__lt=antes_de).filter(Exists(items), ~Exists(pendientes))
+
+    @staticmethod
+    def archivar(antes_de=None, chunk_size=None, dry_run=False):
+        """
+        Archiva las planillas archivables en lotes de chunk_size planillas, cada uno en su
+        transacción. Devuelve los totales movidos
+        """
+        from ..models import Item
+
+        chunk_size = chunk_size or settings.PAQUETES_ARCHIVO_CHUNK_SIZE
+        archivables = ArchivoUtils.planillas_archivables(antes_de)
+        totales = {'planillas': 0, 'items': 0, 'paquetes': 0, 'lotes': 0}
+        if dry_run:
+            ids = archivables.values('id')
+            totales['planillas'] = archivables.count()
+            totales['items'] = Item.objects.filter(planilla_id__in=ids).count()
+            return totales
+
+        ultimo = 0
+        while True:
+            planilla_ids = list(
+                archivables.filter(id__gt=ultimo).order_by('id').values_list('id', flat=True)[:chunk_size]
+            )
+            if not planilla_ids:
+                return totales
+            ultimo = planilla_ids[-1]
+            movidos = ArchivoUtils._archivar_lote(planilla_ids)
+            totales['lotes'] += 1
+            for clave, cantidad in movidos.items():
+                totales[clave] += cantidad
+
+    @staticmethod
+    def _archivar_lote(planilla_ids):
+        from ..models import (
+            ContadorPaquetes, Item, ItemArchivado, Paquete, PaqueteArchivado, Planilla,
+            PlanillaArchivada, VersionTabla,
+        )
+
+        with transaction.atomic():
+            # el transaction_mode IMMEDIATE toma el lock de escritura: el estado de las
+            # planillas no puede cambiar entre la verificación y el borrado
+            planilla_ids = list(
+                ArchivoUtils.planillas_archivables(timezone.localdate() + timedelta(days=1))
+                .filter(id__in=planilla_ids).order_by().values_list('id', flat=True)
+            )
+            if not planilla_ids:
+                return {'planillas': 0, 'items': 0, 'paquetes': 0}
+
+            planillas = list(Planilla.objects.filter(id__in=planilla_ids).order_by().values(*ArchivoUtils.CAMPOS_PLANILLA))
+            items = list(Item.objects.filter(planilla_id__in=planilla_ids).order_by().values(*ArchivoUtils.CAMPOS_ITEM))
+            # un paquete se mueve solo si no figura en planillas que quedan en la base principal
+            en_otras = Item.objects.filter(paquete_id=OuterRef('pk')).exclude(planilla_id__in=planilla_ids)
+            paquetes = []
+            for tramo in ArchivoUtils._tramos(sorted({item['paquete_id'] for item in items})):
+                paquetes += Paquete.objects.filter(id__in=tramo).filter(~Exists(en_otras)).order_by().values(
+                    *ArchivoUtils.CAMPOS_PAQUETE
+                )
+
+            archivado_en = timezone.now()
+            with transaction.atomic(using=ALIAS_ARCHIVO):
+                PlanillaArchivada.objects.bulk_create(
+                    [PlanillaArchivada(archivada_en=archivado_en, **fila) for fila in planillas],
+                    batch_size=500, ignore_conflicts=True,
+                )
+                PaqueteArchivado.objects.bulk_create(
+                    [PaqueteArchivado(archivado_en=archivado_en, **fila) for fila in paquetes],
+                    batch_size=500, ignore_conflicts=True,
+                )
+                ItemArchivado.objects.bulk_create(
+                    [ItemArchivado(**fila) for fila in items], batch_size=500, ignore_conflicts=True,
+                )
+
+            paquete_ids = [fila['id'] for fila in paquetes]
+            grupos = {}
+            for fila in paquetes:
+                grupo = (fila['cliente_id'], fila['estado'], fila['tipo'])
+                grupos[grupo] = grupos.get(grupo, 0) - 1
+
+            # _raw_delete: DELETE directo, sin cargar las filas ni disparar signals por fila
+            Item.objects.filter(planilla_id__in=planilla_ids)._raw_delete(DEFAULT_DB_ALIAS)
+            for tramo in ArchivoUtils._tramos(paquete_ids):
+                Paquete.objects.filter(id__in=tramo)._raw_delete(DEFAULT_DB_ALIAS)
+            Planilla.objects.filter(id__in=planilla_ids)._raw_delete(DEFAULT_DB_ALIAS)
+
+            ContadorPaquetes.aplicar(grupos)
+            VersionTabla.incrementar(VersionTabla.PAQUETE, VersionTabla.PLANILLA, VersionTabla.ITEM)
+            return {'planillas': len(planillas), 'items': len(items), 'paquetes': len(paquetes)}
+
+    @staticmethod
+    def _tramos(ids):
+        for inicio in range(0, len(ids), ArchivoUtils.TRAMO):
+            yield ids[inicio:inicio + ArchivoUtils.TRAMO]
+
+    @staticmethod
+    def compactar(vacuum=True):
+        """
+        Después de archivar: optimiza el índice FTS5, actualiza las estadísticas del
+        planificador (ANALYZE) de ambas bases y, con vacuum, devuelve al sistema el espacio
+        liberado de la base principal (VACUUM reescribe el archivo entero: correrlo fuera
+        de horario). Devuelve el tamaño de la base principal antes y después, en bytes
+        """
+        principal = connections[DEFAULT_DB_ALIAS]
+        antes = ArchivoUtils.tamano(principal)
+        with principal.cursor() as cursor:
+            if BusquedaUtils.disponible(principal):
+                cursor.execute(f"INSERT INTO {BusquedaUtils.TABLA}({BusquedaUtils.TABLA}) VALUES ('optimize')")
+            cursor.execute('ANALYZE')
+            if vacuum:
+                cursor.execute('VACUUM')
+        with connections[ALIAS_ARCHIVO].cursor() as cursor:
+            cursor.execute('ANALYZE')
+        return {'antes': antes, 'despues': ArchivoUtils.tamano(principal)}
+
+    @staticmethod
+    def tamano(connection):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA page_count')
+            paginas = cursor.fetchone()[0]
+            cursor.execute('PRAGMA page_size')
+            return paginas * cursor.fetchone()[0]
+
+    @staticmethod
+    def consultar_trackings(trackings, chunk_size=None):
+        """
+        Datos archivados de cada tracking, con la última planilla archivada en la que
+        figuró. Mismo formato que PaqueteUtils.consultar_trackings más archivado_en;
+        solo lee la base de archivo
+        """
+        from ..models import ItemArchivado, PaqueteArchivado
+
+        chunk_size = chunk_size or settings.PAQUETES_LOOKUP_CHUNK_SIZE
+        resultado = {}
+        for inicio in range(0, len(trackings), chunk_size):
+            paquetes = list(PaqueteArchivado.objects.filter(
+                tracking__in=trackings[inicio:inicio + chunk_size]
+            ).values_list('id', 'tracking', 'estado', 'tipo', 'archivado_en'))
+            # la última planilla de cada paquete: el item archivado de mayor id
+            planillas = {
+                paquete_id: (planilla_id, numero)
+                for paquete_id, planilla_id, numero in ItemArchivado.objects.filter(
+                    paquete_id__in=[fila[0] for fila in paquetes]
+                ).order_by('id').values_list('paquete_id', 'planilla_id', 'planilla__numero_planilla')
+            }
+            for paquete_id, tracking, estado, tipo, archivado_en in paquetes:
+                planilla = planillas.get(paquete_id)
+                resultado[tracking] = {
+                    'tracking': tracking,
+                    'estado': estado,
+                    'tipo': tipo,
+                    'planilla': None if planilla is None else {
+                        'id': planilla[0],
+                        'numero_planilla': planilla[1],
+                    },
+                    'archivado_en': archivado_en,
+                }
+        return resultado
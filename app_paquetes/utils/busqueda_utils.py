@@ -0,0 +1,109 @@
+from django.db import DatabaseError, connection as conexion_default
+
+
+class BusquedaUtils:
+    """
+    Índice de texto completo de paquetes: tabla virtual FTS5 con tokenizer trigram
+    sobre tracking, nombre y dirección del destinatario. Es de contenido externo
+    (lee las columnas de app_paquetes_paquete) y se mantiene con triggers, por lo que
+    también queda sincronizada en bulk_create, UPDATE masivos y borrados en cascada.
+
+    Si la tabla de paquetes se reconstruye (un AlterField en SQLite la copia y borra
+    la original) los triggers se pierden: correr `manage.py reconstruir_busqueda`
+    """
+
+    TABLA = 'app_paquetes_paquete_busqueda'
+    TABLA_PAQUETE = 'app_paquetes_paquete'
+    COLUMNAS = ('tracking', 'nombre_destinatario', 'direccion_destinatario')
+    # pesos de bm25 por columna: un acierto en el tracking pesa más que en la dirección
+    PESOS = (10.0, 5.0, 1.0)
+    # el tokenizer trigram no puede buscar términos de menos de 3 caracteres
+    LARGO_MINIMO = 3
+
+    _disponible = {}
+
+    @staticmethod
+    def fts5_soportado(connection):
+        """Indica si la base es SQLite y fue compilada con FTS5 y el tokenizer trigram"""
+        if connection.vendor != 'sqlite':
+            return False
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("CREATE VIRTUAL TABLE temp.fts5_prueba USING fts5(a, tokenize='trigram')")
+                cursor.execute("DROP TABLE temp.fts5_prueba")
+        except DatabaseError:
+            return False
+        return True
+
+    @staticmethod
+    def disponible(connection=None):
+        """Indica si el índice existe en la base; el resultado se recuerda por base"""
+        connection = connection or conexion_default
+        clave = (connection.alias, connection.settings_dict['NAME'])
+        if clave not in BusquedaUtils._disponible:
+            BusquedaUtils._disponible[clave] = (
+                connection.vendor == 'sqlite'
+                and BusquedaUtils.TABLA in connection.introspection.table_names()
+            )
+        return BusquedaUtils._disponible[clave]
+
+    @staticmethod
+    def instalar(connection=None):
+        """
+        Crea (si faltan) la tabla virtual y sus triggers y reconstruye el índice desde
+        la tabla de paquetes. Devuelve False si la base no soporta FTS5
+        """
+        connection = connection or conexion_default
+        if not BusquedaUtils.fts5_soportado(connection):
+            return False
+
+        tabla, paquete = BusquedaUtils.TABLA, BusquedaUtils.TABLA_PAQUETE
+        columnas = ', '.join(BusquedaUtils.COLUMNAS)
+        nuevos = ', '.join(f'new.{columna}' for columna in BusquedaUtils.COLUMNAS)
+        viejos = ', '.join(f'old.{columna}' for columna in BusquedaUtils.COLUMNAS)
+        cambio = ' OR '.join(f'old.{columna} IS NOT new.{columna}' for columna in BusquedaUtils.COLUMNAS)
+        pesos = ', '.join(str(peso) for peso in BusquedaUtils.PESOS)
+
+        sentencias = [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {tabla} USING fts5("
+            f"{columnas}, content='{paquete}', content_rowid='id', tokenize='trigram')",
+            f"CREATE TRIGGER IF NOT EXISTS {tabla}_ai AFTER INSERT ON {paquete} BEGIN "
+            f"INSERT INTO {tabla}(rowid, {columnas}) VALUES (new.id, {nuevos}); END",
+            f"CREATE TRIGGER IF NOT EXISTS {tabla}_ad AFTER DELETE ON {paquete} BEGIN "
+            f"INSERT INTO {tabla}({tabla}, rowid, {columnas}) VALUES ('delete', old.id, {viejos}); END",
+            f"CREATE TRIGGER IF NOT EXISTS {tabla}_au AFTER UPDATE ON {paquete} WHEN {cambio} BEGIN "
+            f"INSERT INTO {tabla}({tabla}, rowid, {columnas}) VALUES ('delete', old.id, {viejos}); "
+            f"INSERT INTO {tabla}(rowid, {columnas}) VALUES (new.id, {nuevos}); END",
+            # la columna oculta rank pasa a ser bm25 con los pesos por columna
+            f"INSERT INTO {tabla}({tabla}, rank) VALUES ('rank', 'bm25({pesos})')",
+            f"INSERT INTO {tabla}({tabla}) VALUES ('rebuild')",
+        ]
+        with connection.cursor() as cursor:
+            for sentencia in sentencias:
+                cursor.execute(sentencia)
+        BusquedaUtils._disponible.clear()
+        return True
+
+    @staticmethod
+    def desinstalar(connection=None):
+        connection = connection or conexion_default
+        if connection.vendor != 'sqlite':
+            return
+        tabla = BusquedaUtils.TABLA
+        with connection.cursor() as cursor:
+            for sufijo in ('ai', 'ad', 'au'):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {tabla}_{sufijo}")
+            cursor.execute(f"DROP TABLE IF EXISTS {tabla}")
+        BusquedaUtils._disponible.clear()
+
+    @staticmethod
+    def admite_terminos(terminos):
+        return bool(terminos) and all(len(termino) >= BusquedaUtils.LARGO_MINIMO for termino in terminos)
+
+    @staticmethod
+    def consulta(terminos):
+        """
+        Arma la expresión MATCH: cada término como frase entre comillas (sin operadores
+        FTS5) y todos requeridos, igual que SearchFilter
+        """
+        return ' '.join('"{}"'.format(termino.replace('"', '""')) for termino in terminos)
@@ -0,0 +1,264 @@
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+
+class ResumenPlanillaCache:
+    """
+    Cache read-through del resumen serializado de cada planilla.
+    La clave incluye Planilla.version, que se incrementa ante cualquier cambio que
+    afecte al resumen; las entradas viejas quedan huérfanas y expiran solas
+    """
+
+    PREFIJO = 'planilla-resumen'
+    CLAVE_HITS = f'{PREFIJO}:hits'
+    CLAVE_MISSES = f'{PREFIJO}:misses'
+
+    @staticmethod
+    def clave(planilla_id, version):
+        return f'{ResumenPlanillaCache.PREFIJO}:{planilla_id}:v{version}'
+
+    @staticmethod
+    def obtener(planilla_id, version, construir):
+        """Devuelve el resumen cacheado para esa versión o lo construye y lo guarda"""
+        clave = ResumenPlanillaCache.clave(planilla_id, version)
+        resumen = cache.get(clave)
+        if resumen is not None:
+            ResumenPlanillaCache._contar(ResumenPlanillaCache.CLAVE_HITS)
+            return resumen
+
+        ResumenPlanillaCache._contar(ResumenPlanillaCache.CLAVE_MISSES)
+        resumen = construir()
+        cache.set(clave, resumen, settings.PAQUETES_RESUMEN_CACHE_TIMEOUT)
+        return resumen
+
+    @staticmethod
+    async def aobtener(planilla_id, version, construir):
+        """obtener para vistas async: construir es una corrutina y el cache se usa con su API async"""
+        clave = ResumenPlanillaCache.clave(planilla_id, version)
+        resumen = await cache.aget(clave)
+        if resumen is not None:
+            await ResumenPlanillaCache._acontar(ResumenPlanillaCache.CLAVE_HITS)
+            return resumen
+
+        await ResumenPlanillaCache._acontar(ResumenPlanillaCache.CLAVE_MISSES)
+        resumen = await construir()
+        await cache.aset(clave, resumen, settings.PAQUETES_RESUMEN_CACHE_TIMEOUT)
+        return resumen
+
+    @staticmethod
+    def _contar(clave):
+        # add no pisa un contador existente; incr es atómico en los backends de Django
+        cache.add(clave, 0, timeout=None)
+        try:
+            cache.incr(clave)
+        except ValueError:
+            # la clave expiró o fue desalojada entre add e incr
+            cache.set(clave, 1, timeout=None)
+
+    @staticmethod
+    async def _acontar(clave):
+        await cache.aadd(clave, 0, timeout=None)
+        try:
+            await cache.aincr(clave)
+        except ValueError:
+            await cache.aset(clave, 1, timeout=None)
+
+    @staticmethod
+    def estadisticas():
+        hits = cache.get(ResumenPlanillaCache.CLAVE_HITS, 0)
+        misses = cache.get(ResumenPlanillaCache.CLAVE_MISSES, 0)
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / total, 4) if total else None,
+        }
+
+    @staticmethod
+    def reiniciar_estadisticas():
+        cache.delete_many([ResumenPlanillaCache.CLAVE_HITS, ResumenPlanillaCache.CLAVE_MISSES])
+
+
+class CatalogoMotivos:
+    """
+    Copia en memoria del proceso del catálogo de motivos (simples y compuestos),
+    compartida por el listado, la asignación de motivos y Item.clean.
+
+    Cada escritura de motivos incrementa VersionTabla.MOTIVO en su transacción; la copia
+    se recarga entera cuando la versión de la base no coincide con la cargada.
+    Las validaciones siempre consultan la versión (una lectura por clave primaria), así
+    un motivo desactivado nunca se acepta después del cambio de versión, aunque la
+    escritura venga de otro proceso. Las lecturas del listado pueden saltear esa
+    consulta durante PAQUETES_CATALOGO_MOTIVOS_TTL segundos (0: verificar siempre)
+    """
+
+    _lock = threading.Lock()
+    _version = None
+    _verificado_en = 0.0
+    _simples = {}
+    _compuestos = {}
+    _derivados = {}
+    _recargas = 0
+
+    @classmethod
+    def _asegurar(cls, verificar=True):
+        """Recarga el catálogo si cambió la versión; sin verificar respeta el TTL"""
+        ttl = settings.PAQUETES_CATALOGO_MOTIVOS_TTL
+        if (not verificar and ttl and cls._version is not None
+                and time.monotonic() - cls._verificado_en < ttl):
+            return
+
+        cls._actualizar(cls._version_actual())
+
+    @classmethod
+    async def _aasegurar(cls, verificar=True):
+        """_asegurar para vistas async: la versión se lee con el ORM async"""
+        from ..models import VersionTabla
+
+        ttl = settings.PAQUETES_CATALOGO_MOTIVOS_TTL
+        if (not verificar and ttl and cls._version is not None
+                and time.monotonic() - cls._verificado_en < ttl):
+            return
+
+        version = await VersionTabla.objects.filter(
+            tabla=VersionTabla.MOTIVO
+        ).values_list('version', flat=True).afirst() or 0
+        if version != cls._version:
+            # la recarga es poco frecuente y usa el ORM sync, en un thread
+            await sync_to_async(cls._actualizar)(version)
+        else:
+            cls._verificado_en = time.monotonic()
+
+    @classmethod
+    def _actualizar(cls, version):
+        if version != cls._version:
+            with cls._lock:
+                if version != cls._version:
+                    cls._cargar(version)
+        cls._verificado_en = time.monotonic()
+
+    @staticmethod
+    def _version_actual():
+        """Misma lectura que VersionTabla.obtener, sin armar un queryset en cada validación"""
+        from ..models import VersionTabla
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT version FROM {VersionTabla._meta.db_table} WHERE tabla = %s", [VersionTabla.MOTIVO]
+            )
+            fila = cursor.fetchone()
+        return fila[0] if fila else 0
+
+    @classmethod
+    def _cargar(cls, version):
+        from ..models import MotivoFalloCompuesto, MotivoFalloSimple
+
+        # la versión se leyó antes que los datos: si hubo una escritura en el medio,
+        # los datos son más nuevos que la versión y la próxima verificación recarga
+        cls._simples = {motivo.id: motivo for motivo in MotivoFalloSimple.objects.order_by('id')}
+        cls._compuestos = {motivo.id: motivo for motivo in MotivoFalloCompuesto.objects.order_by('id')}
+        cls._derivados = {}
+        cls._version = version
+        cls._recargas += 1
+
+    @classmethod
+    def invalidar(cls):
+        """Fuerza la verificación de la versión en la próxima lectura (escrituras de este proceso)"""
+        cls._verificado_en = 0.0
+
+    @classmethod
+    def reiniciar(cls):
+        """
+        Descarta la copia: la próxima lectura recarga aunque la versión coincida. Para
+        cuando la versión de la base retrocede (restaurar un backup, rollback de un test)
+        """
+        with cls._lock:
+            cls._version = None
+            cls._verificado_en = 0.0
+            cls._simples = {}
+            cls._compuestos = {}
+            cls._derivados = {}
+
+    @staticmethod
+    def clave(pk):
+        """Normaliza un id recibido en el pedido; None si no es un id"""
+        try:
+            return int(pk)
+        except (TypeError, ValueError):
+            return None
+
+    @classmethod
+    def listar_simples(cls):
+        """Motivos simples ordenados por id. Las instancias son compartidas: no modificarlas"""
+        cls._asegurar(verificar=False)
+        return list(cls._simples.values())
+
+    @classmethod
+    def derivado(cls, nombre, construir):
+        """
+        Valor calculado a partir del catálogo (por ejemplo el listado serializado),
+        guardado hasta la próxima recarga
+        """
+        cls._asegurar(verificar=False)
+        derivados = cls._derivados
+        if nombre not in derivados:
+            derivados[nombre] = construir(list(cls._simples.values()))
+        return derivados[nombre]
+
+    @classmethod
+    async def aderivado(cls, nombre, construir):
+        """derivado para vistas async"""
+        await cls._aasegurar(verificar=False)
+        derivados = cls._derivados
+        if nombre not in derivados:
+            derivados[nombre] = construir(list(cls._simples.values()))
+        return derivados[nombre]
+
+    @classmethod
+    def obtener_simple(cls, pk):
+        """Motivo simple por id con la versión verificada, o None"""
+        cls._asegurar()
+        return cls._simples.get(cls.clave(pk))
+
+    @classmethod
+    def obtener_compuesto(cls, pk):
+        """Motivo compuesto por id con la versión verificada, o None"""
+        cls._asegurar()
+        return cls._compuestos.get(cls.clave(pk))
+
+    @classmethod
+    def obtener_lote(cls, simples=(), compuestos=()):
+        """
+        Motivos de muchos ids con una sola verificación de versión (asignaciones masivas).
+        Devuelve ({id: simple}, {id: compuesto}); los ids inexistentes no aparecen
+        """
+        cls._asegurar()
+        catalogo_simples, catalogo_compuestos = cls._simples, cls._compuestos
+        return (
+            {pk: catalogo_simples[pk] for pk in map(cls.clave, simples) if pk in catalogo_simples},
+            {pk: catalogo_compuestos[pk] for pk in map(cls.clave, compuestos) if pk in catalogo_compuestos},
+        )
+
+    @classmethod
+    def simple_activo(cls, pk):
+        motivo = cls.obtener_simple(pk)
+        return motivo is not None and motivo.is_active()
+
+    @classmethod
+    def compuesto_activo(cls, pk):
+        motivo = cls.obtener_compuesto(pk)
+        return motivo is not None and motivo.is_active()
+
+    @classmethod
+    def estadisticas(cls):
+        return {
+            'version': cls._version,
+            'recargas': cls._recargas,
+            'simples': len(cls._simples),
+            'compuestos': len(cls._compuestos),
+        }
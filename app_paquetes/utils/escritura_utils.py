@@ -0,0 +1,161 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+
+
+class ColaEscritura:
+    """
+    Group commit para escrituras chicas (opcional, PAQUETES_GROUP_COMMIT).
+
+    SQLite admite un solo escritor: con un commit por request, los requests de
+    escritura concurrentes esperan el lock uno detrás del otro y cada uno paga su
+    propio commit. Con la cola, las operaciones de los requests se encolan a un único
+    thread escritor que las ejecuta en una sola transacción por lote, cada una dentro de
+    su propio savepoint (si una falla se deshace solo esa y su excepción vuelve a quien
+    la encoló). Quien encola espera a que el lote confirme.
+
+    Un lote se cierra al juntar PAQUETES_GROUP_COMMIT_MAX_OPERACIONES operaciones o al
+    pasar PAQUETES_GROUP_COMMIT_ESPERA_MS desde la primera. Las operaciones deben ser
+    cortas: mientras una se ejecuta, el resto del lote la espera.
+
+    Quien encola espera como máximo PAQUETES_GROUP_COMMIT_TIMEOUT segundos. Si el
+    escritor no llegó a empezar su operación, la cancela y escribe por su cuenta; si ya
+    la estaba ejecutando, recibe TimeoutError (el resultado de esa escritura es
+    desconocido). Si el thread escritor murió, la cola del proceso se vuelve a crear
+    """
+
+    _global = None
+    _lock_global = threading.Lock()
+
+    def __init__(self, max_operaciones=None, espera_ms=None):
+        self.max_operaciones = max_operaciones or settings.PAQUETES_GROUP_COMMIT_MAX_OPERACIONES
+        espera_ms = settings.PAQUETES_GROUP_COMMIT_ESPERA_MS if espera_ms is None else espera_ms
+        self.espera = espera_ms / 1000
+        self.lotes = 0
+        self.operaciones = 0
+        self._cola = queue.SimpleQueue()
+        self._hilo = threading.Thread(target=self._escribir, name='cola-escritura', daemon=True)
+        self._hilo.start()
+
+    @classmethod
+    def ejecutar(cls, funcion, *args, **kwargs):
+        """
+        Ejecuta la escritura y devuelve su resultado (o lanza su excepción). Sin group
+        commit, o si quien llama ya está dentro de una transacción, la ejecuta en el
+        momento como hasta ahora
+        """
+        if not settings.PAQUETES_GROUP_COMMIT or transaction.get_connection().in_atomic_block:
+            return funcion(*args, **kwargs)
+        futuro = cls.obtener().encolar(funcion, *args, **kwargs)
+        try:
+            return futuro.result(timeout=settings.PAQUETES_GROUP_COMMIT_TIMEOUT)
+        except TimeoutError:
+            # el escritor está trabado: si todavía no tomó la operación, se hace acá
+            if futuro.cancel():
+                return funcion(*args, **kwargs)
+            raise
+
+    @classmethod
+    def obtener(cls):
+        """Cola del proceso, creada en el primer uso o si su thread escritor terminó"""
+        if cls._global is None or not cls._global.activa():
+            with cls._lock_global:
+                if cls._global is None or not cls._global.activa():
+                    cls._global = cls()
+        return cls._global
+
+    def activa(self):
+        return self._hilo.is_alive()
+
+    def encolar(self, funcion, *args, **kwargs):
+        futuro = Future()
+        self._cola.put((funcion, args, kwargs, futuro))
+        return futuro
+
+    def detener(self):
+        """Procesa lo pendiente y termina el thread escritor"""
+        self._cola.put(None)
+        self._hilo.join()
+
+    def estadisticas(self):
+        return {
+            'lotes': self.lotes,
+            'operaciones': self.operaciones,
+            'operaciones_por_lote': round(self.operaciones / self.lotes, 2) if self.lotes else None,
+        }
+
+    def _escribir(self):
+        try:
+            detenida = False
+            while not detenida:
+                operacion = self._cola.get()
+                if operacion is None:
+                    break
+                lote = [operacion]
+                limite = time.monotonic() + self.espera
+                while len(lote) < self.max_operaciones:
+                    try:
+                        restante = limite - time.monotonic()
+                        operacion = self._cola.get(timeout=restante) if restante > 0 else self._cola.get_nowait()
+                    except queue.Empty:
+                        break
+                    if operacion is None:
+                        detenida = True
+                        break
+                    lote.append(operacion)
+                self._confirmar(lote)
+        finally:
+            # lo encolado después de detenerse (o de un error fatal) no se va a ejecutar
+            pendientes = []
+            while True:
+                try:
+                    operacion = self._cola.get_nowait()
+                except queue.Empty:
+                    break
+                if operacion is not None:
+                    pendientes.append(operacion)
+            self._fallar(pendientes, RuntimeError('La cola de escritura se detuvo'))
+            connections.close_all()
+
+    def _confirmar(self, lote):
+        # conexión persistente del escritor: se renueva si venció o quedó inutilizable
+        close_old_connections()
+        resultados = []
+        try:
+            with transaction.atomic():
+                for funcion, args, kwargs, futuro in lote:
+                    if not futuro.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        with transaction.atomic():
+                            resultados.append((futuro, funcion(*args, **kwargs), None))
+                    except Exception as error:
+                        resultados.append((futuro, None, error))
+        except BaseException as error:
+            # falló el BEGIN o el COMMIT, o una operación lanzó algo que no es Exception:
+            # no quedó confirmada ninguna operación del lote
+            self._fallar(lote, error)
+            if not isinstance(error, Exception):
+                raise
+            return
+
+        self.lotes += 1
+        self.operaciones += len(resultados)
+        for futuro, resultado, error in resultados:
+            if error is None:
+                futuro.set_result(resultado)
+            else:
+                futuro.set_exception(error)
+
+    @staticmethod
+    def _fallar(lote, error):
+        """Resuelve con el error los futuros del lote que no terminaron (salvo los cancelados)"""
+        for _, _, _, futuro in lote:
+            if futuro.done():
+                continue
+            if futuro.running() or futuro.set_running_or_notify_cancel():
+                futuro.set_exception(error)
@@ -0,0 +1,143 @@
+import re
+import threading
+import time
+from functools import lru_cache
+
+
+class MedicionSQL:
+    """
+    Consultas de un request. Se instala con connection.execute_wrapper en cada conexión
+    mientras dura el request: cuenta, tiempo total, la sentencia más lenta y cuántas veces
+    se ejecutó cada sentencia. El SQL se guarda con los placeholders, sin parámetros
+    """
+    __slots__ = ('consultas', 'segundos', 'mas_lenta', 'mas_lenta_segundos', 'sentencias')
+
+    def __init__(self):
+        self.consultas = 0
+        self.segundos = 0.0
+        self.mas_lenta = None
+        self.mas_lenta_segundos = 0.0
+        self.sentencias = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            segundos = time.perf_counter() - inicio
+            self.consultas += 1
+            self.segundos += segundos
+            if segundos > self.mas_lenta_segundos:
+                self.mas_lenta_segundos = segundos
+                self.mas_lenta = sql
+            self.sentencias[sql] = self.sentencias.get(sql, 0) + 1
+
+    def duplicadas(self):
+        """{huella: veces} de las sentencias ejecutadas más de una vez (típico de un N+1)"""
+        if self.consultas < 2:
+            return {}
+        huellas = {}
+        for sql, veces in self.sentencias.items():
+            huella = EstadisticasSQL.huella(sql)
+            huellas[huella] = huellas.get(huella, 0) + veces
+        return {huella: veces for huella, veces in huellas.items() if veces > 1}
+
+    def server_timing(self, duplicadas):
+        """Valor del header Server-Timing (duraciones en ms)"""
+        metricas = [
+            f'db;dur={self.segundos * 1000:.2f};desc="consultas: {self.consultas}"',
+            f'db-lenta;dur={self.mas_lenta_segundos * 1000:.2f}',
+        ]
+        if duplicadas:
+            metricas.append(f'db-duplicadas;desc="{sum(duplicadas.values())}"')
+        return ', '.join(metricas)
+
+
+class EstadisticasSQL:
+    """
+    Agregado en memoria del proceso de las mediciones, por nombre de URL. Se actualiza una
+    vez por request bajo un lock; cada worker informa sus propios requests
+    """
+    # huellas de sentencias duplicadas que se conservan por ruta y largo máximo del SQL guardado
+    MAX_HUELLAS = 50
+    MAX_CARACTERES = 500
+    SIN_RUTA = '(sin ruta)'
+
+    _rutas = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def huella(sql):
+        """
+        Forma de la sentencia sin la cantidad de valores: las listas IN y las filas de
+        VALUES de distinto largo dan la misma huella
+        """
+        huella = re.sub(r'%s(?:, %s)+', '%s, ...', sql)
+        return re.sub(r'(\([^()]*\))(?:, \1)+', r'\1, ...', huella)
+
+    @classmethod
+    def abreviar(cls, sql):
+        """SQL para mostrar: si es largo, la lista de columnas del SELECT se reemplaza por ..."""
+        if len(sql) > cls.MAX_CARACTERES:
+            sql = re.sub(r'^SELECT (DISTINCT )?.+? FROM ', r'SELECT \1... FROM ', sql, count=1, flags=re.DOTALL)
+        return sql[:cls.MAX_CARACTERES]
+
+    @classmethod
+    def registrar(cls, ruta, medicion, duplicadas):
+        ruta = ruta or cls.SIN_RUTA
+        milisegundos = medicion.segundos * 1000
+        with cls._lock:
+            datos = cls._rutas.get(ruta)
+            if datos is None:
+                datos = cls._rutas[ruta] = {
+                    'requests': 0, 'consultas': 0, 'consultas_max': 0, 'sql_ms': 0.0, 'sql_ms_max': 0.0,
+                    'mas_lenta_ms': 0.0, 'mas_lenta': None, 'requests_con_duplicadas': 0, 'duplicadas': {},
+                }
+            datos['requests'] += 1
+            datos['consultas'] += medicion.consultas
+            datos['consultas_max'] = max(datos['consultas_max'], medicion.consultas)
+            datos['sql_ms'] += milisegundos
+            datos['sql_ms_max'] = max(datos['sql_ms_max'], milisegundos)
+            if medicion.mas_lenta_segundos * 1000 > datos['mas_lenta_ms']:
+                datos['mas_lenta_ms'] = medicion.mas_lenta_segundos * 1000
+                datos['mas_lenta'] = medicion.mas_lenta
+            if duplicadas:
+                datos['requests_con_duplicadas'] += 1
+                acumuladas = datos['duplicadas']
+                for huella, veces in duplicadas.items():
+                    if huella in acumuladas or len(acumuladas) < cls.MAX_HUELLAS:
+                        acumuladas[huella] = acumuladas.get(huella, 0) + veces
+
+    @classmethod
+    def estadisticas(cls, max_duplicadas=10):
+        """Resumen por ruta, de la que más tiempo de SQL acumula a la que menos"""
+        with cls._lock:
+            rutas = {ruta: {**datos, 'duplicadas': dict(datos['duplicadas'])} for ruta, datos in cls._rutas.items()}
+
+        resultado = {}
+        for ruta, datos in sorted(rutas.items(), key=lambda item: -item[1]['sql_ms']):
+            requests = datos['requests']
+            duplicadas = sorted(datos['duplicadas'].items(), key=lambda item: -item[1])[:max_duplicadas]
+            resultado[ruta] = {
+                'requests': requests,
+                'consultas_promedio': round(datos['consultas'] / requests, 2),
+                'consultas_max': datos['consultas_max'],
+                'sql_ms_promedio': round(datos['sql_ms'] / requests, 3),
+                'sql_ms_max': round(datos['sql_ms_max'], 3),
+                'sql_ms_total': round(datos['sql_ms'], 3),
+                'mas_lenta': None if datos['mas_lenta'] is None else {
+                    'ms': round(datos['mas_lenta_ms'], 3),
+                    'sql': cls.abreviar(datos['mas_lenta']),
+                },
+                'requests_con_duplicadas': datos['requests_con_duplicadas'],
+                'duplicadas': [
+                    {'sql': cls.abreviar(huella), 'veces': veces} for huella, veces in duplicadas
+                ],
+            }
+        return resultado
+
+    @classmethod
+    def reiniciar(cls):
+        with cls._lock:
+            cls._rutas = {}
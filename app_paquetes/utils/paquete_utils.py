@@ -1,35 +1,129 @@
+import bisect
+import time
+
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, F, FilteredRelation, Max, Min, Q, Value, When
+
 
 class PaqueteUtils:
     """Utilidades para la lógica de paquetes"""
-    
+
+    LIMITES = {
+        'peso_pequeno_max': 1000,
+        'peso_mediano_max': 3000,
+        'peso_planilla_max': 25000
+    }
+
+    # umbrales ordenados: un peso menor al umbral i corresponde a TIPOS[i], el resto al último tipo
+    UMBRALES_TIPO = (LIMITES['peso_pequeno_max'], LIMITES['peso_mediano_max'])
+    TIPOS = ('P', 'M', 'G')
+
     @staticmethod
     def obtener_limites():
         """Obtiene los límites actuales de configuración"""
-        return {
-            'peso_pequeno_max': 1000,
-            'peso_mediano_max': 3000,
-            'peso_planilla_max': 25000
-        }
-    
+        return PaqueteUtils.LIMITES
+
     @staticmethod
     def determinar_tipo_paquete(peso):
         """Determina el tipo de paquete según los límites actuales"""
-        limites = PaqueteUtils.obtener_limites()
-        
-        if peso < limites['peso_pequeno_max']:
-            return 'P'
-        elif peso < limites['peso_mediano_max']:
-            return 'M'
-        elif peso < limites['peso_planilla_max']:
-            return 'E'
-        else:
-            return 'G'
-    
+        return PaqueteUtils.TIPOS[bisect.bisect_right(PaqueteUtils.UMBRALES_TIPO, peso)]
+
+    @staticmethod
+    def determinar_tipos(pesos):
+        """Determina el tipo de un lote de paquetes a partir de sus pesos"""
+        umbrales = PaqueteUtils.UMBRALES_TIPO
+        tipos = PaqueteUtils.TIPOS
+        return [tipos[bisect.bisect_right(umbrales, peso)] for peso in pesos]
+
+    @staticmethod
+    def expresion_tipo():
+        """Expresión SQL (CASE) equivalente a determinar_tipo_paquete"""
+        return Case(
+            *[
+                When(peso__lt=umbral, then=Value(tipo))
+                for umbral, tipo in zip(PaqueteUtils.UMBRALES_TIPO, PaqueteUtils.TIPOS)
+            ],
+            default=Value(PaqueteUtils.TIPOS[-1])
+        )
+
+    @staticmethod
+    def reclasificar_tipos(chunk_size=None, pausa=0):
+        """
+        Recalcula el tipo de todos los paquetes en la base con un UPDATE ... CASE por
+        rango de ids, cada uno en su propia transacción para no retener el lock de
+        escritura de SQLite. Solo se escriben las filas cuyo tipo cambia.
+        Devuelve la cantidad de paquetes reclasificados
+        """
+        from ..models import ContadorPaquetes, Paquete, Planilla, VersionTabla
+
+        chunk_size = chunk_size or settings.PAQUETES_RECLASIFICAR_CHUNK_SIZE
+        rango = Paquete.objects.aggregate(desde=Min('id'), hasta=Max('id'))
+        if rango['desde'] is None:
+            return 0
+
+        expresion = PaqueteUtils.expresion_tipo()
+        actualizados = 0
+        for inicio in range(rango['desde'], rango['hasta'] + 1, chunk_size):
+            with transaction.atomic():
+                paquetes = Paquete.objects.filter(
+                    id__gte=inicio, id__lt=inicio + chunk_size
+                ).exclude(tipo=expresion)
+                # movimientos de los contadores: (cliente, estado, tipo actual, tipo nuevo)
+                cambios = list(paquetes.order_by().values_list('cliente_id', 'estado', 'tipo').annotate(
+                    nuevo=expresion, cantidad=Count('id')
+                ))
+                actualizados += paquetes.update(tipo=expresion)
+                deltas = {}
+                for cliente_id, estado, tipo, nuevo, cantidad in cambios:
+                    deltas[(cliente_id, estado, tipo)] = deltas.get((cliente_id, estado, tipo), 0) - cantidad
+                    deltas[(cliente_id, estado, nuevo)] = deltas.get((cliente_id, estado, nuevo), 0) + cantidad
+                ContadorPaquetes.aplicar(deltas)
+            if pausa:
+                time.sleep(pausa)
+
+        if actualizados:
+            # el tipo aparece en los resúmenes de planilla
+            Planilla.objects.update(version=F('version') + 1)
+            VersionTabla.incrementar(VersionTabla.PAQUETE, VersionTabla.PLANILLA)
+        return actualizados
+
+    @staticmethod
+    def consultar_trackings(trackings, chunk_size=None):
+        """
+        Estado, tipo y planilla vigente de cada tracking, resueltos contra el índice
+        único de tracking en consultas IN por lotes (una por lote, con el item activo
+        unido por FilteredRelation). Devuelve un dict tracking -> datos; los trackings
+        que no existen no aparecen
+        """
+        from ..models import Paquete
+
+        chunk_size = chunk_size or settings.PAQUETES_LOOKUP_CHUNK_SIZE
+        resultado = {}
+        for inicio in range(0, len(trackings), chunk_size):
+            filas = Paquete.objects.filter(
+                tracking__in=trackings[inicio:inicio + chunk_size]
+            ).annotate(
+                item_activo=FilteredRelation('items', condition=Q(items__activo=True))
+            ).order_by().values_list(
+                'tracking', 'estado', 'tipo',
+                'item_activo__planilla_id', 'item_activo__planilla__numero_planilla'
+            )
+            for tracking, estado, tipo, planilla_id, numero_planilla in filas:
+                resultado[tracking] = {
+                    'tracking': tracking,
+                    'estado': estado,
+                    'tipo': tipo,
+                    'planilla': None if planilla_id is None else {
+                        'id': planilla_id,
+                        'numero_planilla': numero_planilla,
+                    },
+                }
+        return resultado
+
     @staticmethod
     def verificar_limite_planilla(planilla, peso_a_agregar):
         """Verifica si se excedería el límite de peso de la planilla"""
         limites = PaqueteUtils.obtener_limites()
         peso_actual = planilla.get_peso_total()
         return (peso_actual + peso_a_agregar) <= limites['peso_planilla_max'] #Una planilla no puede contener más de 25.000 gramos
-
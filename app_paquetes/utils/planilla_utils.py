@@ -0,0 +1,155 @@
+import bisect
+import math
+import uuid
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from ..models import Item, Paquete, Planilla, VersionTabla
+from .paquete_utils import PaqueteUtils
+
+# margen para comparar sumas de pesos en punto flotante
+TOLERANCIA_PESO = 1e-6
+
+
+class PlanillaUtils:
+    """Utilidades para el armado automático de planillas"""
+
+    ESTRATEGIAS = ('ffd', 'bfd')
+
+    @staticmethod
+    def empaquetar(pesos, capacidad, estrategia='bfd'):
+        """
+        Reparte los pesos en la menor cantidad posible de planillas de la capacidad dada.
+        Ambas estrategias ordenan los pesos de mayor a menor:
+          - ffd (first-fit decreasing): cada peso va a la primera planilla donde entra
+          - bfd (best-fit decreasing): cada peso va a la planilla donde queda menos espacio libre
+        Devuelve una lista de planillas, cada una como lista de indices sobre `pesos`
+        """
+        if estrategia not in PlanillaUtils.ESTRATEGIAS:
+            raise ValueError(f"Estrategia desconocida: {estrategia}")
+        if any(peso > capacidad + TOLERANCIA_PESO for peso in pesos):
+            raise ValueError("Hay pesos que superan la capacidad de una planilla")
+
+        orden = sorted(range(len(pesos)), key=lambda i: pesos[i], reverse=True)
+        if estrategia == 'ffd':
+            return PlanillaUtils._first_fit_decreasing(orden, pesos, capacidad)
+        return PlanillaUtils._best_fit_decreasing(orden, pesos, capacidad)
+
+    @staticmethod
+    def _first_fit_decreasing(orden, pesos, capacidad):
+        """
+        First-fit en O(n log n): un árbol de segmentos guarda la capacidad libre máxima
+        de cada rango de planillas y se desciende hacia la primera donde entra el peso.
+        Las hojas todavía no usadas representan planillas vacías
+        """
+        tamano = 1
+        while tamano < max(len(orden), 1):
+            tamano *= 2
+        arbol = [float(capacidad)] * (2 * tamano)
+
+        planillas = []
+        for indice in orden:
+            peso = pesos[indice] - TOLERANCIA_PESO
+            nodo = 1
+            while nodo < tamano:
+                nodo = 2 * nodo if arbol[2 * nodo] >= peso else 2 * nodo + 1
+
+            posicion = nodo - tamano
+            if posicion == len(planillas):
+                planillas.append([])
+            planillas[posicion].append(indice)
+
+            arbol[nodo] -= pesos[indice]
+            nodo //= 2
+            while nodo:
+                arbol[nodo] = max(arbol[2 * nodo], arbol[2 * nodo + 1])
+                nodo //= 2
+        return planillas
+
+    @staticmethod
+    def _best_fit_decreasing(orden, pesos, capacidad):
+        """
+        Best-fit con una lista ordenada de (capacidad libre, planilla):
+        bisect encuentra la planilla con menor espacio libre suficiente
+        """
+        libres = []
+        planillas = []
+        for indice in orden:
+            peso = pesos[indice]
+            i = bisect.bisect_left(libres, (peso - TOLERANCIA_PESO, -1))
+            if i < len(libres):
+                libre, posicion = libres.pop(i)
+            else:
+                libre, posicion = capacidad, len(planillas)
+                planillas.append([])
+            planillas[posicion].append(indice)
+            bisect.insort(libres, (libre - peso, posicion))
+        return planillas
+
+    @staticmethod
+    def metricas(pesos, planillas, capacidad):
+        """Métricas del empaquetado: ratio de llenado y distancia a la cota inferior"""
+        peso_total = sum(pesos)
+        cota_inferior = math.ceil(peso_total / capacidad - TOLERANCIA_PESO) if pesos else 0
+        return {
+            'paquetes': len(pesos),
+            'planillas': len(planillas),
+            'cota_inferior': cota_inferior,
+            'peso_total': peso_total,
+            'fill_ratio': round(peso_total / (len(planillas) * capacidad), 4) if planillas else 0,
+        }
+
+    @staticmethod
+    def paquetes_disponibles(cliente=None, tipo=None):
+        """Paquetes en depósito que todavía no pertenecen a ninguna planilla activa"""
+        queryset = Paquete.objects.filter(estado=Paquete.EstadoPaquete.EN_DEPOSITO).filter(
+            ~Exists(Item.objects.filter(paquete=OuterRef('pk'), activo=True))
+        )
+        if cliente is not None:
+            queryset = queryset.filter(cliente_id=cliente)
+        if tipo is not None:
+            queryset = queryset.filter(tipo=tipo)
+        return queryset
+
+    @staticmethod
+    def armar_planillas(cliente=None, tipo=None, estrategia='bfd', dry_run=False):
+        """
+        Empaqueta los paquetes disponibles en planillas nuevas y las crea en bloque junto
+        con sus items. Con dry_run solo calcula el reparto. Devuelve las métricas y los
+        números de planilla creados
+        """
+        capacidad = PaqueteUtils.obtener_limites()['peso_planilla_max']
+        with transaction.atomic():
+            disponibles = list(
+                PlanillaUtils.paquetes_disponibles(cliente, tipo).order_by('id').values_list('id', 'peso')
+            )
+            pesos = [peso for _, peso in disponibles]
+            reparto = PlanillaUtils.empaquetar(pesos, capacidad, estrategia)
+            resultado = PlanillaUtils.metricas(pesos, reparto, capacidad)
+            resultado['estrategia'] = estrategia
+            resultado['planillas_creadas'] = []
+            if dry_run or not reparto:
+                return resultado
+
+            prefijo = f"AUTO-{timezone.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:6]}"
+            planillas = Planilla.objects.bulk_create([
+                Planilla(
+                    numero_planilla=f"{prefijo}-{numero:05d}",
+                    peso_total=sum(pesos[i] for i in indices),
+                    item_count=len(indices),
+                )
+                for numero, indices in enumerate(reparto, start=1)
+            ])
+            Item.objects.bulk_create(
+                [
+                    Item(planilla=planilla, paquete_id=disponibles[i][0], posicion=posicion)
+                    for planilla, indices in zip(planillas, reparto)
+                    for posicion, i in enumerate(indices, start=1)
+                ],
+                batch_size=2000,
+            )
+            VersionTabla.incrementar(VersionTabla.PLANILLA, VersionTabla.ITEM)
+            resultado['planillas_creadas'] = [planilla.numero_planilla for planilla in planillas]
+            return resultado
@@ -0,0 +1,120 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Sum
+
+from ..models import (
+    RegistroCambio, ResumenDiarioCliente, ResumenDiarioMotivo, ResumenDiarioMotivoCompuesto, VersionTabla,
+)
+
+
+class ReporteUtils:
+    """
+    Resúmenes diarios para los reportes, calculados a partir de RegistroCambio.
+
+    El procesamiento es incremental: VersionTabla.REPORTES guarda el último id del
+    registro ya volcado y cada lote suma solo los eventos posteriores, en la misma
+    transacción que avanza ese id. Como SQLite serializa las transacciones de
+    escritura, los ids del registro se confirman en orden y ninguno queda atrás
+    """
+
+    @staticmethod
+    def procesado_hasta():
+        return VersionTabla.obtener(VersionTabla.REPORTES)
+
+    @staticmethod
+    def procesar_registro(lote=None):
+        """Vuelca los eventos pendientes en lotes. Devuelve la cantidad de eventos procesados"""
+        lote = lote or settings.PAQUETES_REPORTES_LOTE
+        procesados = 0
+        while True:
+            with transaction.atomic():
+                desde = ReporteUtils.procesado_hasta()
+                pendientes = RegistroCambio.objects.filter(id__gt=desde)
+                hasta = next(iter(pendientes.order_by('id').values_list('id', flat=True)[lote - 1:lote]), None)
+                if hasta is None:
+                    hasta = pendientes.aggregate(hasta=Max('id'))['hasta']
+                if hasta is None:
+                    return procesados
+
+                eventos = pendientes.filter(id__lte=hasta)
+                procesados += eventos.count()
+                ReporteUtils._acumular(eventos)
+                VersionTabla.objects.update_or_create(
+                    tabla=VersionTabla.REPORTES, defaults={'version': hasta}
+                )
+
+    @staticmethod
+    def reconstruir(desde, hasta):
+        """
+        Recalcula los resúmenes de las fechas [desde, hasta] desde el registro, con los
+        eventos ya procesados (los pendientes los suma el próximo procesar_registro).
+        Devuelve la cantidad de eventos usados
+        """
+        with transaction.atomic():
+            ResumenDiarioCliente.objects.filter(fecha__range=(desde, hasta)).delete()
+            ResumenDiarioMotivo.objects.filter(fecha__range=(desde, hasta)).delete()
+            ResumenDiarioMotivoCompuesto.objects.filter(fecha__range=(desde, hasta)).delete()
+            eventos = RegistroCambio.objects.filter(
+                fecha__range=(desde, hasta), id__lte=ReporteUtils.procesado_hasta()
+            )
+            ReporteUtils._acumular(eventos)
+            return eventos.count()
+
+    @staticmethod
+    def _acumular(eventos):
+        """Suma los eventos, agrupados en SQL por día, a los resúmenes existentes o nuevos"""
+        por_cliente = {}
+        por_motivo = {}
+        por_compuesto = {}
+        grupos = eventos.order_by().values_list(
+            'fecha', 'evento', 'cliente_id', 'motivo_fallo_id', 'motivo_fallo_compuesto_id'
+        ).annotate(cantidad=Sum('cantidad'), peso=Sum('peso'))
+        for fecha, evento, cliente_id, motivo_id, compuesto_id, cantidad, peso in grupos:
+            if evento == RegistroCambio.Evento.FALLO:
+                if compuesto_id is not None:
+                    por_compuesto[(fecha, compuesto_id)] = {'fallidos': cantidad}
+                else:
+                    por_motivo[(fecha, motivo_id)] = {'fallidos': cantidad}
+                continue
+            sumas = por_cliente.setdefault((fecha, cliente_id), {})
+            if evento == RegistroCambio.Evento.INGRESO:
+                sumas['ingresados'] = cantidad
+            else:
+                sumas['distribuidos'] = cantidad
+                sumas['peso_distribuido'] = peso
+
+        ReporteUtils._sumar(
+            ResumenDiarioCliente, 'cliente_id', por_cliente, ('ingresados', 'distribuidos', 'peso_distribuido')
+        )
+        ReporteUtils._sumar(ResumenDiarioMotivo, 'motivo_fallo_id', por_motivo, ('fallidos',))
+        ReporteUtils._sumar(
+            ResumenDiarioMotivoCompuesto, 'motivo_fallo_compuesto_id', por_compuesto, ('fallidos',)
+        )
+
+    @staticmethod
+    def _sumar(modelo, campo_clave, sumas, campos):
+        """
+        sumas es un dict {(fecha, clave): {campo: delta}}. Las filas afectadas se leen,
+        se borran y se vuelven a insertar con los totales nuevos: dos sentencias en lote,
+        mucho más baratas que bulk_update con un CASE por campo
+        """
+        if not sumas:
+            return
+        existentes = {
+            (fila.fecha, getattr(fila, campo_clave)): fila
+            for fila in modelo.objects.filter(
+                fecha__in={fecha for fecha, _ in sumas},
+                **{f'{campo_clave}__in': {clave for _, clave in sumas}}
+            )
+            if (fila.fecha, getattr(fila, campo_clave)) in sumas
+        }
+        modelo.objects.filter(pk__in=[fila.pk for fila in existentes.values()]).delete()
+
+        filas = []
+        for (fecha, clave), deltas in sumas.items():
+            fila = existentes.get((fecha, clave)) or modelo(fecha=fecha, **{campo_clave: clave})
+            for campo in campos:
+                setattr(fila, campo, getattr(fila, campo) + deltas.get(campo, 0))
+            fila.pk = None
+            filas.append(fila)
+        modelo.objects.bulk_create(filas, batch_size=500)
@@ -1,43 +1,338 @@
 from rest_framework import generics, status, viewsets, mixins
 from rest_framework.response import Response
+from rest_framework.parsers import JSONParser
+from rest_framework.exceptions import NotFound
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.filters import OrderingFilter
 from .utils.paquete_utils import PaqueteUtils
-from .models import MotivoFalloSimple, Paquete, Planilla, Item
+from .utils.planilla_utils import PlanillaUtils
+from .utils.archivo_utils import ArchivoUtils
+from .utils.cache_utils import CatalogoMotivos, ResumenPlanillaCache
+from .utils.escritura_utils import ColaEscritura
+from .utils.instrumentacion_utils import EstadisticasSQL
+from .pagination import PaqueteCursorPagination
+from .mixins import ConditionalGetMixin, LecturaMixin, ValuesListMixin
+from .filters import PaqueteFilter, PaqueteBusquedaFilter
+from .parsers import NDJSONParser, FilaInvalida
+from .models import (
+    Cliente, ContadorPaquetes, MotivoFalloSimple, MotivoFalloCompuesto, Paquete, Planilla, Item, VersionTabla,
+    RegistroCambio, ResumenDiarioCliente, ResumenDiarioMotivo, ResumenDiarioMotivoCompuesto,
+)
 from .serializers import (
-    PaqueteSerializer, PaqueteCreateSerializer, PlanillaSerializer,
-    ItemSerializer, PlanillaResumenSerializer, MotivoFalloSimpleSerializer
+    PaqueteSerializer, PaqueteCreateSerializer, PaqueteBulkCreateSerializer, PlanillaSerializer,
+    ItemSerializer, PlanillaResumenSerializer, PlanillaArmarSerializer, PlanillaBulkDistribuirSerializer,
+    MotivoFalloSimpleSerializer, MotivoFalloCompuestoSerializer
 )
-from django.db import transaction
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.http import StreamingHttpResponse
+from django.db import IntegrityError, router, transaction
+from django.db.models import Prefetch
+from datetime import timedelta
+from itertools import islice
+import csv
+import io
+import json
 
 
-class PaqueteListView(generics.ListAPIView):
+class PaqueteListView(LecturaMixin, ConditionalGetMixin, ValuesListMixin, generics.ListAPIView):
     serializer_class = PaqueteSerializer
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-    filterset_fields = ['estado', 'cliente', 'tipo']
-    search_fields = ['tracking', 'nombre_destinatario']
-    ordering_fields = ['estado', 'tracking', 'fecha']
+    # la búsqueda va después del orden: sin ?ordering ordena por relevancia
+    filter_backends = [DjangoFilterBackend, OrderingFilter, PaqueteBusquedaFilter]
+    # el mismo FilterSet que la variante async y la exportación
+    filterset_class = PaqueteFilter
+    # usados solo si no hay índice FTS5 o el término es muy corto
+    search_fields = ['tracking', 'nombre_destinatario', 'direccion_destinatario']
+    ordering_fields = ['estado', 'tracking', 'id']
     ordering = ['-tracking']
+    pagination_class = PaqueteCursorPagination
 
     def get_queryset(self):
-        queryset = Paquete.objects.select_related('cliente')
-        return queryset
+        # el serializer solo expone cliente_id, no hace falta el join con cliente
+        return Paquete.objects.all()
+
+    def get_etag_version(self, request, *args, **kwargs):
+        return VersionTabla.obtener(VersionTabla.PAQUETE)
+
+
+class PaqueteExportView(LecturaMixin, generics.GenericAPIView):
+    """
+    Exportación de paquetes en CSV o NDJSON con StreamingHttpResponse.
+    Las filas se leen en bloques con values_list().iterator(), por lo que la memoria
+    no depende del tamaño de la tabla. Admite los filtros estado, cliente y tipo
+    """
+    campos = [
+        'id', 'tracking', 'direccion_destinatario', 'telefono_destinatario',
+        'nombre_destinatario', 'peso', 'altura', 'estado', 'tipo', 'cliente_id'
+    ]
+    formatos = {
+        'csv': 'text/csv; charset=utf-8',
+        'ndjson': 'application/x-ndjson',
+    }
+    tamano_bloque = 64 * 1024
+
+    def get(self, request):
+        formato = request.query_params.get('formato', 'csv')
+        if formato not in self.formatos:
+            return Response(
+                {'error': f'Formato inválido, opciones: {", ".join(self.formatos)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        filtro = PaqueteFilter(request.query_params, queryset=Paquete.objects.all())
+        if not filtro.is_valid():
+            return Response(filtro.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        # el generador se consume después de dispatch, ya fuera de usar_lectura(): el
+        # queryset queda fijado a la conexión que eligió el router para este request
+        filas = (
+            filtro.qs.using(router.db_for_read(Paquete)).order_by('id')
+            .values_list(*self.campos)
+            .iterator(chunk_size=settings.PAQUETES_EXPORT_CHUNK_SIZE)
+        )
+        generador = self._csv(filas) if formato == 'csv' else self._ndjson(filas)
+        response = StreamingHttpResponse(generador, content_type=self.formatos[formato])
+        response['Content-Disposition'] = f'attachment; filename="paquetes.{formato}"'
+        return response
+
+    def _encabezado(self):
+        return [campo.removesuffix('_id') for campo in self.campos]
+
+    def _csv(self, filas):
+        # se emite de a bloques de ~64KB: un chunk por fila multiplica el costo de la respuesta
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(self._encabezado())
+        for fila in filas:
+            writer.writerow(fila)
+            if buffer.tell() >= self.tamano_bloque:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    def _ndjson(self, filas):
+        encabezado = self._encabezado()
+        encoder = json.JSONEncoder(ensure_ascii=False)
+        bloque = []
+        tamano = 0
+        for fila in filas:
+            linea = encoder.encode(dict(zip(encabezado, fila)))
+            bloque.append(linea)
+            tamano += len(linea)
+            if tamano >= self.tamano_bloque:
+                yield '\n'.join(bloque) + '\n'
+                bloque = []
+                tamano = 0
+        if bloque:
+            yield '\n'.join(bloque) + '\n'
 
 
-class MotivoSimpleListView(generics.ListAPIView):
-    """listar motivos de fallo"""
+class MotivoSimpleListView(ValuesListMixin, generics.ListAPIView):
+    """
+    listar motivos de fallo, desde el catálogo en memoria (serializado una vez por versión).
+    Con el modo rápido la respuesta se arma desde las instancias del catálogo sin el serializer
+    """
     serializer_class = MotivoFalloSimpleSerializer
-    queryset = MotivoFalloSimple.objects.all(),
-    
-    def get_queryset(self):
-        return MotivoFalloSimple.objects.all()
+    queryset = MotivoFalloSimple.objects.all()
+
+    def list(self, request, *args, **kwargs):
+        if self.usar_modo_rapido(request):
+            return Response(CatalogoMotivos.derivado(
+                'motivos-simples-rapido', lambda motivos: self.serializar_instancias(motivos, self.serializer_class)
+            ))
+        return Response(CatalogoMotivos.derivado(
+            'motivos-simples', lambda motivos: self.get_serializer(motivos, many=True).data
+        ))
+
+
+class MotivoCompuestoListView(LecturaMixin, generics.ListAPIView):
+    """listar motivos de fallo compuestos, con sus datos ya calculados (dos consultas en total)"""
+    serializer_class = MotivoFalloCompuestoSerializer
+    queryset = MotivoFalloCompuesto.objects.prefetch_related('clausura')
 
 
 class PaqueteCreateView(generics.CreateAPIView):
     serializer_class = PaqueteCreateSerializer
 
     def perform_create(self, serializer):
-        paquete = serializer.save()
+        paquete = ColaEscritura.ejecutar(serializer.save)
+
+
+class PaqueteBulkCreateView(generics.GenericAPIView):
+    """
+    Carga masiva de paquetes desde un array JSON o un cuerpo NDJSON.
+    Las filas se procesan en lotes de chunk_size: validación sin consultas por fila,
+    una consulta para los clientes y otra para los tracking existentes, y un bulk_create.
+    Las filas con errores se informan y no impiden la carga del resto
+    """
+    parser_classes = [JSONParser, NDJSONParser]
+    max_chunk_size = 5000
+
+    def post(self, request):
+        filas = request.data
+        if isinstance(filas, dict):
+            filas = [filas]
+        elif isinstance(filas, (str, bytes)) or not hasattr(filas, '__iter__'):
+            return Response(
+                {'error': 'Se espera un array JSON o un cuerpo NDJSON de paquetes'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        chunk_size = self._get_chunk_size(request)
+        errores = []
+        creados = 0
+        total = 0
+        trackings_vistos = set()
+
+        filas = iter(filas)
+        while True:
+            lote = list(islice(filas, chunk_size))
+            if not lote:
+                break
+            creados += self._procesar_lote(lote, total, trackings_vistos, errores)
+            total += len(lote)
+        errores.sort(key=lambda error: error['fila'])
+
+        if not errores:
+            codigo = status.HTTP_201_CREATED
+        elif creados:
+            codigo = status.HTTP_207_MULTI_STATUS
+        else:
+            codigo = status.HTTP_400_BAD_REQUEST
+        return Response({
+            'filas': total,
+            'creados': creados,
+            'con_errores': len(errores),
+            'errores': errores,
+        }, status=codigo)
+
+    def _get_chunk_size(self, request):
+        try:
+            chunk_size = int(request.query_params.get('chunk_size', settings.PAQUETES_BULK_CREATE_CHUNK_SIZE))
+        except ValueError:
+            chunk_size = settings.PAQUETES_BULK_CREATE_CHUNK_SIZE
+        return max(1, min(chunk_size, self.max_chunk_size))
+
+    def _procesar_lote(self, lote, desplazamiento, trackings_vistos, errores):
+        """Valida e inserta un lote. Devuelve la cantidad de paquetes creados"""
+        validas = []
+        for i, fila in enumerate(lote, start=desplazamiento):
+            if isinstance(fila, FilaInvalida):
+                errores.append({'fila': i, 'errores': {'non_field_errors': [fila.error]}})
+                continue
+            if not isinstance(fila, dict):
+                errores.append({'fila': i, 'errores': {'non_field_errors': ['Se espera un objeto JSON']}})
+                continue
+            serializer = PaqueteBulkCreateSerializer(data=fila)
+            if not serializer.is_valid():
+                errores.append({'fila': i, 'tracking': fila.get('tracking'), 'errores': serializer.errors})
+                continue
+            validas.append((i, serializer.validated_data))
+
+        # clientes y tracking existentes: una consulta cada uno para todo el lote
+        clientes = set(Cliente.objects.filter(
+            id__in={datos['cliente'] for _, datos in validas}
+        ).values_list('id', flat=True))
+        existentes = set(Paquete.objects.filter(
+            tracking__in=[datos['tracking'] for _, datos in validas]
+        ).values_list('tracking', flat=True))
+
+        filas_a_crear = []
+        for i, datos in validas:
+            if datos['cliente'] not in clientes:
+                errores.append({'fila': i, 'tracking': datos['tracking'], 'errores': {'cliente': ['Cliente inexistente']}})
+            elif datos['tracking'] in existentes or datos['tracking'] in trackings_vistos:
+                errores.append({'fila': i, 'tracking': datos['tracking'], 'errores': {'tracking': ['Tracking duplicado']}})
+            else:
+                trackings_vistos.add(datos['tracking'])
+                filas_a_crear.append((i, datos))
+
+        tipos = PaqueteUtils.determinar_tipos([datos['peso'] for _, datos in filas_a_crear])
+        paquetes = [
+            Paquete(
+                tracking=datos['tracking'],
+                direccion_destinatario=datos['direccion_destinatario'],
+                telefono_destinatario=datos['telefono_destinatario'],
+                nombre_destinatario=datos['nombre_destinatario'],
+                peso=datos['peso'],
+                altura=datos['altura'],
+                cliente_id=datos['cliente'],
+                tipo=tipo,
+            )
+            for (_, datos), tipo in zip(filas_a_crear, tipos)
+        ]
+        if not paquetes:
+            return 0
+
+        try:
+            with transaction.atomic():
+                Paquete.objects.bulk_create(paquetes)
+                ContadorPaquetes.registrar_altas(paquetes)
+                RegistroCambio.registrar_ingresos(paquetes)
+                VersionTabla.incrementar(VersionTabla.PAQUETE)
+            return len(paquetes)
+        except IntegrityError:
+            # otro proceso insertó alguno de los tracking entre la validación y el insert:
+            # se reintenta fila por fila para aislar las que fallan
+            creados = 0
+            for (i, datos), paquete in zip(filas_a_crear, paquetes):
+                try:
+                    with transaction.atomic():
+                        Paquete.objects.bulk_create([paquete])
+                        ContadorPaquetes.registrar_altas([paquete])
+                        RegistroCambio.registrar_ingresos([paquete])
+                        VersionTabla.incrementar(VersionTabla.PAQUETE)
+                    creados += 1
+                except IntegrityError as exc:
+                    errores.append({'fila': i, 'tracking': datos['tracking'], 'errores': {'non_field_errors': [str(exc)]}})
+            return creados
+
+
+class PaqueteLookupView(generics.GenericAPIView):
+    # consulta de estado de muchos paquetes por tracking en un solo pedido
+
+    def post(self, request):
+        trackings = request.data.get('trackings') if isinstance(request.data, dict) else request.data
+        if isinstance(trackings, str):
+            trackings = [trackings]
+        if not isinstance(trackings, list) or not all(isinstance(t, str) for t in trackings):
+            return Response(
+                {'error': 'Se requiere una lista de trackings'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # sin repetidos y en el orden recibido
+        trackings = list(dict.fromkeys(t.strip() for t in trackings if t.strip()))
+        if not trackings:
+            return Response(
+                {'error': 'Se requiere una lista de trackings'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        maximo = settings.PAQUETES_LOOKUP_MAX_TRACKINGS
+        if len(trackings) > maximo:
+            return Response(
+                {'error': f'Se admiten hasta {maximo} trackings por pedido'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        encontrados = self.consultar(trackings)
+        return Response({
+            'paquetes': [encontrados[t] for t in trackings if t in encontrados],
+            'desconocidos': [t for t in trackings if t not in encontrados],
+        }, status=status.HTTP_200_OK)
+
+    def consultar(self, trackings):
+        return PaqueteUtils.consultar_trackings(trackings)
+
+
+class PaqueteArchivoLookupView(PaqueteLookupView):
+    # misma consulta sobre los paquetes archivados (solo lee la base de archivo)
+
+    def consultar(self, trackings):
+        return ArchivoUtils.consultar_trackings(trackings)
 
 
 class PaqueteAssignPlanillaView(generics.UpdateAPIView):
@@ -61,6 +356,13 @@ class PaqueteAssignPlanillaView(generics.UpdateAPIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        # Un paquete solo puede estar en una planilla activa
+        if Item.objects.filter(paquete=paquete, activo=True).exists():
+            return Response(
+                {'error': 'Este paquete está en otra planilla activa'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
         try:
             planilla = Planilla.objects.get(id=planilla_id)
             
@@ -71,12 +373,12 @@ class PaqueteAssignPlanillaView(generics.UpdateAPIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Crea el ítem de planilla en la ultima posicion
-            Item.objects.create(
-                planilla=planilla,
-                paquete=paquete,
-                posicion=planilla.items.count() + 1
-            )
+            # Crea el ítem de planilla en la ultima posicion, reservando el peso de forma atómica
+            if ColaEscritura.ejecutar(planilla.agregar_paquetes, [paquete]) is None:
+                return Response(
+                    {'error': 'La planilla excedería el límite de peso total'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
             
             return Response(
                 {'message': f'Paquete {paquete.tracking} asignado a planilla {planilla.numero_planilla}'},
@@ -88,12 +390,183 @@ class PaqueteAssignPlanillaView(generics.UpdateAPIView):
                 {'error': 'Planilla no encontrada'},
                 status=status.HTTP_404_NOT_FOUND
             )
+        except IntegrityError:
+            return Response(
+                {'error': 'Este paquete está en otra planilla activa'},
+                status=status.HTTP_409_CONFLICT
+            )
 
 
-class PlanillaDetailView(generics.RetrieveAPIView):
-    queryset = Planilla.objects.prefetch_related('items', 'items__paquete')
+class PlanillaDetailView(LecturaMixin, ConditionalGetMixin, generics.RetrieveAPIView):
+    queryset = Planilla.objects.prefetch_related(
+        Prefetch('items', queryset=Item.objects.select_related('paquete'))
+    )
     serializer_class = PlanillaResumenSerializer
 
+    def get_etag_version(self, request, *args, **kwargs):
+        return Planilla.objects.filter(pk=kwargs['pk']).values_list('version', flat=True).first()
+
+    def retrieve(self, request, *args, **kwargs):
+        # la versión es una lectura por pk (ya hecha para el ETag); el resumen solo se arma si no está en cache
+        version = self.etag_version
+        if version is None:
+            raise NotFound('Planilla no encontrada')
+
+        resumen = ResumenPlanillaCache.obtener(
+            kwargs['pk'], version,
+            lambda: dict(self.get_serializer(self.get_object()).data)
+        )
+        return Response(resumen)
+
+
+class CacheStatsView(generics.GenericAPIView):
+    """Contadores de hits/misses del cache de resúmenes de planilla"""
+
+    def get(self, request):
+        return Response({
+            'resumen_planilla': ResumenPlanillaCache.estadisticas(),
+            'catalogo_motivos': CatalogoMotivos.estadisticas(),
+        })
+
+
+class SQLStatsView(generics.GenericAPIView):
+    """
+    SQL por nombre de URL acumulado por InstrumentacionSQLMiddleware en este proceso:
+    consultas y tiempo por request, la sentencia más lenta y las repetidas (N+1).
+    DELETE reinicia los contadores (solo staff, o cualquiera con DEBUG)
+    """
+
+    def get(self, request):
+        return Response(EstadisticasSQL.estadisticas())
+
+    def delete(self, request):
+        # reiniciar borra lo acumulado por todos los clientes del proceso
+        if not (settings.DEBUG or request.user.is_staff):
+            return Response(
+                {'error': 'Solo el personal puede reiniciar las estadísticas'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        EstadisticasSQL.reiniciar()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ReporteView(LecturaMixin, generics.GenericAPIView):
+    """
+    Base de los reportes: leen solo los resúmenes diarios, nunca las tablas de paquetes
+    o items. Rango con ?desde= y ?hasta= (AAAA-MM-DD), por defecto los últimos 30 días
+    """
+    dias_por_defecto = 30
+
+    def obtener_rango(self, request):
+        """Devuelve (desde, hasta) o lanza ValueError con el mensaje de error"""
+        hasta = request.query_params.get('hasta')
+        desde = request.query_params.get('desde')
+        hasta = parse_date(hasta) if hasta else timezone.localdate()
+        desde = parse_date(desde) if desde else hasta - timedelta(days=self.dias_por_defecto - 1)
+        if desde is None or hasta is None:
+            raise ValueError('desde y hasta deben tener formato AAAA-MM-DD')
+        if desde > hasta:
+            raise ValueError('desde no puede ser posterior a hasta')
+        if (hasta - desde).days >= settings.PAQUETES_REPORTES_MAX_DIAS:
+            raise ValueError(f'El rango no puede superar {settings.PAQUETES_REPORTES_MAX_DIAS} días')
+        return desde, hasta
+
+    def get(self, request):
+        try:
+            desde, hasta = self.obtener_rango(request)
+            filas = self.obtener_filas(request, desde, hasta)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'desde': desde,
+            'hasta': hasta,
+            'totales': {campo: sum(fila[campo] for fila in filas) for campo in self.campos_totales},
+            'dias': filas,
+        })
+
+
+class ReporteClientesView(ReporteView):
+    """Paquetes ingresados, distribuidos y peso distribuido por cliente y día (?cliente=)"""
+    campos_totales = ('ingresados', 'distribuidos', 'peso_distribuido')
+
+    def obtener_filas(self, request, desde, hasta):
+        queryset = ResumenDiarioCliente.objects.filter(fecha__range=(desde, hasta))
+        cliente = request.query_params.get('cliente')
+        if cliente:
+            try:
+                queryset = queryset.filter(cliente_id=int(cliente))
+            except ValueError:
+                raise ValueError('cliente debe ser un id')
+        return list(queryset.order_by('fecha', 'cliente_id').values(
+            'fecha', 'cliente', 'ingresados', 'distribuidos', 'peso_distribuido'
+        ))
+
+
+class ReporteMotivosView(ReporteView):
+    """
+    Ítems fallidos por motivo y día: una fila por motivo simple o compuesto (el otro
+    campo en null). ?motivo= y ?motivo_compuesto= dejan solo las filas de ese motivo
+    """
+    campos_totales = ('fallidos',)
+
+    def obtener_filas(self, request, desde, hasta):
+        simples = ResumenDiarioMotivo.objects.filter(fecha__range=(desde, hasta))
+        compuestos = ResumenDiarioMotivoCompuesto.objects.filter(fecha__range=(desde, hasta))
+        motivo = request.query_params.get('motivo')
+        motivo_compuesto = request.query_params.get('motivo_compuesto')
+        if motivo:
+            try:
+                simples = simples.filter(motivo_fallo_id=int(motivo))
+            except ValueError:
+                raise ValueError('motivo debe ser un id')
+            if not motivo_compuesto:
+                compuestos = compuestos.none()
+        if motivo_compuesto:
+            try:
+                compuestos = compuestos.filter(motivo_fallo_compuesto_id=int(motivo_compuesto))
+            except ValueError:
+                raise ValueError('motivo_compuesto debe ser un id')
+            if not motivo:
+                simples = simples.none()
+
+        filas = [
+            {'fecha': fecha, 'motivo_fallo': motivo_id, 'motivo_fallo_compuesto': None, 'fallidos': fallidos}
+            for fecha, motivo_id, fallidos in simples.values_list('fecha', 'motivo_fallo_id', 'fallidos')
+        ] + [
+            {'fecha': fecha, 'motivo_fallo': None, 'motivo_fallo_compuesto': compuesto_id, 'fallidos': fallidos}
+            for fecha, compuesto_id, fallidos in compuestos.values_list('fecha', 'motivo_fallo_compuesto_id', 'fallidos')
+        ]
+        # por día, primero los motivos simples
+        filas.sort(key=lambda fila: (
+            fila['fecha'], fila['motivo_fallo'] is None, fila['motivo_fallo'] or fila['motivo_fallo_compuesto']
+        ))
+        return filas
+
+
+class ContadoresStatsView(generics.GenericAPIView):
+    """
+    Cantidad de paquetes por cliente, estado y tipo leída de los contadores mantenidos,
+    sin recorrer la tabla de paquetes. Filtrable por ?cliente=, ?estado= y ?tipo=
+    """
+
+    def get(self, request):
+        queryset = ContadorPaquetes.objects.filter(cantidad__gt=0)
+        try:
+            for campo in ('cliente', 'estado', 'tipo'):
+                valor = request.query_params.get(campo)
+                if valor:
+                    queryset = queryset.filter(**{campo: valor})
+        except ValueError:
+            return Response({'error': 'cliente debe ser un id'}, status=status.HTTP_400_BAD_REQUEST)
+
+        grupos = list(queryset.order_by('cliente_id', 'estado', 'tipo').values(
+            'cliente', 'estado', 'tipo', 'cantidad'
+        ))
+        return Response({
+            'total': sum(grupo['cantidad'] for grupo in grupos),
+            'grupos': grupos,
+        })
+
 
 class PlanillaDistribuirView(generics.UpdateAPIView):
     queryset = Planilla.objects.all()
@@ -103,7 +576,7 @@ class PlanillaDistribuirView(generics.UpdateAPIView):
         planilla = self.get_object()
         
         # Marcar todos los paquetes como "en distribución"
-        updated_count = planilla.marcar_paquetes_en_distribucion()
+        updated_count = ColaEscritura.ejecutar(planilla.marcar_paquetes_en_distribucion)
         
         return Response({
             'message': f'Se actualizaron {updated_count} paquetes a estado "en distribución"',
@@ -111,6 +584,51 @@ class PlanillaDistribuirView(generics.UpdateAPIView):
         }, status=status.HTTP_200_OK)
 
 
+class PlanillaBulkDistribuirView(generics.GenericAPIView):
+    # distribucion de varias planillas en un solo UPDATE
+
+    def post(self, request):
+        serializer = PlanillaBulkDistribuirSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        planilla_ids = list(dict.fromkeys(serializer.validated_data['planilla_ids']))
+
+        encontradas = set(Planilla.objects.filter(id__in=planilla_ids).values_list('id', flat=True))
+        no_encontradas = [pk for pk in planilla_ids if pk not in encontradas]
+        if no_encontradas:
+            return Response(
+                {'error': 'Planillas no encontradas', 'planillas_no_encontradas': no_encontradas},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        # igual que la distribución de una planilla, pasa por el group commit
+        updated_count = ColaEscritura.ejecutar(Planilla.distribuir_planillas, encontradas)
+
+        return Response({
+            'message': f'Se actualizaron {updated_count} paquetes a estado "en distribución"',
+            'planillas': len(encontradas),
+            'paquetes_actualizados': updated_count
+        }, status=status.HTTP_200_OK)
+
+
+class PlanillaArmarView(generics.GenericAPIView):
+    # arma planillas nuevas con los paquetes en depósito sin asignar
+
+    def post(self, request):
+        serializer = PlanillaArmarSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        parametros = serializer.validated_data
+
+        resultado = PlanillaUtils.armar_planillas(
+            cliente=parametros.get('cliente'),
+            tipo=parametros.get('tipo'),
+            estrategia=parametros['estrategia'],
+            dry_run=parametros['dry_run'],
+        )
+        return Response(resultado, status=status.HTTP_200_OK if parametros['dry_run'] else status.HTTP_201_CREATED)
+
+
 class ItemAssignMotivoFalloView(generics.UpdateAPIView):
     queryset = Item.objects.all()
     serializer_class = ItemSerializer
@@ -119,7 +637,6 @@ class ItemAssignMotivoFalloView(generics.UpdateAPIView):
         item = self.get_object()
         
         motivo_fallo_id = request.data.get('motivo_fallo_id')
-        print(motivo_fallo_id)
         
         if not motivo_fallo_id:
             return Response(
@@ -128,90 +645,254 @@ class ItemAssignMotivoFalloView(generics.UpdateAPIView):
             )
         
         try:
-            from .models import MotivoFalloSimple
-            motivo_fallo = MotivoFalloSimple.objects.get(id=motivo_fallo_id)
+            # catálogo en memoria con la versión verificada: sin consulta del motivo
+            motivo_fallo = CatalogoMotivos.obtener_simple(motivo_fallo_id)
+            if motivo_fallo is None:
+                raise MotivoFalloSimple.DoesNotExist
+            if not motivo_fallo.is_active():
+                return Response(
+                    {'error': 'No se puede usar un motivo de fallo inactive.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
             
+            # un ítem tiene un solo motivo: asignar el simple borra el compuesto (ver Item.clean)
             item.motivo_fallo = motivo_fallo
-            item.save()
+            item.motivo_fallo_compuesto = None
+            ColaEscritura.ejecutar(item.save)
             
             return Response({
                 'message': f'Motivo de fallo asignado correctamente al ítem {item.id}',
                 'motivo_fallo': motivo_fallo.get_nombre()
             }, status=status.HTTP_200_OK)
             
-        except:
+        except MotivoFalloSimple.DoesNotExist:
             return Response(
                 {'error': 'Motivo de fallo no encontrado'},
                 status=status.HTTP_404_NOT_FOUND
             )
 
+
+class ItemBulkAssignMotivoView(generics.GenericAPIView):
+    """
+    Asignación de motivos de fallo a muchos items (por ejemplo el cierre de un recorrido).
+    Recibe pares {item_id, motivo_fallo_id} o {item_id, motivo_fallo_compuesto_id}.
+    Los motivos se validan contra el catálogo en memoria (una consulta de versión), los
+    items se leen en una consulta dentro de la misma transacción que los actualiza, con un
+    UPDATE por motivo distinto. Los pares inválidos se informan por índice y no frenan al resto
+    """
+
+    def post(self, request):
+        asignaciones = request.data.get('asignaciones') if isinstance(request.data, dict) else request.data
+        if not isinstance(asignaciones, list) or not asignaciones:
+            return Response(
+                {'error': 'Se requiere una lista de asignaciones {item_id, motivo_fallo_id}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        maximo = settings.PAQUETES_BULK_MOTIVO_MAX
+        if len(asignaciones) > maximo:
+            return Response(
+                {'error': f'Se admiten hasta {maximo} asignaciones por pedido'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        errores = []
+        validas = self._validar(asignaciones, errores)
+
+        cambios = []
+        with transaction.atomic():
+            # los motivos vigentes se leen dentro de la transacción de escritura, que toma el
+            # lock al empezar: dos asignaciones concurrentes sobre los mismos ítems no pueden
+            # calcular los fallos desde el mismo estado anterior
+            items = Item.objects.only(
+                'id', 'planilla_id', 'motivo_fallo_id', 'motivo_fallo_compuesto_id'
+            ).in_bulk([item_id for _, item_id, _ in validas])
+            for indice, item_id, motivo in validas:
+                if item_id not in items:
+                    errores.append({'indice': indice, 'item_id': item_id, 'error': 'Ítem no encontrado'})
+                else:
+                    cambios.append((items[item_id], motivo))
+            if cambios:
+                self._aplicar(cambios)
+
+        errores.sort(key=lambda error: error['indice'])
+        if not errores:
+            codigo = status.HTTP_200_OK
+        elif cambios:
+            codigo = status.HTTP_207_MULTI_STATUS
+        else:
+            codigo = status.HTTP_400_BAD_REQUEST
+        return Response({
+            'asignaciones': len(asignaciones),
+            'asignados': len(cambios),
+            'con_errores': len(errores),
+            'errores': errores,
+        }, status=codigo)
+
+    def _validar(self, asignaciones, errores):
+        """Devuelve [(indice, item_id, (campo, motivo_id))] y agrega los errores de forma y de motivo"""
+        simples, compuestos = CatalogoMotivos.obtener_lote(
+            [asignacion.get('motivo_fallo_id') for asignacion in asignaciones if isinstance(asignacion, dict)],
+            [asignacion.get('motivo_fallo_compuesto_id') for asignacion in asignaciones if isinstance(asignacion, dict)],
+        )
+        validas = []
+        vistos = set()
+        for indice, asignacion in enumerate(asignaciones):
+            if not isinstance(asignacion, dict):
+                errores.append({'indice': indice, 'error': 'Se espera un objeto {item_id, motivo_fallo_id}'})
+                continue
+            try:
+                item_id = int(asignacion.get('item_id'))
+            except (TypeError, ValueError):
+                errores.append({'indice': indice, 'error': 'item_id debe ser un id'})
+                continue
+
+            simple_id = asignacion.get('motivo_fallo_id')
+            compuesto_id = asignacion.get('motivo_fallo_compuesto_id')
+            if (simple_id is None) == (compuesto_id is None):
+                error = 'Se requiere motivo_fallo_id o motivo_fallo_compuesto_id (uno solo)'
+            elif item_id in vistos:
+                error = 'Ítem repetido en el pedido'
+            else:
+                if simple_id is not None:
+                    motivo = simples.get(CatalogoMotivos.clave(simple_id))
+                else:
+                    motivo = compuestos.get(CatalogoMotivos.clave(compuesto_id))
+                error = self._error_motivo(motivo)
+            if error:
+                errores.append({'indice': indice, 'item_id': item_id, 'error': error})
+                continue
+
+            vistos.add(item_id)
+            campo = 'motivo_fallo_id' if simple_id is not None else 'motivo_fallo_compuesto_id'
+            validas.append((indice, item_id, (campo, motivo.id)))
+        return validas
+
+    @staticmethod
+    def _error_motivo(motivo):
+        if motivo is None:
+            return 'Motivo de fallo no encontrado'
+        if not motivo.is_active():
+            return 'No se puede usar un motivo de fallo inactive.'
+        return None
+
+    @staticmethod
+    def _aplicar(cambios):
+        """Un UPDATE por motivo, registro de fallos y versiones de las planillas afectadas"""
+        por_motivo = {}
+        simples, compuestos = {}, {}
+        for item, (campo, motivo_id) in cambios:
+            por_motivo.setdefault((campo, motivo_id), []).append(item.id)
+            # mismo criterio que Item.save: el motivo nuevo suma un fallo y el anterior se descuenta
+            anteriores = (item.motivo_fallo_id, item.motivo_fallo_compuesto_id)
+            motivos = (motivo_id, None) if campo == 'motivo_fallo_id' else (None, motivo_id)
+            if motivos != anteriores:
+                Item.sumar_fallo(simples, compuestos, anteriores, -1)
+                Item.sumar_fallo(simples, compuestos, motivos, 1)
+
+        for (campo, motivo_id), item_ids in por_motivo.items():
+            # un ítem tiene un solo motivo: asignar uno borra el del otro tipo
+            otro = 'motivo_fallo_compuesto_id' if campo == 'motivo_fallo_id' else 'motivo_fallo_id'
+            Item.objects.filter(id__in=item_ids).update(**{campo: motivo_id, otro: None})
+
+        RegistroCambio.registrar_fallos(simples, compuestos)
+        VersionTabla.incrementar(VersionTabla.ITEM)
+        Planilla.incrementar_version({item.planilla_id for item, _ in cambios})
+
 class PaqueteBulkAssignPlanillaView(generics.GenericAPIView):
     # asignacion múltiple de paquetes a una planilla
-    
-    #transaccion realizada de forma unica como bloque
-    @transaction.atomic
+
     def post(self, request):
         paquete_ids = request.data.get('paquete_ids', [])
         planilla_id = request.data.get('planilla_id')
-        
-        # paquete_ids debe ser una lista
+
+        # paquete_ids debe ser una lista de ids sin repetidos
         if isinstance(paquete_ids, int):
             paquete_ids = [paquete_ids]
         elif not isinstance(paquete_ids, list):
             paquete_ids = list(paquete_ids) if paquete_ids else []
-        
+        try:
+            paquete_ids = list(dict.fromkeys(int(pk) for pk in paquete_ids))
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'paquete_ids debe ser una lista de ids'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
         if not paquete_ids or not planilla_id:
             return Response(
                 {'error': 'Se requieren paquete_ids y planilla_id'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        
+
         try:
-            planilla = Planilla.objects.get(id=planilla_id)
-            paquetes = Paquete.objects.filter(id__in=paquete_ids)
-            
-            nuevo_peso_total = sum(paquete.peso for paquete in paquetes)
-            
-            # todos los paquetes deben estar en estado "en depósito"
-            invalid_paquetes = paquetes.exclude(estado=Paquete.EstadoPaquete.EN_DEPOSITO)
-            if invalid_paquetes.exists():
-                return Response(
-                    {'error': 'Solo se pueden asignar paquetes en estado "en depósito"'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            # el límite de peso debe ser menor al peso limite
-            if not planilla.verificar_limite_peso(nuevo_peso_total):
-                return Response(
-                    {'error': 'La planilla excedería el límite de peso total'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            # Assign paquetes a la planilla
-            posicion_inicial = planilla.items.count() + 1
-            items_creados = []
-            
-            for i, paquete in enumerate(paquetes):
-                item = Item.objects.create(
-                    planilla=planilla,
-                    paquete=paquete,
-                    posicion=posicion_inicial + i
-                )
-                items_creados.append(item)
-            
-            return Response({
-                'message': f'Se asignaron {len(items_creados)} paquetes a la planilla {planilla.numero_planilla}',
-                'items_creados': len(items_creados)
-            }, status=status.HTTP_200_OK)
-            
+            # transaccion realizada de forma unica como bloque
+            with transaction.atomic():
+                return self._asignar(planilla_id, paquete_ids)
         except Planilla.DoesNotExist:
             return Response(
                 {'error': 'Planilla no encontrada'},
                 status=status.HTTP_404_NOT_FOUND
             )
-        except Exception as e:
+        except IntegrityError:
+            # otra asignacion concurrente tomo alguno de los paquetes: misma respuesta que
+            # la validación previa
             return Response(
-                {'error': f'Error al asignar paquetes: {str(e)}'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )           
-    
+                {'error': 'Hay paquetes que ya están en una planilla activa'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except ValidationError as e:
+            return Response(
+                {'error': f'Error al asignar paquetes: {" ".join(e.messages)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+    def _asignar(self, planilla_id, paquete_ids):
+        """
+        Valida y asigna con una cantidad fija de consultas: una lectura de la planilla,
+        una de los paquetes, una de los items existentes, la reserva de peso y posiciones
+        y los INSERT de bulk_create
+        """
+        planilla = Planilla.objects.get(id=planilla_id)
+
+        # una unica lectura de los paquetes, el resto de las validaciones es en memoria
+        paquetes = {
+            paquete.id: paquete
+            for paquete in Paquete.objects.filter(id__in=paquete_ids).only('id', 'peso', 'estado')
+        }
+        no_encontrados = [pk for pk in paquete_ids if pk not in paquetes]
+        if no_encontrados:
+            return Response(
+                {'error': 'Paquetes no encontrados', 'paquetes_no_encontrados': no_encontrados},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        # todos los paquetes deben estar en estado "en depósito"
+        if any(paquete.estado != Paquete.EstadoPaquete.EN_DEPOSITO for paquete in paquetes.values()):
+            return Response(
+                {'error': 'Solo se pueden asignar paquetes en estado "en depósito"'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # un paquete solo puede estar en una planilla activa (indice unico parcial sobre Item)
+        ya_asignados = list(
+            Item.objects.filter(paquete_id__in=paquete_ids, activo=True).values_list('paquete_id', flat=True)
+        )
+        if ya_asignados:
+            return Response(
+                {'error': 'Hay paquetes que ya están en una planilla activa', 'paquetes_repetidos': ya_asignados},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # el límite de peso debe ser menor al peso limite; el peso y las posiciones
+        # se reservan en un solo UPDATE sobre los totales de la planilla
+        items_creados = planilla.agregar_paquetes([paquetes[pk] for pk in paquete_ids])
+        if items_creados is None:
+            return Response(
+                {'error': 'La planilla excedería el límite de peso total'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response({
+            'message': f'Se asignaron {len(items_creados)} paquetes a la planilla {planilla.numero_planilla}',
+            'items_creados': len(items_creados)
+        }, status=status.HTTP_200_OK)
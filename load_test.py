@@ -0,0 +1,219 @@
+# load_test.py
+"""
+Prueba de carga de los endpoints de lectura: vistas sync servidas por WSGI contra las
+variantes async (/api/async/...) servidas por ASGI, con 100 y 1000 clientes concurrentes.
+
+Por defecto levanta los dos servidores sobre la base configurada:
+  - WSGI: manage.py runserver --noreload (un thread por conexión)
+  - ASGI: uvicorn Sistema_Paquetes.asgi:application (un proceso, event loop)
+Con --wsgi-url / --asgi-url se usan servidores ya levantados (por ejemplo gunicorn).
+Los servidores escuchan en 0.0.0.0, el host que admite ALLOWED_HOSTS.
+
+El cliente es solo stdlib (asyncio): cada cliente abre una conexión keep-alive y repite
+GET en ronda sobre los endpoints durante --duracion segundos.
+
+Uso: python load_test.py [--clientes 100 1000] [--duracion 10]
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+import django
+
+# Configurar Django
+if 'DJANGO_SETTINGS_MODULE' not in os.environ:
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Sistema_Paquetes.settings')
+
+try:
+    django.setup()
+except Exception as e:
+    print(f"Error al configurar Django:\n {e}")
+    sys.exit(1)
+
+
+def endpoints(prefijo, planilla_id):
+    rutas = ['paquetes/?page_size=50', 'motivos/']
+    if planilla_id is not None:
+        rutas.append(f'planillas/{planilla_id}/')
+    return [f'/api/{prefijo}{ruta}' for ruta in rutas]
+
+
+async def leer_respuesta(reader):
+    """Lee una respuesta HTTP/1.1; devuelve (status, si la conexión sigue abierta)"""
+    linea = await reader.readline()
+    if not linea:
+        raise ConnectionError('conexión cerrada por el servidor')
+    status = int(linea.split()[1])
+    largo = None
+    mantener = True
+    chunked = False
+    while True:
+        linea = await reader.readline()
+        if linea in (b'\r\n', b'\n', b''):
+            break
+        nombre, _, valor = linea.decode('latin-1').partition(':')
+        nombre, valor = nombre.strip().lower(), valor.strip().lower()
+        if nombre == 'content-length':
+            largo = int(valor)
+        elif nombre == 'connection' and valor == 'close':
+            mantener = False
+        elif nombre == 'transfer-encoding' and 'chunked' in valor:
+            chunked = True
+
+    if chunked:
+        while True:
+            tamano = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(tamano + 2)
+            if tamano == 0:
+                break
+    elif largo is not None:
+        await reader.readexactly(largo)
+    else:
+        await reader.read()
+        mantener = False
+    return status, mantener
+
+
+async def cliente(host, puerto, rutas, fin, latencias, errores, desfase):
+    reader = writer = None
+    i = desfase
+    while time.perf_counter() < fin:
+        ruta = rutas[i % len(rutas)]
+        i += 1
+        inicio = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, puerto)
+            writer.write(
+                f'GET {ruta} HTTP/1.1\r\nHost: {host}:{puerto}\r\nConnection: keep-alive\r\n\r\n'.encode('ascii')
+            )
+            await writer.drain()
+            status, mantener = await asyncio.wait_for(leer_respuesta(reader), timeout=30)
+            if status != 200:
+                errores[f'HTTP {status}'] = errores.get(f'HTTP {status}', 0) + 1
+            else:
+                latencias.append(time.perf_counter() - inicio)
+            if not mantener:
+                writer.close()
+                writer = None
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, IndexError) as e:
+            errores[type(e).__name__] = errores.get(type(e).__name__, 0) + 1
+            if writer is not None:
+                writer.close()
+            writer = None
+            await asyncio.sleep(0.05)
+    if writer is not None:
+        writer.close()
+
+
+async def medir(url, rutas, clientes, duracion):
+    partes = urlsplit(url)
+    latencias = []
+    errores = {}
+    inicio = time.perf_counter()
+    fin = inicio + duracion
+    await asyncio.gather(*[
+        cliente(partes.hostname, partes.port or 80, rutas, fin, latencias, errores, n)
+        for n in range(clientes)
+    ])
+    segundos = time.perf_counter() - inicio
+    latencias.sort()
+
+    def percentil(p):
+        return round(latencias[min(int(len(latencias) * p), len(latencias) - 1)] * 1000, 1) if latencias else None
+
+    return {
+        'ok': len(latencias),
+        'req_s': round(len(latencias) / segundos, 1),
+        'p50_ms': percentil(0.50),
+        'p99_ms': percentil(0.99),
+        'errores': sum(errores.values()),
+        'detalle_errores': errores,
+    }
+
+
+def esperar_puerto(puerto, proceso, timeout=30):
+    limite = time.time() + timeout
+    while time.time() < limite:
+        if proceso.poll() is not None:
+            raise RuntimeError(f'el servidor terminó con código {proceso.returncode}')
+        try:
+            with socket.create_connection(('127.0.0.1', puerto), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'el servidor no escucha en el puerto {puerto}')
+
+
+def iniciar_servidores(puerto_wsgi, puerto_asgi):
+    if shutil.which('uvicorn') is None:
+        print("Se requiere uvicorn para el servidor ASGI: pip install uvicorn")
+        sys.exit(1)
+    salida = subprocess.DEVNULL
+    wsgi = subprocess.Popen(
+        [sys.executable, 'manage.py', 'runserver', '--noreload', f'0.0.0.0:{puerto_wsgi}'],
+        stdout=salida, stderr=salida
+    )
+    asgi = subprocess.Popen(
+        ['uvicorn', 'Sistema_Paquetes.asgi:application', '--host', '0.0.0.0', '--port', str(puerto_asgi),
+         '--log-level', 'warning', '--no-access-log', '--backlog', '4096'],
+        stdout=salida, stderr=salida
+    )
+    procesos = [wsgi, asgi]
+    try:
+        esperar_puerto(puerto_wsgi, wsgi)
+        esperar_puerto(puerto_asgi, asgi)
+    except RuntimeError:
+        for proceso in procesos:
+            proceso.terminate()
+        raise
+    return procesos
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Carga de lecturas: WSGI sync vs ASGI async')
+    parser.add_argument('--clientes', type=int, nargs='+', default=[100, 1000])
+    parser.add_argument('--duracion', type=float, default=10, help='Segundos por medición')
+    parser.add_argument('--wsgi-url', help='Servidor WSGI ya levantado (por defecto se levanta runserver)')
+    parser.add_argument('--asgi-url', help='Servidor ASGI ya levantado (por defecto se levanta uvicorn)')
+    parser.add_argument('--planilla', type=int, help='Planilla a consultar (por defecto la primera)')
+    args = parser.parse_args()
+
+    from app_paquetes.models import Planilla
+
+    planilla_id = args.planilla or Planilla.objects.order_by('id').values_list('id', flat=True).first()
+    procesos = []
+    if not (args.wsgi_url and args.asgi_url):
+        procesos = iniciar_servidores(8101, 8102)
+    wsgi_url = args.wsgi_url or 'http://0.0.0.0:8101'
+    asgi_url = args.asgi_url or 'http://0.0.0.0:8102'
+
+    try:
+        filas = []
+        for clientes in args.clientes:
+            for nombre, url, prefijo in (('WSGI sync', wsgi_url, ''), ('ASGI async', asgi_url, 'async/')):
+                print(f"____ {nombre}: {clientes} clientes, {args.duracion:g}s ____")
+                resultado = asyncio.run(medir(url, endpoints(prefijo, planilla_id), clientes, args.duracion))
+                filas.append({'servidor': nombre, 'clientes': clientes, **resultado})
+    finally:
+        for proceso in procesos:
+            proceso.terminate()
+            proceso.wait()
+
+    columnas = ['servidor', 'clientes', 'ok', 'req_s', 'p50_ms', 'p99_ms', 'errores']
+    anchos = [max(len(columna), *(len(str(fila[columna])) for fila in filas)) for columna in columnas]
+    print('  '.join(columna.ljust(ancho) for columna, ancho in zip(columnas, anchos)))
+    for fila in filas:
+        print('  '.join(str(fila[columna]).ljust(ancho) for columna, ancho in zip(columnas, anchos)))
+        if fila['detalle_errores']:
+            print(f"    errores: {fila['detalle_errores']}")
+
+
+if __name__ == '__main__':
+    main()
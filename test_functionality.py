@@ -84,13 +84,13 @@ class FunctionalityTester:
             # Testear listado básico
             response = self.api.get("paquetes/")
             if response.status_code == 200:
-                paquetes = response.json()
+                paquetes = response.json()['results']
                 logger.info(f"+ Endpoint listado funciona - {len(paquetes)} paquetes obtenidos")
                 
                 # Testear filtro por estado
                 response = self.api.get("paquetes/", params={"estado": "en_deposito"})
                 if response.status_code == 200:
-                    paquetes_filtrados = response.json()
+                    paquetes_filtrados = response.json()['results']
                     logger.info(f"+ Filtro por estado funciona - {len(paquetes_filtrados)} paquetes en depósito")
                 
                 # Testear filtro por cliente
@@ -100,7 +100,7 @@ class FunctionalityTester:
                     if primer_cliente:
                         response = self.api.get("paquetes/", params={"cliente": primer_cliente.id})
                         if response.status_code == 200:
-                            paquetes_cliente = response.json()
+                            paquetes_cliente = response.json()['results']
                             logger.info(f"+ Filtro por cliente funciona - {len(paquetes_cliente)} paquetes del cliente")
                 except:
                     pass